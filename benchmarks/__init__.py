@@ -0,0 +1 @@
+"""Benchmarks of the journey search, run as modules from the repository root."""
@@ -0,0 +1,205 @@
+"""Measure the cold start of the lambda handler on a synthetic feed.
+
+Each run starts a new interpreter, like a new execution environment, that imports
+the handler and sends it two API Gateway requests. The feed is served over HTTP from
+this process, and runs are done with and without a prebuilt snapshot of it:
+
+- import: importing the application, before the handler runs any code of its own.
+- init: the rest of the handler module, starting the application up.
+- first request: the first search, that fetches the feed unless the snapshot was loaded.
+- second request: the same search again, served by the warm process.
+
+The import time of each top level package, from `python -X importtime`, is reported
+too. Run it from the repository root:
+
+    python -m benchmarks.cold_start --events 10000 100000
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+from src.core.config import Settings
+from src.repositories.flight_events import FlightEventsAPIRepository
+
+from .feeds import HUB_AND_SPOKE, SEARCH_DATE, search_airports, synthetic_records
+
+ENVIRONMENT = {
+    "MAX_CONNECTIONS": "2",
+    "MAX_JOURNEY_DURATION_HOURS": "24",
+    "MAX_CONNEXTION_DURATION_HOURS": "4",
+}
+IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+\d+ \|( *)(\S+)")
+
+
+@contextmanager
+def serve_feed(payload: bytes) -> Iterator[str]:
+    """Serve a feed payload over HTTP, yielding its URL."""
+    etag = f'"{hashlib.blake2b(payload, digest_size=8).hexdigest()}"'
+
+    class FeedHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/flight-events"
+    finally:
+        server.shutdown()
+        thread.join()
+
+
+async def build_snapshot(feed_url: str, path: Path) -> None:
+    """Write the snapshot of the served feed, as `deploy.build_snapshot` does."""
+    settings = Settings(
+        flight_events_api_url=feed_url, **{k.lower(): v for k, v in ENVIRONMENT.items()}
+    )
+    async with httpx.AsyncClient() as http_client:
+        await FlightEventsAPIRepository(settings, http_client).save_snapshot_file(path)
+
+
+def search_event(from_airport: str, to_airport: str) -> dict:
+    """Get an API Gateway HTTP API event of a journey search."""
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": "/journeys/search",
+        "rawQueryString": f"date={SEARCH_DATE.date()}&from={from_airport}&to={to_airport}",
+        "headers": {"host": "localhost"},
+        "requestContext": {
+            "http": {
+                "method": "GET",
+                "path": "/journeys/search",
+                "protocol": "HTTP/1.1",
+                "sourceIp": "127.0.0.1",
+            },
+            "stage": "$default",
+        },
+        "isBase64Encoded": False,
+    }
+
+
+def run_handler(event: dict) -> dict[str, float]:
+    """Import the handler and send it the event twice, returning the seconds of each stage.
+
+    Meant to run in a new interpreter, with the settings in the environment.
+    """
+    seconds = {}
+    start = time.perf_counter()
+    import src.main  # noqa: F401
+
+    seconds["import"] = time.perf_counter() - start
+    start = time.perf_counter()
+    from deploy.handler import handler
+
+    seconds["init"] = time.perf_counter() - start
+    for stage in ("first request", "second request"):
+        start = time.perf_counter()
+        response = handler(event, None)
+        seconds[stage] = time.perf_counter() - start
+        if response["statusCode"] != 200:
+            raise RuntimeError(f"Search failed: {response}")
+    return seconds
+
+
+def cold_start(environment: dict[str, str], event: dict) -> dict[str, float]:
+    """Run the handler in a new interpreter, returning the seconds of each stage."""
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.cold_start", "--run-handler", json.dumps(event)],
+        capture_output=True,
+        check=True,
+        env={**os.environ, **environment},
+        text=True,
+    )
+    return json.loads(completed.stdout)
+
+
+def import_times() -> dict[str, float]:
+    """Get the seconds spent importing each top level package of the handler."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import deploy.handler"],
+        capture_output=True,
+        check=False,
+        # the handler starts the application up, so no valid settings are needed
+        env={**os.environ, "FLIGHT_EVENTS_API_URL": "http://127.0.0.1", **ENVIRONMENT},
+        text=True,
+    )
+    seconds: dict[str, float] = defaultdict(float)
+    for line in completed.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match is not None:
+            self_time, _, module = match.groups()
+            seconds[module.split(".")[0]] += int(self_time) / 1_000_000
+    return dict(seconds)
+
+
+def main() -> None:
+    """Run the measurements and print the median seconds of each stage."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--run-handler", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_handler is not None:
+        print(json.dumps(run_handler(json.loads(args.run_handler))))
+        return
+
+    times = sorted(import_times().items(), key=lambda item: item[1], reverse=True)
+    print(f"import time: {sum(seconds for _, seconds in times):.3f}s")
+    for package, seconds in times[:10]:
+        print(f"  {package:<20} {seconds:.3f}s")
+
+    stages = ("import", "init", "first request", "second request")
+    print(f"\n{'events':>8} {'snapshot':>9} " + " ".join(f"{stage:>15}" for stage in stages))
+    for events in args.events:
+        payload = json.dumps(synthetic_records(HUB_AND_SPOKE, events, args.seed)).encode()
+        event = search_event(*search_airports(HUB_AND_SPOKE, events))
+        with serve_feed(payload) as feed_url, tempfile.TemporaryDirectory() as directory:
+            snapshot_path = Path(directory, "flight-events.snapshot")
+            asyncio.run(build_snapshot(feed_url, snapshot_path))
+            environment = {**ENVIRONMENT, "FLIGHT_EVENTS_API_URL": feed_url}
+            for snapshot in (False, True):
+                if snapshot:
+                    environment["FLIGHT_EVENTS_SNAPSHOT_PATH"] = str(snapshot_path)
+                runs = [cold_start(environment, event) for _ in range(args.repeat)]
+                medians = [statistics.median(run[stage] for run in runs) for stage in stages]
+                print(
+                    f"{events:>8} {'yes' if snapshot else 'no':>9} "
+                    + " ".join(f"{seconds:>14.3f}s" for seconds in medians)
+                )
+
+
+if __name__ == "__main__":
+    main()
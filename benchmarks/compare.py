@@ -0,0 +1,56 @@
+"""Compare the results of two runs of the pipeline benchmark.
+
+Run it from the repository root, with the results of the baseline run first:
+
+    python -m benchmarks.compare baseline.json results.json --threshold 1.2
+"""
+
+import argparse
+import json
+import sys
+
+ResultKey = tuple[str, int, str]
+
+
+def load(path: str) -> tuple[dict, dict[ResultKey, float]]:
+    """Load the results of a run, as the best time of each topology, size and stage."""
+    with open(path) as file:
+        document = json.load(file)
+    return document, {
+        (result["topology"], result["events"], result["stage"]): result["min"]
+        for result in document["results"]
+    }
+
+
+def main() -> None:
+    """Print the ratio of each stage time, failing if any is above the threshold."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("results")
+    parser.add_argument(
+        "--threshold", type=float, default=1.2, help="Ratio over the baseline failing the run."
+    )
+    args = parser.parse_args()
+
+    baseline_document, baseline = load(args.baseline)
+    results_document, results = load(args.results)
+    print(f"baseline {baseline_document['commit']}, results {results_document['commit']}")
+    print(
+        f"{'topology':>14} {'events':>9} {'stage':>10} {'baseline':>10} {'results':>10}"
+        f" {'ratio':>6}"
+    )
+    regressions = 0
+    for key in sorted(baseline.keys() & results.keys()):
+        topology, events, stage = key
+        ratio = results[key] / baseline[key] if baseline[key] else 1.0
+        regression = ratio > args.threshold
+        regressions += regression
+        print(
+            f"{topology:>14} {events:>9} {stage:>10} {baseline[key]:>10.4f}"
+            f" {results[key]:>10.4f} {ratio:>6.2f}{' !' if regression else ''}"
+        )
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
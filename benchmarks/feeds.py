@@ -0,0 +1,108 @@
+"""Deterministic synthetic flight events feeds."""
+
+import math
+import random
+from datetime import UTC, datetime, timedelta
+from string import ascii_uppercase
+
+from src.models import FlightEvent
+
+SEARCH_DATE = datetime(2021, 12, 31, tzinfo=UTC)
+HUB_AND_SPOKE = "hub-and-spoke"
+MESH = "mesh"
+TOPOLOGIES = (HUB_AND_SPOKE, MESH)
+
+
+def airport_codes(amount: int) -> list[str]:
+    """Get distinct airport codes, AAA, BAA, CAA and so on."""
+    return [
+        "".join(ascii_uppercase[(number // 26**position) % 26] for position in range(3))
+        for number in range(amount)
+    ]
+
+
+def feed_airports(topology: str, events: int) -> tuple[list[str], int]:
+    """Get the airports of a feed and how many of them, first, are hubs.
+
+    The airports grow with the square root of the events, so the flights between
+    each pair of airports stay about the same as the feed grows.
+    """
+    airports = max(8, math.isqrt(events) // 2)
+    hubs = max(2, airports // 20) if topology == HUB_AND_SPOKE else 0
+    return airport_codes(airports), hubs
+
+
+def search_airports(topology: str, events: int) -> tuple[str, str]:
+    """Get an origin and destination to search journeys between in a feed.
+
+    In a hub-and-spoke feed both are spokes, so journeys connect through the hubs.
+    """
+    codes, hubs = feed_airports(topology, events)
+    return codes[hubs], codes[hubs + 1]
+
+
+def synthetic_records(topology: str, events: int, seed: int = 0, days: int = 2) -> list[dict]:
+    """Generate the records of a flight events API payload.
+
+    The same arguments always generate the same records. Flights depart on a five
+    minutes grid over the days starting on `SEARCH_DATE`, and last from 30 minutes to
+    8 hours.
+
+    Args:
+        topology: `HUB_AND_SPOKE`, where spokes only fly to the hubs and a tenth of the
+            flights are between hubs, or `MESH`, where any airport flies to any other.
+        events: Amount of flight events.
+        seed: Seed of the random generator.
+        days: Amount of days the flights depart on.
+
+    Returns:
+        The records, as the flight events API sends them.
+
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology: {topology}")
+
+    rng = random.Random(seed)
+    codes, hubs = feed_airports(topology, events)
+    records = []
+    for number in range(events):
+        if topology == MESH:
+            from_airport, to_airport = rng.sample(codes, 2)
+        elif rng.random() < 0.1:
+            from_airport, to_airport = rng.sample(codes[:hubs], 2)
+        else:
+            from_airport, to_airport = rng.choice(codes[:hubs]), rng.choice(codes[hubs:])
+            if rng.random() < 0.5:
+                from_airport, to_airport = to_airport, from_airport
+        departure_time = SEARCH_DATE + timedelta(minutes=5 * rng.randrange(12 * 24 * days))
+        arrival_time = departure_time + timedelta(minutes=30 * rng.randint(1, 16))
+        records.append(
+            {
+                "flight_number": f"XX{number:07}",
+                "departure_city": from_airport,
+                "arrival_city": to_airport,
+                "departure_datetime": departure_time.isoformat(),
+                "arrival_datetime": arrival_time.isoformat(),
+            }
+        )
+    return records
+
+
+def synthetic_flight_events(seed: int, flights: int, airports: int) -> list[FlightEvent]:
+    """Generate flight events between any airports over two days, on a 15 minutes grid."""
+    rng = random.Random(seed)
+    codes = airport_codes(airports)
+    flight_events = []
+    for number in range(flights):
+        from_airport, to_airport = rng.sample(codes, 2)
+        departure_time = SEARCH_DATE + timedelta(minutes=15 * rng.randrange(4 * 48))
+        flight_events.append(
+            FlightEvent(
+                flight_number=f"XX{number:05}",
+                from_airport=from_airport,
+                to_airport=to_airport,
+                departure_time=departure_time,
+                arrival_time=departure_time + timedelta(minutes=30 * rng.randint(1, 8)),
+            )
+        )
+    return flight_events
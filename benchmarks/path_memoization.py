@@ -0,0 +1,66 @@
+"""Benchmark the path enumeration with and without suffix memoization.
+
+Run it from the repository root:
+
+    python -m benchmarks.path_memoization --flights 3000 --airports 20
+"""
+
+import argparse
+import time
+from datetime import timedelta
+
+from src.models import FlightTable
+from src.models.flight_table import MICROSECOND, to_timestamp
+from src.search import DepartureIndex, PathParameters, enumerate_paths
+
+from .feeds import SEARCH_DATE, synthetic_flight_events
+
+
+def measure(
+    departure_index: DepartureIndex, parameters: PathParameters, memoize: bool
+) -> tuple[int, float]:
+    """Enumerate every path, returning the amount found and the seconds it took."""
+    start = time.perf_counter()
+    paths = sum(1 for _ in enumerate_paths(departure_index, parameters, memoize))
+    return paths, time.perf_counter() - start
+
+
+def main() -> None:
+    """Run the benchmark and print a row per max connections."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--flights", type=int, default=3000)
+    parser.add_argument("--airports", type=int, default=20)
+    parser.add_argument("--max-connections", type=int, nargs="+", default=[2, 3, 4])
+    parser.add_argument("--max-connection-wait-hours", type=int, default=4)
+    parser.add_argument("--max-duration-hours", type=int, default=24)
+    args = parser.parse_args()
+
+    flight_table = FlightTable.from_events(
+        synthetic_flight_events(args.seed, args.flights, args.airports)
+    )
+    departure_index = DepartureIndex(flight_table)
+    print(
+        f"{'connections':>11} {'paths':>10} {'plain (s)':>10} {'memoized (s)':>12} {'speedup':>8}"
+    )
+    for max_connections in args.max_connections:
+        parameters = PathParameters(
+            origin=0,
+            destination=1,
+            departure_from=to_timestamp(SEARCH_DATE),
+            departure_to=to_timestamp(SEARCH_DATE + timedelta(days=1)) - 1,
+            max_connections=max_connections,
+            max_connection_wait=timedelta(hours=args.max_connection_wait_hours) // MICROSECOND,
+            max_duration=timedelta(hours=args.max_duration_hours) // MICROSECOND,
+        )
+        paths, plain = measure(departure_index, parameters, memoize=False)
+        memoized_paths, memoized = measure(departure_index, parameters, memoize=True)
+        assert paths == memoized_paths
+        print(
+            f"{max_connections:>11} {paths:>10} {plain:>10.3f} {memoized:>12.3f}"
+            f" {plain / memoized:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Benchmark each stage of the journey search on synthetic feeds.
+
+The stages run as the service runs them, in order, on the output of the previous one:
+
+- parse: retrieve and parse the feed with the repository, from an in-memory transport.
+- index: build the departure index of the flight events, that replaced the mapping of
+  relevant flight events by airport.
+- search: find the paths of the journeys, as rows of the flight table.
+- journeys: build the `Journey` models of the paths.
+- serialize: render the journeys as the JSON response body.
+
+Results are written as JSON, so runs from different commits can be compared with
+`python -m benchmarks.compare`. Run it from the repository root:
+
+    python -m benchmarks.pipeline --events 1000 10000 100000 1000000 --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+
+import httpx
+
+from src.api.responses import JourneysResponse
+from src.commands import SearchJourneysCommand
+from src.core.config import SearchEngine, Settings
+from src.models import Journey
+from src.repositories.flight_events import (
+    FlightEventsAPIRepository,
+    FlightEventsSnapshot,
+    flight_events_cache,
+)
+from src.search import DepartureIndex
+
+from .feeds import SEARCH_DATE, TOPOLOGIES, search_airports, synthetic_records
+
+STAGES = ("parse", "index", "search", "journeys", "serialize")
+FEED_URL = "https://flight-events.benchmark"
+
+
+def in_memory_repository(settings: Settings, payload: bytes) -> FlightEventsAPIRepository:
+    """Get a repository retrieving a payload from memory instead of the network."""
+    transport = httpx.MockTransport(lambda _: httpx.Response(200, content=payload))
+    return FlightEventsAPIRepository(settings, httpx.AsyncClient(transport=transport))
+
+
+def parse(repository: FlightEventsAPIRepository) -> FlightEventsSnapshot:
+    """Retrieve and parse the whole feed with the repository, bypassing its cache."""
+    flight_events_cache.clear()
+    return asyncio.run(repository.snapshot())
+
+
+def serialize(journeys: list[Journey]) -> bytes:
+    """Render journeys as the JSON body of a response, like the API does."""
+    return JourneysResponse(journeys).body
+
+
+def timed[T](function: Callable[..., T], *args: object) -> tuple[T, float]:
+    """Call a function, returning its result and the seconds it took."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run_pipeline(
+    settings: Settings, repository: FlightEventsAPIRepository, topology: str, events: int
+) -> tuple[dict[str, float], int]:
+    """Run every stage once, returning the seconds each took and the journeys found."""
+    from_airport, to_airport = search_airports(topology, events)
+    command = SearchJourneysCommand(
+        date=SEARCH_DATE.date(),
+        from_airport=from_airport,
+        to_airport=to_airport,
+        flight_events_repository=repository,
+        settings=settings,
+    )
+    seconds = {}
+    snapshot, seconds["parse"] = timed(parse, repository)
+    departure_index, seconds["index"] = timed(DepartureIndex, snapshot.flight_table)
+    paths, seconds["search"] = timed(lambda: list(command.iter_paths(departure_index)))
+    journeys, seconds["journeys"] = timed(
+        lambda: list(command.build_journeys(snapshot.flight_table, paths))
+    )
+    _, seconds["serialize"] = timed(serialize, journeys)
+    return seconds, len(journeys)
+
+
+def git_commit() -> str | None:
+    """Get the commit the benchmark runs on, if in a git repository."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, check=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    """Run the benchmark and write the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topologies", nargs="+", choices=TOPOLOGIES, default=list(TOPOLOGIES))
+    parser.add_argument("--events", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-connections", type=int, default=2)
+    parser.add_argument("--engine", choices=list(SearchEngine), default=SearchEngine.PATHS)
+    parser.add_argument("--output", help="File to write the results to, stdout if not given.")
+    args = parser.parse_args()
+
+    settings = Settings(
+        flight_events_api_url=FEED_URL,
+        max_connections=args.max_connections,
+        max_journey_duration_hours=24,
+        max_connextion_duration_hours=4,
+        journey_search_engine=args.engine,
+    )
+    results = []
+    for topology in args.topologies:
+        for events in args.events:
+            payload = json.dumps(synthetic_records(topology, events, args.seed)).encode()
+            repository = in_memory_repository(settings, payload)
+            runs = [
+                run_pipeline(settings, repository, topology, events) for _ in range(args.repeat)
+            ]
+            for stage in STAGES:
+                seconds = [run_seconds[stage] for run_seconds, _ in runs]
+                results.append(
+                    {
+                        "topology": topology,
+                        "events": events,
+                        "stage": stage,
+                        "journeys": runs[0][1],
+                        "min": min(seconds),
+                        "median": statistics.median(seconds),
+                        "runs": seconds,
+                    }
+                )
+            print(
+                f"{topology} {events} events: "
+                + ", ".join(f"{result['stage']} {result['min']:.4f}s" for result in results[-5:]),
+                file=sys.stderr,
+            )
+
+    document = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "max_connections": args.max_connections,
+            "engine": args.engine,
+        },
+        "results": results,
+    }
+    output = json.dumps(document, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Benchmark the path enumeration against the round-based search on growing timetables.
+
+Run it from the repository root:
+
+    python -m benchmarks.search_engines --flights 2000 8000 32000
+"""
+
+import argparse
+import time
+from collections.abc import Callable, Iterable
+from datetime import timedelta
+from functools import partial
+
+from src.models import FlightTable
+from src.models.flight_table import MICROSECOND, to_timestamp
+from src.search import DepartureIndex, PathParameters, enumerate_paths, raptor_paths
+
+from .feeds import SEARCH_DATE, synthetic_flight_events
+
+
+def measure(search: Callable[[], Iterable[tuple[int, ...]]]) -> tuple[int, float]:
+    """Run a search, returning the amount of paths found and the seconds it took."""
+    start = time.perf_counter()
+    paths = sum(1 for _ in search())
+    return paths, time.perf_counter() - start
+
+
+def main() -> None:
+    """Run the benchmark and print a row per timetable size."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--flights", type=int, nargs="+", default=[2000, 8000, 32000])
+    parser.add_argument("--airports", type=int, default=100)
+    parser.add_argument("--max-connections", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'flights':>8} {'paths':>9} {'paths (s)':>10} {'pareto':>7} {'raptor (s)':>11}")
+    for flights in args.flights:
+        flight_table = FlightTable.from_events(
+            synthetic_flight_events(args.seed, flights, args.airports)
+        )
+        departure_index = DepartureIndex(flight_table)
+        parameters = PathParameters(
+            origin=0,
+            destination=1,
+            departure_from=to_timestamp(SEARCH_DATE),
+            departure_to=to_timestamp(SEARCH_DATE + timedelta(days=1)) - 1,
+            max_connections=args.max_connections,
+            max_connection_wait=timedelta(hours=4) // MICROSECOND,
+            max_duration=timedelta(hours=24) // MICROSECOND,
+        )
+        paths, paths_time = measure(partial(enumerate_paths, departure_index, parameters))
+        pareto, raptor_time = measure(partial(raptor_paths, departure_index, parameters))
+        print(f"{flights:>8} {paths:>9} {paths_time:>10.3f} {pareto:>7} {raptor_time:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Build the snapshot of the flight events feed loaded by the function during init.
+
+The feed is fetched with the settings from the environment, as the function does. Run
+it from the repository root before deploying:
+
+    python -m deploy.build_snapshot deploy/flight-events.snapshot
+"""
+
+import argparse
+import asyncio
+
+from src.core.config import Settings
+from src.core.http import create_http_client
+from src.repositories.flight_events import FlightEventsAPIRepository
+
+
+async def build_snapshot(path: str) -> int:
+    """Fetch the feed and write its snapshot, returning the amount of flight events."""
+    settings = Settings()
+    async with create_http_client(settings) as http_client:
+        repository = FlightEventsAPIRepository(settings, http_client)
+        snapshot = await repository.save_snapshot_file(path)
+    return len(snapshot.flight_table)
+
+
+def main() -> None:
+    """Build the snapshot at the path given as argument."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="File to write the snapshot to.")
+    args = parser.parse_args()
+    flight_events = asyncio.run(build_snapshot(args.path))
+    print(f"Wrote {flight_events} flight events to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
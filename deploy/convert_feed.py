@@ -0,0 +1,36 @@
+"""Convert a flight events feed, in the JSON format of the API, into a snapshot file.
+
+The snapshot can be served with FLIGHT_EVENTS_FILE_PATH instead of the API, for example
+as a local stand-in of it. Run it from the repository root, reading the feed from a file
+or from the standard input:
+
+    python -m deploy.convert_feed flight-events.json flight-events.snapshot
+    curl -s https://api.flight-events.com/flight-events | python -m deploy.convert_feed - \
+        flight-events.snapshot
+"""
+
+import argparse
+import sys
+
+from src.repositories.flight_events import convert_feed_file
+
+
+def main() -> None:
+    """Convert the feed at the path given as first argument to the one given as second."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("feed", help="JSON feed to convert, - for the standard input.")
+    parser.add_argument("path", help="File to write the snapshot to.")
+    args = parser.parse_args()
+    try:
+        if args.feed == "-":
+            snapshot = convert_feed_file(sys.stdin.buffer, args.path)
+        else:
+            with open(args.feed, "rb") as feed:
+                snapshot = convert_feed_file(feed, args.path)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    print(f"Wrote {len(snapshot.flight_table)} flight events to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
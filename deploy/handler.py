@@ -2,10 +2,20 @@
 
 This module is used to create a lambda handler for the FastAPI application.
 and be able to deploy the application to AWS Lambda.
+
+The application starts up during the init phase of the function, where it loads the
+prebuilt snapshot of the flight events feed if `FLIGHT_EVENTS_SNAPSHOT_PATH` is set,
+so the first request doesn't have to download and parse it.
 """
 
 from mangum import Mangum
+from mangum.protocols import LifespanCycle
 
 from src.main import app
 
-handler = Mangum(app)
+# Mangum would run the lifespan around every invocation, creating the HTTP client and
+# caches for each request. It is run once instead, and never shut down, as the
+# execution environment is frozen between invocations and discarded without notice.
+LifespanCycle(app, "on").__enter__()
+
+handler = Mangum(app, lifespan="off")
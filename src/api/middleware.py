@@ -0,0 +1,55 @@
+"""Middlewares of the application."""
+
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.metrics import MetricsRegistry, record, recording
+
+
+class ServerTimingMiddleware:
+    """Record the metrics of each request, and send its stage timings as `Server-Timing`.
+
+    It is a plain ASGI middleware, so requests go straight to the application when
+    the metrics are disabled, i.e. the lifespan didn't set `app.state.metrics`.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: The application to wrap.
+
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request, recording its metrics if enabled."""
+        metrics: MetricsRegistry | None = None
+        if scope["type"] == "http":
+            metrics = getattr(scope["app"].state, "metrics", None)
+        if metrics is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        with recording() as request_metrics:
+
+            async def send_with_timings(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    timings = {**request_metrics.timings, "total": time.perf_counter() - start}
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing",
+                        ", ".join(
+                            f"{stage};dur={seconds * 1000:.3f}"
+                            for stage, seconds in timings.items()
+                        ),
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timings)
+            finally:
+                record("total", time.perf_counter() - start)
+                metrics.collect(request_metrics)
@@ -0,0 +1,150 @@
+"""Custom responses for the API."""
+
+from collections.abc import AsyncIterator, Callable
+
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
+from src.core import metrics
+from src.models import FlightEvent, Journey, JourneySearchResult
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NORMALIZED_MEDIA_TYPE = "application/vnd.journeys.normalized+json"
+
+
+def accepts_ndjson(accept: str | None) -> bool:
+    """Check whether an Accept header asks for newline delimited JSON."""
+    return accept is not None and NDJSON_MEDIA_TYPE in accept
+
+
+def accepts_normalized(accept: str | None) -> bool:
+    """Check whether an Accept header asks for normalized journeys."""
+    return accept is not None and NORMALIZED_MEDIA_TYPE in accept
+
+
+class NDJSONResponse(StreamingResponse):
+    """Response streaming models as newline delimited JSON, one model per line."""
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    def __init__(
+        self,
+        models: AsyncIterator[BaseModel],
+        status_code: int = 200,
+        serialize: Callable[[BaseModel], bytes] | None = None,
+    ) -> None:
+        """Initialize the response.
+
+        Args:
+            models: The models to stream, serialized as they are yielded.
+            status_code: The response status code.
+            serialize: Function serializing a model to JSON. Dumps it by alias if not given.
+
+        """
+        super().__init__(_serialize_lines(models, serialize or _dump_json), status_code=status_code)
+
+
+def _dump_json(model: BaseModel) -> bytes:
+    """Serialize a model to JSON by alias."""
+    return model.model_dump_json(by_alias=True).encode()
+
+
+async def _serialize_lines(
+    models: AsyncIterator[BaseModel], serialize: Callable[[BaseModel], bytes]
+) -> AsyncIterator[bytes]:
+    """Serialize each model to a line of JSON."""
+    async for model in models:
+        yield serialize(model) + b"\n"
+
+
+class JourneySerializer:
+    """Serializer of journeys to JSON, that serializes each distinct flight event once.
+
+    Journeys of a search share the flight event models of the legs they have in
+    common, so the JSON of each leg is cached by model identity and journeys are
+    assembled from those fragments. The output is the same as dumping the journeys
+    by alias with pydantic.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the serializer without any leg serialized."""
+        self._legs: dict[int, bytes] = {}
+
+    def leg(self, flight_event: FlightEvent) -> bytes:
+        """Serialize a flight event, only the first time it is seen."""
+        fragment = self._legs.get(id(flight_event))
+        if fragment is None:
+            fragment = self._legs[id(flight_event)] = flight_event.model_dump_json(
+                by_alias=True
+            ).encode()
+        return fragment
+
+    def journey(self, journey: Journey) -> bytes:
+        """Serialize a journey."""
+        fragments = [self.leg(flight_event) for flight_event in journey.path]
+        return b'{"path":[%b],"connections":%d}' % (b",".join(fragments), len(fragments) - 1)
+
+    def journeys(self, journeys: list[Journey]) -> bytes:
+        """Serialize a list of journeys."""
+        return b"[%b]" % b",".join(self.journey(journey) for journey in journeys)
+
+    def search_results(self, results: list[JourneySearchResult]) -> bytes:
+        """Serialize a list of journey search results."""
+        return b"[%b]" % b",".join(
+            b'{"query":%b,"journeys":%b}'
+            % (result.query.model_dump_json(by_alias=True).encode(), self.journeys(result.journeys))
+            for result in results
+        )
+
+    def normalized_journeys(self, journeys: list[Journey]) -> bytes:
+        """Serialize a list of journeys as a `NormalizedJourneys`.
+
+        Each distinct flight event is added to the legs table the first time it is
+        seen, and journeys are serialized as the indices of their legs in the table.
+        """
+        indices: dict[int, int] = {}
+        legs = []
+        paths = []
+        for journey in journeys:
+            path = []
+            for flight_event in journey.path:
+                index = indices.get(id(flight_event))
+                if index is None:
+                    index = indices[id(flight_event)] = len(legs)
+                    legs.append(self.leg(flight_event))
+                path.append(b"%d" % index)
+            paths.append(b"[%b]" % b",".join(path))
+        return b'{"legs":[%b],"journeys":[%b]}' % (b",".join(legs), b",".join(paths))
+
+
+class JourneysResponse(Response):
+    """JSON response with journeys, or journey search results, serialized by fragments.
+
+    The journeys are assembled from the JSON of their legs by a `JourneySerializer`,
+    instead of being validated against the response model and encoded by the route.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: list[Journey] | list[JourneySearchResult]) -> bytes:
+        """Serialize the content, recording the time spent as the `serialize` stage."""
+        with metrics.timed("serialize"):
+            serializer = JourneySerializer()
+            if content and isinstance(content[0], JourneySearchResult):
+                return serializer.search_results(content)
+            return serializer.journeys(content)
+
+
+class NormalizedJourneysResponse(Response):
+    """JSON response with journeys referencing their legs in a table of flight events.
+
+    Legs shared by many journeys are sent once, which makes the body smaller than the
+    one of a `JourneysResponse` when journeys have connections.
+    """
+
+    media_type = NORMALIZED_MEDIA_TYPE
+
+    def render(self, content: list[Journey]) -> bytes:
+        """Serialize the journeys, recording the time spent as the `serialize` stage."""
+        with metrics.timed("serialize"):
+            return JourneySerializer().normalized_journeys(content)
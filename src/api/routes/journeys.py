@@ -1,54 +1,225 @@
 """Routes for the API."""
 
 import logging
-from datetime import date
+from collections.abc import AsyncIterator
+from datetime import date, timedelta
 from typing import Annotated
 
-from fastapi import APIRouter, Query, status
+from fastapi import APIRouter, Header, Query, status
 from fastapi.exceptions import HTTPException
 
-from src.commands import SearchJourneysCommand
-from src.core.dependencies import AppSettings
-from src.models import Airport, Journey
-from src.repositories.flight_events import (
-    FlightEventRetrievalError,
-    FlightEventsAPIRepository,
+from src.api.responses import (
+    NDJSON_MEDIA_TYPE,
+    NORMALIZED_MEDIA_TYPE,
+    JourneySerializer,
+    JourneysResponse,
+    NDJSONResponse,
+    NormalizedJourneysResponse,
+    accepts_ndjson,
+    accepts_normalized,
 )
+from src.commands import SearchJourneysBatchCommand, SearchJourneysCommand
+from src.core.dependencies import (
+    AppSettings,
+    FlightEventsRepository,
+    JourneySearchPool,
+    SearchCache,
+)
+from src.models import (
+    Airport,
+    Journey,
+    JourneySearchBatch,
+    JourneySearchQuery,
+    JourneySearchResult,
+    JourneysFormat,
+    JourneySort,
+)
+from src.repositories.flight_events import FlightEventRetrievalError
 
 router = APIRouter()
 
+# longest range of dates searched in a single request
+MAX_SEARCH_DAYS = 31
+
 
-@router.get("/search")
+@router.get(
+    "/search",
+    response_model=list[Journey] | list[JourneySearchResult],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}, NORMALIZED_MEDIA_TYPE: {}}}},
+)
 async def search(
-    date: date,
     from_airport: Annotated[Airport, Query(alias="from")],
     to_airport: Annotated[Airport, Query(alias="to")],
     settings: AppSettings,
-) -> list[Journey]:
+    flight_events_repository: FlightEventsRepository,
+    search_cache: SearchCache,
+    search_pool: JourneySearchPool,
+    date: date | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    sort: JourneySort | None = None,
+    limit: Annotated[int | None, Query(ge=1)] = None,
+    stream: bool = False,
+    response_format: Annotated[JourneysFormat, Query(alias="format")] = JourneysFormat.FULL,
+    accept: Annotated[str | None, Header()] = None,
+) -> JourneysResponse | NormalizedJourneysResponse | NDJSONResponse:
     """GET /search.
 
-    Search for journeys between two airports on a given date.
+    Search for journeys between two airports on a given date, or on each date of a range.
 
     Args:
-        date: Query parameter. The date to search for journeys.
         from_airport: Query parameter. The airport to depart from.
         to_airport: Query parameter. The airport to arrive to.
         settings: The application settings. From dependency injection.
+        flight_events_repository: The flight events repository. From dependency injection.
+        search_cache: Cache of the journey searches. From dependency injection.
+        search_pool: Pool of processes running large searches. From dependency injection.
+        date: Query parameter. The date to search for journeys.
+        date_from: Query parameter. The first date to search for journeys, instead of
+            `date`. Journeys are searched on every date up to `date_to`, included, and
+            returned grouped by date, with the format and streaming parameters ignored.
+        date_to: Query parameter. The last date to search for journeys, with `date_from`.
+        sort: Query parameter. Rank the journeys by earliest arrival, shortest duration or
+            fewest connections. In departure order if not given.
+        limit: Query parameter. Max amount of journeys to return, for each date.
+        stream: Query parameter. Stream the journeys as newline delimited JSON.
+        response_format: Query parameter, `format`. Respond with full journeys, or
+            normalized journeys referencing their legs in a table of flight events.
+            Ignored when journeys are streamed.
+        accept: Header. Journeys are also streamed when it accepts `application/x-ndjson`,
+            and normalized when it accepts `application/vnd.journeys.normalized+json`.
 
     Returns:
-        A list of journeys between the two airports
+        A list of journeys between the two airports, the normalized journeys, or a stream
+        of them, one per line. With a range of dates, the journeys found on each date.
 
     """
-    flight_events_repository = FlightEventsAPIRepository(settings)
+    if date_from is not None or date_to is not None:
+        return await _search_date_range(
+            SearchJourneysBatchCommand(
+                queries=[
+                    JourneySearchQuery(date=day, from_airport=from_airport, to_airport=to_airport)
+                    for day in _date_range(date, date_from, date_to)
+                ],
+                flight_events_repository=flight_events_repository,
+                settings=settings,
+                search_cache=search_cache,
+                sort=sort,
+                limit=limit,
+                search_pool=search_pool,
+            )
+        )
+    if date is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Either date, or date_from and date_to, are required",
+        )
+
     command = SearchJourneysCommand(
         date=date,
         from_airport=from_airport,
         to_airport=to_airport,
         flight_events_repository=flight_events_repository,
         settings=settings,
+        sort=sort,
+        limit=limit,
+        search_cache=search_cache,
+        search_pool=search_pool,
+    )
+    try:
+        if stream or accepts_ndjson(accept):
+            journeys = command.iter_journeys()
+            # flight events are retrieved before the first journey, so errors are
+            # raised before the response starts
+            first_journey = await anext(journeys, None)
+            return NDJSONResponse(
+                _prepend(first_journey, journeys), serialize=JourneySerializer().journey
+            )
+        if response_format == JourneysFormat.NORMALIZED or accepts_normalized(accept):
+            return NormalizedJourneysResponse(await command.execute())
+        return JourneysResponse(await command.execute())
+    except FlightEventRetrievalError as e:
+        logging.error(f"Failed to retrieve flight events: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve flight events",
+        ) from e
+
+
+def _date_range(day: date | None, date_from: date | None, date_to: date | None) -> list[date]:
+    """Get the dates of a range, both bounds included.
+
+    Raises:
+        HTTPException: If a single date is searched too, a bound is missing, or the range
+            is empty or longer than `MAX_SEARCH_DAYS`.
+
+    """
+    if day is not None:
+        detail = "Search either a date, or a range from date_from to date_to"
+    elif date_from is None or date_to is None:
+        detail = "Both date_from and date_to are required to search a range of dates"
+    elif not 0 <= (date_to - date_from).days < MAX_SEARCH_DAYS:
+        detail = f"date_to must be from date_from to {MAX_SEARCH_DAYS - 1} days after it"
+    else:
+        return [date_from + timedelta(days=days) for days in range((date_to - date_from).days + 1)]
+    raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail)
+
+
+async def _search_date_range(command: SearchJourneysBatchCommand) -> JourneysResponse:
+    """Search journeys on each date of a range, with the queries of a batch."""
+    try:
+        return JourneysResponse(await command.execute())
+    except FlightEventRetrievalError as e:
+        logging.error(f"Failed to retrieve flight events: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve flight events",
+        ) from e
+
+
+async def _prepend(
+    first_journey: Journey | None, journeys: AsyncIterator[Journey]
+) -> AsyncIterator[Journey]:
+    """Yield the journey already taken from an iterator, followed by the rest."""
+    if first_journey is None:
+        return
+    yield first_journey
+    async for journey in journeys:
+        yield journey
+
+
+@router.post("/search/batch", response_model=list[JourneySearchResult])
+async def search_batch(
+    batch: JourneySearchBatch,
+    settings: AppSettings,
+    flight_events_repository: FlightEventsRepository,
+    search_cache: SearchCache,
+    search_pool: JourneySearchPool,
+) -> JourneysResponse:
+    """POST /search/batch.
+
+    Search for journeys for many queries at once, against the same flight events.
+
+    Args:
+        batch: Request body. The queries to search journeys for.
+        settings: The application settings. From dependency injection.
+        flight_events_repository: The flight events repository. From dependency injection.
+        search_cache: Cache of the journey searches. From dependency injection.
+        search_pool: Pool of processes running large searches. From dependency injection.
+
+    Returns:
+        The journeys found for each distinct query, in the order they were requested.
+
+    """
+    command = SearchJourneysBatchCommand(
+        queries=batch.queries,
+        flight_events_repository=flight_events_repository,
+        settings=settings,
+        search_cache=search_cache,
+        search_pool=search_pool,
     )
     try:
-        return await command.execute()
+        return JourneysResponse(await command.execute())
     except FlightEventRetrievalError as e:
         logging.error(f"Failed to retrieve flight events: {e}")
         raise HTTPException(
@@ -0,0 +1,34 @@
+"""Routes for the metrics."""
+
+from fastapi import APIRouter, Request, status
+from fastapi.exceptions import HTTPException
+from fastapi.responses import PlainTextResponse
+
+from src.core.metrics import MetricsRegistry
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request) -> PlainTextResponse:
+    """GET /metrics.
+
+    Expose the metrics of the requests handled in the Prometheus text format.
+
+    Args:
+        request: The request, to reach the metrics kept by the application.
+
+    Returns:
+        The stage timing histograms and the counters.
+
+    """
+    registry: MetricsRegistry | None = getattr(request.app.state, "metrics", None)
+    if registry is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metrics are disabled")
+    search_cache = getattr(request.app.state, "journey_search_cache", None)
+    extra_counters = {}
+    if search_cache is not None:
+        extra_counters = {"cache_hits": search_cache.hits, "cache_misses": search_cache.misses}
+    return PlainTextResponse(
+        registry.render(extra_counters), media_type="text/plain; version=0.0.4"
+    )
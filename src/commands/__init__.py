@@ -1,5 +1,6 @@
 """Commands package with the business logic."""
 
 from .search_journeys import SearchJourneysCommand
+from .search_journeys_batch import SearchJourneysBatchCommand
 
-__all__ = ["SearchJourneysCommand"]
+__all__ = ["SearchJourneysBatchCommand", "SearchJourneysCommand"]
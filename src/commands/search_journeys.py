@@ -1,11 +1,73 @@
 """Search journeys command."""
 
+from collections.abc import AsyncIterator, Iterable, Iterator
 from datetime import UTC, date, datetime, timedelta
+from itertools import islice
+from typing import NamedTuple
 
 from src.commands.interface import CommandInterface
-from src.core.config import Settings
-from src.models.models import FlightEvent, Journey
-from src.repositories.flight_events.interface import FlightEventReadRepositoryInterface
+from src.core import metrics
+from src.core.config import SearchEngine, Settings
+from src.core.search_pool import SearchPool
+from src.models.flight_table import MICROSECOND, FlightTable, to_timestamp
+from src.models.models import FlightEvent, Journey, JourneySort
+from src.repositories.flight_events.interface import (
+    FlightEventQuery,
+    FlightEventReadRepositoryInterface,
+    FlightEventsChange,
+    FlightEventsSnapshot,
+)
+from src.search import (
+    DepartureIndex,
+    JourneySearchCache,
+    PathParameters,
+    SearchStats,
+    enumerate_paths,
+    rank_paths,
+    raptor_paths,
+)
+
+
+class JourneySearchKey(NamedTuple):
+    """Every input of a journey search, other than the flight events themselves."""
+
+    date: date
+    from_airport: str
+    to_airport: str
+    max_connections: int
+    max_connection_wait: timedelta
+    max_journey_duration: timedelta
+    engine: SearchEngine
+    sort: JourneySort | None
+    limit: int | None
+
+    def affected_by(self, flight_events: Iterable[FlightEvent]) -> bool:
+        """Check whether the search may find other journeys once some flight events change.
+
+        Journeys depart on the search date and last up to the max duration, so flight
+        events departing out of that window can't be part of them. Within it, a direct
+        journey is a flight between the airports searched, and a journey with a single
+        connection departs from the origin or arrives to the destination. With more
+        connections, the flights in between can be anywhere.
+
+        Args:
+            flight_events: The flight events removed from the feed or added to it.
+
+        """
+        start = to_timestamp(datetime.combine(self.date, datetime.min.time(), UTC))
+        end = to_timestamp(
+            datetime.combine(self.date, datetime.max.time(), UTC) + self.max_journey_duration
+        )
+        for flight_event in flight_events:
+            if not start <= to_timestamp(flight_event.departure_time) <= end:
+                continue
+            departs = flight_event.from_airport == self.from_airport
+            arrives = flight_event.to_airport == self.to_airport
+            if self.max_connections > 1 or (departs and arrives):
+                return True
+            if self.max_connections == 1 and (departs or arrives):
+                return True
+        return False
 
 
 class SearchJourneysCommand(CommandInterface):
@@ -18,107 +80,293 @@ class SearchJourneysCommand(CommandInterface):
         to_airport: str,
         flight_events_repository: FlightEventReadRepositoryInterface,
         settings: Settings,
+        sort: JourneySort | None = None,
+        limit: int | None = None,
+        search_cache: JourneySearchCache | None = None,
+        search_pool: SearchPool | None = None,
     ) -> None:
-        """Initialize the search journeys command."""
+        """Initialize the search journeys command.
+
+        Args:
+            date: The date the journeys depart on.
+            from_airport: The airport to depart from.
+            to_airport: The airport to arrive to.
+            flight_events_repository: Repository to retrieve the flight events from.
+            settings: The application settings.
+            sort: Criteria to rank the journeys. In departure order if not given.
+            limit: Max amount of journeys to find. All of them if not given.
+            search_cache: Cache of the journeys found by previous searches. Journeys are
+                always searched if not given.
+            search_pool: Pool of processes to run large searches in. Journeys are always
+                searched inline if not given.
+
+        """
         self.flight_events_repository = flight_events_repository
+        self.search_cache = search_cache
+        self.search_pool = search_pool
+        self.sort = sort
+        self.limit = limit
         self.min_departure_time = datetime.combine(date, datetime.min.time(), UTC)
+        self.max_departure_time = datetime.combine(date, datetime.max.time(), UTC)
         self.from_airport = from_airport
         self.to_airport = to_airport
         self.max_connections = settings.max_connections
         self.max_connecion_wait_time = timedelta(hours=settings.max_connextion_duration_hours)
         self.max_journey_duration = timedelta(hours=settings.max_journey_duration_hours)
+        self.engine = settings.journey_search_engine
+        # journeys start on the search date and can't last longer than the max duration,
+        # so no flight departing after that can be part of one
+        self.flight_events_query = FlightEventQuery(
+            departure_from=self.min_departure_time,
+            departure_to=self.max_departure_time + self.max_journey_duration,
+            from_airport=from_airport,
+            to_airport=to_airport,
+        )
+        self.cache_key = JourneySearchKey(
+            date,
+            from_airport,
+            to_airport,
+            self.max_connections,
+            self.max_connecion_wait_time,
+            self.max_journey_duration,
+            self.engine,
+            sort,
+            limit,
+        )
 
     async def execute(self) -> list[Journey]:
         """Search journeys for a given date, destination and origin."""
-        flight_events = await self.flight_events_repository.list()
-        relevant_events_mapping = self.__get_relevant_flight_events_mapping(flight_events)
-        return self.__find_journeys(relevant_events_mapping)
+        snapshot = await self.flight_events_repository.snapshot(self.flight_events_query)
+        journeys = self.cached_journeys(snapshot)
+        if journeys is None:
+            journeys = await self.find_journeys(snapshot, self.departure_index(snapshot))
+            self.cache_journeys(snapshot, journeys)
+        return journeys
 
-    def __get_relevant_flight_events_mapping(
-        self, flight_events: list[FlightEvent]
-    ) -> dict[str, list[FlightEvent]]:
-        """Get a mapping of relevant flight events.
+    async def iter_journeys(self) -> AsyncIterator[Journey]:
+        """Search journeys, yielding each one as soon as it is found."""
+        snapshot = await self.flight_events_repository.snapshot(self.flight_events_query)
+        cached_journeys = self.cached_journeys(snapshot)
+        if cached_journeys is not None:
+            for journey in cached_journeys:
+                yield journey
+            return
 
-        A flight event is relevant if its date and arrival dates are within the
-        search date plus settings.max_journey_duration_hours.
+        journeys = []
+        for journey in self.iter_search(self.departure_index(snapshot)):
+            journeys.append(journey)
+            yield journey
+        # only a search run to completion is cached
+        self.cache_journeys(snapshot, journeys)
+
+    def cached_journeys(self, snapshot: FlightEventsSnapshot) -> list[Journey] | None:
+        """Get the journeys cached for this search on a snapshot of the flight events.
 
         Args:
-            flight_events: List of flight events to be mapped
+            snapshot: The flight events the search runs against.
 
         Returns:
-            A mapping of relevant flight events that could be used to build a journey.
-            The key is the departure city, and the value is a list of flight events
-            departing from that city.
+            The journeys, or None if they aren't cached or the feed isn't versioned.
 
         """
-        relevant = {}
-        for flight_event in flight_events:
-            if self.min_departure_time <= flight_event.departure_time:
-                if flight_event.from_airport not in relevant:
-                    relevant[flight_event.from_airport] = []
-                relevant[flight_event.from_airport].append(flight_event)
-        return relevant
-
-    def __find_journeys(
-        self, relevant_events_mapping: dict[str, list[FlightEvent]]
+        if self.search_cache is None or snapshot.version is None:
+            return None
+        return self.search_cache.get(self.cache_key, snapshot.version)
+
+    def cache_journeys(self, snapshot: FlightEventsSnapshot, journeys: list[Journey]) -> None:
+        """Cache the journeys found by this search on a snapshot of the flight events.
+
+        Args:
+            snapshot: The flight events the search ran against.
+            journeys: The journeys found.
+
+        """
+        if self.search_cache is None or snapshot.version is None:
+            return
+        self.search_cache.set(self.cache_key, snapshot.version, journeys)
+
+    @staticmethod
+    def rebase_cache(search_cache: JourneySearchCache, change: FlightEventsChange) -> int:
+        """Carry the cached searches over to a new version of the feed, after a change.
+
+        Only the searches the changed flight events may affect are searched again.
+
+        Args:
+            search_cache: Cache of the journeys found by searches.
+            change: The change from the version the searches were cached for.
+
+        Returns:
+            The amount of searches removed from the cache.
+
+        """
+        if change.previous_version is None or change.version is None:
+            return 0
+        return search_cache.rebase(
+            change.previous_version,
+            change.version,
+            lambda key: (
+                isinstance(key, JourneySearchKey) and not key.affected_by(change.flight_events)
+            ),
+        )
+
+    @staticmethod
+    def departure_index(snapshot: FlightEventsSnapshot) -> DepartureIndex:
+        """Get the index of a snapshot of the flight events, building it if needed.
+
+        Args:
+            snapshot: The flight events to search, indexed by the repository or not.
+
+        Returns:
+            The index of the flight table of the snapshot.
+
+        """
+        if snapshot.departure_index is not None:
+            return snapshot.departure_index
+        with metrics.timed("index"):
+            return DepartureIndex(snapshot.flight_table)
+
+    async def find_journeys(
+        self, snapshot: FlightEventsSnapshot, departure_index: DepartureIndex
     ) -> list[Journey]:
-        """Get journeys from a mapping of relevant flight events."""
-        journeys = []
-        for flight_event in relevant_events_mapping.get(self.from_airport, []):
-            if flight_event.to_airport == self.to_airport:
-                journeys.append(Journey(path=[flight_event]))
-            else:
-                paths = self.__find_paths(
-                    flight_event.to_airport,
-                    [flight_event],
-                    relevant_events_mapping,
-                )
-                for path in paths:
-                    journeys.append(Journey(path=path))
-        return journeys
+        """Search journeys in the search pool, or inline if the search isn't large enough.
 
-    def __find_paths(
-        self,
-        from_airport: str,
-        path: list[FlightEvent],
-        relevant_events_mapping: dict[str, list[FlightEvent]],
-    ) -> list[FlightEvent]:
-        """Find valid paths from a given airport to the destination airport.
+        Only the paths engine runs in the pool, whose searches split by first flight.
 
         Args:
-            from_airport: The airport to start from
-            path: The current path of flight events
-            relevant_events_mapping: A mapping of relevant flight events
+            snapshot: The flight events to search.
+            departure_index: The index of the flight table of the snapshot.
 
         Returns:
-            A list of valid paths from the given airport to the destination airport
+            The journeys found.
 
         """
-        paths = []
-        for flight_event in relevant_events_mapping[from_airport]:
-            # discard paths with too many connections
-            if len(path) > self.max_connections:
-                break
-            if any(
-                [
-                    # discard paths with long connection times
-                    (flight_event.departure_time - path[-1].arrival_time)
-                    > self.max_connecion_wait_time,
-                    # discard paths with too long travel time across the journey
-                    (flight_event.arrival_time - path[0].departure_time)
-                    > self.max_journey_duration,
-                ]
-            ):
-                continue
+        parameters = self.path_parameters(departure_index.flight_table)
+        if (
+            self.search_pool is None
+            or parameters is None
+            or self.engine == SearchEngine.RAPTOR
+            or not self.search_pool.handles(snapshot, departure_index, parameters)
+        ):
+            return self.search(departure_index)
+
+        stats = SearchStats()
+        with metrics.timed("search"):
+            paths = await self.search_pool.search(
+                snapshot, departure_index, parameters, self.sort, self.limit, stats
+            )
+        return self.__journeys(departure_index.flight_table, paths, stats)
+
+    def search(self, departure_index: DepartureIndex) -> list[Journey]:
+        """Search journeys in an index of flight events, without retrieving them.
+
+        Args:
+            departure_index: An index including the flight events matching
+                `self.flight_events_query`.
+
+        Returns:
+            The journeys found.
+
+        """
+        stats = SearchStats()
+        with metrics.timed("search"):
+            paths = list(self.iter_paths(departure_index, stats))
+        return self.__journeys(departure_index.flight_table, paths, stats)
+
+    def iter_search(self, departure_index: DepartureIndex) -> Iterator[Journey]:
+        """Search journeys in an index of flight events, yielding them as they are found.
+
+        Args:
+            departure_index: An index including the flight events matching
+                `self.flight_events_query`.
+
+        Yields:
+            The journeys found.
+
+        """
+        paths = self.iter_paths(departure_index)
+        yield from self.build_journeys(departure_index.flight_table, paths)
+
+    def iter_paths(
+        self, departure_index: DepartureIndex, stats: SearchStats | None = None
+    ) -> Iterator[tuple[int, ...]]:
+        """Search the paths of the journeys in an index of flight events.
+
+        Journeys start with a flight departing on the search date. The search works
+        with rows of the flight table, without building any model.
+
+        Args:
+            departure_index: An index including the flight events matching
+                `self.flight_events_query`.
+            stats: Stats to add the work done by the search to.
 
-            if flight_event.to_airport == self.to_airport:
-                paths.append(path + [flight_event])
-            else:
-                paths.extend(
-                    self.__find_paths(
-                        flight_event.to_airport,
-                        path + [flight_event],
-                        relevant_events_mapping,
-                    )
-                )
-        return paths
+        Returns:
+            The paths found, as rows of the flight table.
+
+        """
+        parameters = self.path_parameters(departure_index.flight_table)
+        if parameters is None:
+            return iter(())
+        if self.engine == SearchEngine.RAPTOR:
+            return raptor_paths(departure_index, parameters, self.sort, self.limit, stats)
+        if self.sort is not None:
+            return rank_paths(departure_index, parameters, self.sort, self.limit, stats)
+        return islice(enumerate_paths(departure_index, parameters, stats=stats), self.limit)
+
+    def path_parameters(self, flight_table: FlightTable) -> PathParameters | None:
+        """Get the parameters of the search of paths in a flight table.
+
+        Args:
+            flight_table: The flight table to search.
+
+        Returns:
+            The parameters, or None if an airport of the search has no flights in it.
+
+        """
+        origin = flight_table.airport_id(self.from_airport)
+        destination = flight_table.airport_id(self.to_airport)
+        if origin is None or destination is None:
+            return None
+        return PathParameters(
+            origin=origin,
+            destination=destination,
+            departure_from=to_timestamp(self.min_departure_time),
+            departure_to=to_timestamp(self.max_departure_time),
+            max_connections=self.max_connections,
+            max_connection_wait=self.max_connecion_wait_time // MICROSECOND,
+            max_duration=self.max_journey_duration // MICROSECOND,
+        )
+
+    @staticmethod
+    def build_journeys(
+        flight_table: FlightTable, paths: Iterable[tuple[int, ...]]
+    ) -> Iterator[Journey]:
+        """Build the journeys of paths of a flight table.
+
+        Flight events are only built for the flights of the paths, once per flight, so
+        journeys share the models of the flights they have in common.
+
+        Args:
+            flight_table: The flight table the paths were found in.
+            paths: The paths, as rows of the flight table.
+
+        Yields:
+            The journey of each path.
+
+        """
+        flight_events: dict[int, FlightEvent] = {}
+        for path in paths:
+            for row in path:
+                if row not in flight_events:
+                    flight_events[row] = flight_table[row]
+            # the flight events come from the table already valid, so they aren't validated
+            yield Journey.model_construct(path=[flight_events[row] for row in path])
+
+    def __journeys(
+        self, flight_table: FlightTable, paths: list[tuple[int, ...]], stats: SearchStats
+    ) -> list[Journey]:
+        """Build the journeys of the paths found by a search, recording its metrics."""
+        with metrics.timed("journeys"):
+            journeys = list(self.build_journeys(flight_table, paths))
+        metrics.count("nodes_expanded", stats.expanded)
+        metrics.count("journeys", len(journeys))
+        return journeys
@@ -0,0 +1,100 @@
+"""Search journeys batch command."""
+
+from datetime import UTC, datetime, timedelta
+
+from src.commands.interface import CommandInterface
+from src.commands.search_journeys import SearchJourneysCommand
+from src.core.config import Settings
+from src.core.search_pool import SearchPool
+from src.models.models import JourneySearchQuery, JourneySearchResult, JourneySort
+from src.repositories.flight_events.interface import (
+    FlightEventQuery,
+    FlightEventReadRepositoryInterface,
+)
+from src.search import DepartureIndex, JourneySearchCache
+
+
+class SearchJourneysBatchCommand(CommandInterface):
+    """Search journeys for many queries at once.
+
+    All the queries are resolved against the same snapshot of the flight events and
+    the same departure index, so the flight events are retrieved and indexed once. A
+    search over a range of dates is a batch with a query per date.
+    """
+
+    def __init__(
+        self,
+        queries: list[JourneySearchQuery],
+        flight_events_repository: FlightEventReadRepositoryInterface,
+        settings: Settings,
+        search_cache: JourneySearchCache | None = None,
+        sort: JourneySort | None = None,
+        limit: int | None = None,
+        search_pool: SearchPool | None = None,
+    ) -> None:
+        """Initialize the search journeys batch command.
+
+        Args:
+            queries: The searches to run.
+            flight_events_repository: Repository to retrieve the flight events from.
+            settings: The application settings.
+            search_cache: Cache of the journeys found by previous searches. Journeys are
+                always searched if not given.
+            sort: Criteria to rank the journeys of each query. In departure order if not
+                given.
+            limit: Max amount of journeys to find for each query. All of them if not given.
+            search_pool: Pool of processes to run large searches in. Journeys are always
+                searched inline if not given.
+
+        """
+        self.flight_events_repository = flight_events_repository
+        self.search_cache = search_cache
+        self.settings = settings
+        self.sort = sort
+        self.limit = limit
+        self.search_pool = search_pool
+        # identical queries are searched once, keeping the order they were requested
+        self.queries = list(dict.fromkeys(queries))
+
+    async def execute(self) -> list[JourneySearchResult]:
+        """Search journeys for every distinct query."""
+        if not self.queries:
+            return []
+
+        commands = [
+            SearchJourneysCommand(
+                date=query.date,
+                from_airport=query.from_airport,
+                to_airport=query.to_airport,
+                flight_events_repository=self.flight_events_repository,
+                settings=self.settings,
+                sort=self.sort,
+                limit=self.limit,
+                search_cache=self.search_cache,
+                search_pool=self.search_pool,
+            )
+            for query in self.queries
+        ]
+        snapshot = await self.flight_events_repository.snapshot(self.__flight_events_query())
+        # the flight events are only indexed if some query isn't cached
+        departure_index: DepartureIndex | None = None
+        results = []
+        for query, command in zip(self.queries, commands, strict=True):
+            journeys = command.cached_journeys(snapshot)
+            if journeys is None:
+                if departure_index is None:
+                    departure_index = command.departure_index(snapshot)
+                journeys = await command.find_journeys(snapshot, departure_index)
+                command.cache_journeys(snapshot, journeys)
+            results.append(JourneySearchResult(query=query, journeys=journeys))
+        return results
+
+    def __flight_events_query(self) -> FlightEventQuery:
+        """Get a query covering the flight events of every search in the batch."""
+        first_date = min(query.date for query in self.queries)
+        last_date = max(query.date for query in self.queries)
+        return FlightEventQuery(
+            departure_from=datetime.combine(first_date, datetime.min.time(), UTC),
+            departure_to=datetime.combine(last_date, datetime.max.time(), UTC)
+            + timedelta(hours=self.settings.max_journey_duration_hours),
+        )
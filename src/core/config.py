@@ -1,8 +1,19 @@
 """Application configuration."""
 
+from enum import StrEnum
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class SearchEngine(StrEnum):
+    """Algorithms to search journeys with."""
+
+    # every valid journey, from the enumeration of the paths
+    PATHS = "paths"
+    # the Pareto-optimal journeys, from a round-based search
+    RAPTOR = "raptor"
+
+
 class Settings(BaseSettings):
     """Application configuration."""
 
@@ -10,5 +21,23 @@ class Settings(BaseSettings):
     max_connections: int
     max_journey_duration_hours: int
     max_connextion_duration_hours: int
+    flight_events_cache_ttl_seconds: float = 300
+    flight_events_max_staleness_seconds: float = 0
+    flight_events_refresh_interval_seconds: float = 0
+    flight_events_changes_url: str | None = None
+    flight_events_api_supports_query: bool = False
+    flight_events_snapshot_path: str | None = None
+    flight_events_file_path: str | None = None
+    journey_search_cache_size: int = 1024
+    journey_search_engine: SearchEngine = SearchEngine.PATHS
+    journey_search_workers: int = 0
+    journey_search_parallel_threshold: int = 20000
+    metrics_enabled: bool = False
+    http2: bool = True
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30
+    http_timeout_seconds: float = 10
+    http_connect_timeout_seconds: float = 5
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
@@ -3,9 +3,17 @@
 from functools import lru_cache
 from typing import Annotated
 
-from fastapi import Depends
+import httpx
+from fastapi import Depends, Request
 
 from src.core.config import Settings
+from src.core.search_pool import SearchPool
+from src.repositories.flight_events import (
+    FlightEventReadRepositoryInterface,
+    FlightEventsAPIRepository,
+    FlightEventsFileRepository,
+)
+from src.search import JourneySearchCache
 
 
 @lru_cache
@@ -15,3 +23,41 @@ def get_settings() -> Settings:
 
 
 AppSettings = Annotated[Settings, Depends(get_settings)]
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    """Get the HTTP client shared across requests, created by the app lifespan."""
+    return request.app.state.http_client
+
+
+HTTPClient = Annotated[httpx.AsyncClient, Depends(get_http_client)]
+
+
+def get_flight_events_repository(
+    settings: AppSettings, http_client: HTTPClient
+) -> FlightEventReadRepositoryInterface:
+    """Get the flight events repository, reading the feed from a file if one is configured."""
+    if settings.flight_events_file_path is not None:
+        return FlightEventsFileRepository(settings.flight_events_file_path)
+    return FlightEventsAPIRepository(settings, http_client)
+
+
+FlightEventsRepository = Annotated[
+    FlightEventReadRepositoryInterface, Depends(get_flight_events_repository)
+]
+
+
+def get_journey_search_cache(request: Request) -> JourneySearchCache:
+    """Get the cache of journey searches shared across requests, created by the app lifespan."""
+    return request.app.state.journey_search_cache
+
+
+SearchCache = Annotated[JourneySearchCache, Depends(get_journey_search_cache)]
+
+
+def get_journey_search_pool(request: Request) -> SearchPool | None:
+    """Get the pool of processes searching journeys, None if the lifespan didn't create one."""
+    return getattr(request.app.state, "journey_search_pool", None)
+
+
+JourneySearchPool = Annotated[SearchPool | None, Depends(get_journey_search_pool)]
@@ -0,0 +1,25 @@
+"""HTTP client configuration."""
+
+import httpx
+
+from src.core.config import Settings
+
+
+def create_http_client(settings: Settings) -> httpx.AsyncClient:
+    """Create the HTTP client shared by the application to call upstream APIs.
+
+    Reusing one client across requests keeps connections alive in its pool, so
+    requests don't pay for a new TCP and TLS handshake every time.
+    """
+    return httpx.AsyncClient(
+        http2=settings.http2,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        ),
+        timeout=httpx.Timeout(
+            settings.http_timeout_seconds,
+            connect=settings.http_connect_timeout_seconds,
+        ),
+    )
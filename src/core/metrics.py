@@ -0,0 +1,130 @@
+"""In-process metrics of the journey searches."""
+
+import time
+from bisect import bisect_left
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+# upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass(slots=True)
+class RequestMetrics:
+    """Metrics recorded while handling a request.
+
+    Attributes:
+        timings: Seconds spent in each stage, in the order they ran.
+        counters: Amount counted of each counter.
+
+    """
+
+    timings: dict[str, float] = field(default_factory=dict)
+    counters: dict[str, int] = field(default_factory=dict)
+
+
+_request_metrics: ContextVar[RequestMetrics | None] = ContextVar("request_metrics", default=None)
+
+
+@contextmanager
+def recording() -> Iterator[RequestMetrics]:
+    """Record the metrics of the stages run in the block, in the current context."""
+    request_metrics = RequestMetrics()
+    token = _request_metrics.set(request_metrics)
+    try:
+        yield request_metrics
+    finally:
+        _request_metrics.reset(token)
+
+
+def record(stage: str, seconds: float) -> None:
+    """Record the time spent in a stage of the current request, if recording."""
+    request_metrics = _request_metrics.get()
+    if request_metrics is not None:
+        timings = request_metrics.timings
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Record the time spent in the block as a stage of the current request, if recording."""
+    if _request_metrics.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Add to a counter of the current request, if recording."""
+    request_metrics = _request_metrics.get()
+    if request_metrics is not None:
+        counters = request_metrics.counters
+        counters[name] = counters.get(name, 0) + amount
+
+
+class Histogram:
+    """Histogram of durations, with cumulative buckets like Prometheus."""
+
+    def __init__(self) -> None:
+        """Initialize an empty histogram."""
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        """Add a duration to the histogram."""
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Histograms of the stage timings and counters of every request handled."""
+
+    def __init__(self) -> None:
+        """Initialize the registry without any request."""
+        self.histograms: dict[str, Histogram] = {}
+        self.counters: dict[str, int] = {}
+
+    def collect(self, request_metrics: RequestMetrics) -> None:
+        """Add the metrics recorded during a request."""
+        for stage, seconds in request_metrics.timings.items():
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+        for name, amount in request_metrics.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def render(self, extra_counters: dict[str, int] | None = None) -> str:
+        """Render the metrics in the Prometheus text exposition format.
+
+        Args:
+            extra_counters: Counters kept elsewhere, to expose along with the registry ones.
+
+        """
+        lines = [
+            "# HELP journey_search_stage_seconds Time spent in each stage of the requests.",
+            "# TYPE journey_search_stage_seconds histogram",
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, amount in zip((*BUCKETS, "+Inf"), histogram.buckets, strict=True):
+                cumulative += amount
+                lines.append(
+                    f'journey_search_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(f'journey_search_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'journey_search_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        counters = {**self.counters, **(extra_counters or {})}
+        for name, amount in sorted(counters.items()):
+            lines.append(f"# TYPE journey_search_{name}_total counter")
+            lines.append(f"journey_search_{name}_total {amount}")
+        return "\n".join(lines) + "\n"
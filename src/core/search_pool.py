@@ -0,0 +1,223 @@
+"""Process pool running large path searches in parallel, off the event loop."""
+
+import asyncio
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from itertools import chain, islice
+from pathlib import Path
+
+from src.models import JourneySort
+from src.repositories.flight_events import (
+    FlightEventsSnapshot,
+    read_snapshot_file,
+    write_snapshot_file,
+)
+from src.repositories.flight_events.cache import CachedFlightEvents
+from src.search import (
+    DepartureIndex,
+    PathParameters,
+    SearchStats,
+    enumerate_paths,
+    merge_ranked_paths,
+    rank_paths,
+    split_departure_window,
+)
+
+# snapshot files kept for the workers, older ones are removed as new feeds are searched
+SNAPSHOT_FILES = 2
+# partitions of a search per worker, so workers with lighter ones take more of them
+PARTITIONS_PER_WORKER = 2
+
+# index of the latest feed read by a worker process, by the snapshot file it was read from
+_worker_indexes: dict[Path, DepartureIndex] = {}
+
+
+class SearchPool:
+    """Pool of processes searching the paths of large searches in parallel.
+
+    The departure window of a search is split into windows with about as many first
+    flights, searched by the workers at once, while the event loop keeps serving
+    other requests. The indexed flight events are written to a snapshot file once per
+    feed version, that each worker reads once and keeps, so tasks only carry the
+    search parameters instead of the flight events.
+
+    Searches with fewer relevant flight events than the threshold run inline, as
+    sending them to the pool costs more than they take.
+    """
+
+    def __init__(self, workers: int, threshold: int) -> None:
+        """Initialize the pool, whose processes are started on the first search.
+
+        Args:
+            workers: Amount of processes.
+            threshold: Flight events departing within the time window of a search,
+                from which it runs in the pool.
+
+        """
+        self.workers = workers
+        self.threshold = threshold
+        # workers are spawned, as forking a process running threads can deadlock it
+        self.executor = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._directory = tempfile.TemporaryDirectory(prefix="journey-search-")
+        # file of each of the latest feeds, along with the task writing it
+        self._snapshot_files: dict[str, tuple[Path, asyncio.Future[None]]] = {}
+        # searches reading each file, which is only removed once none is left
+        self._searches: dict[Path, int] = {}
+        self._written = 0
+
+    def handles(
+        self,
+        snapshot: FlightEventsSnapshot,
+        departure_index: DepartureIndex,
+        parameters: PathParameters,
+    ) -> bool:
+        """Check whether a search runs in the pool.
+
+        Args:
+            snapshot: The flight events searched. Only versioned snapshots are shared
+                with the workers.
+            departure_index: Index of the flight table of the snapshot.
+            parameters: Parameters of the search.
+
+        """
+        if snapshot.version is None:
+            return False
+        relevant = departure_index.departures_count(
+            parameters.departure_from, parameters.departure_to + parameters.max_duration
+        )
+        return relevant >= self.threshold
+
+    async def search(
+        self,
+        snapshot: FlightEventsSnapshot,
+        departure_index: DepartureIndex,
+        parameters: PathParameters,
+        sort: JourneySort | None = None,
+        limit: int | None = None,
+        stats: SearchStats | None = None,
+    ) -> list[tuple[int, ...]]:
+        """Search paths in the pool, as `enumerate_paths` or `rank_paths` would.
+
+        Args:
+            snapshot: The flight events to search, with a version.
+            departure_index: Index of the flight table of the snapshot.
+            parameters: Parameters of the search.
+            sort: Criteria to rank the paths. In departure order if not given.
+            limit: Max amount of paths to find. All of them if not given.
+            stats: Stats to add the work done by the workers to.
+
+        Returns:
+            The paths, as rows of the flight table.
+
+        """
+        path = await self.__acquire_snapshot_file(snapshot, departure_index)
+        try:
+            loop = asyncio.get_running_loop()
+            windows = split_departure_window(
+                departure_index, parameters, self.workers * PARTITIONS_PER_WORKER
+            )
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        self.executor, _search_partition, path, window, sort, limit
+                    )
+                    for window in windows
+                )
+            )
+        finally:
+            self.__release_snapshot_file(path)
+        if stats is not None:
+            stats.expanded += sum(expanded for _, expanded in results)
+        partitions = [paths for paths, _ in results]
+        if sort is None:
+            return list(islice(chain.from_iterable(partitions), limit))
+        return merge_ranked_paths(departure_index, sort, partitions, limit)
+
+    def close(self) -> None:
+        """Stop the worker processes and remove the snapshot files."""
+        self.executor.shutdown(cancel_futures=True)
+        self._directory.cleanup()
+
+    async def __acquire_snapshot_file(
+        self, snapshot: FlightEventsSnapshot, departure_index: DepartureIndex
+    ) -> Path:
+        """Get the snapshot file of a feed for a search, writing it the first time.
+
+        The file is written in a thread, once for the searches of the feed arriving
+        meanwhile, and kept until `__release_snapshot_file` is called for the search.
+        """
+        # snapshots with the same version hold the same flight table, also the ones
+        # only holding a window of the feed, so the rows of the file match the search
+        version = snapshot.version or ""
+        snapshot_file = self._snapshot_files.get(version)
+        if snapshot_file is None:
+            self._written += 1
+            path = Path(self._directory.name, f"{self._written}.snapshot")
+            entry = CachedFlightEvents(
+                snapshot=replace(snapshot, departure_index=departure_index),
+                etag=None,
+                last_modified=None,
+                fetched_at=time.monotonic(),
+            )
+            written = asyncio.ensure_future(asyncio.to_thread(write_snapshot_file, path, entry))
+            snapshot_file = self._snapshot_files[version] = (path, written)
+            while len(self._snapshot_files) > SNAPSHOT_FILES:
+                oldest, _ = self._snapshot_files.pop(next(iter(self._snapshot_files)))
+                # workers keep the index they read, so the file is only needed by the
+                # searches queued on it
+                if oldest not in self._searches:
+                    oldest.unlink(missing_ok=True)
+
+        path, written = snapshot_file
+        self._searches[path] = self._searches.get(path, 0) + 1
+        try:
+            # the write is shared, so a cancelled search leaves it to the others
+            await asyncio.shield(written)
+        except BaseException:
+            if written.done() and self._snapshot_files.get(version) is snapshot_file:
+                # a file that failed to be written is written again by the next search
+                del self._snapshot_files[version]
+            self.__release_snapshot_file(path)
+            raise
+        return path
+
+    def __release_snapshot_file(self, path: Path) -> None:
+        """Release the snapshot file of a search, removing it if it's no longer needed."""
+        self._searches[path] -= 1
+        if self._searches[path]:
+            return
+        del self._searches[path]
+        if all(path != kept for kept, _ in self._snapshot_files.values()):
+            path.unlink(missing_ok=True)
+
+
+def _search_partition(
+    path: Path,
+    parameters: PathParameters,
+    sort: JourneySort | None,
+    limit: int | None,
+) -> tuple[list[tuple[int, ...]], int]:
+    """Search the paths of a partition in a worker, reading the snapshot file once.
+
+    Returns:
+        The paths and the flights expanded by the search.
+
+    """
+    departure_index = _worker_indexes.get(path)
+    if departure_index is None:
+        _worker_indexes.clear()
+        snapshot = read_snapshot_file(path).snapshot
+        departure_index = snapshot.departure_index or DepartureIndex(snapshot.flight_table)
+        _worker_indexes[path] = departure_index
+
+    stats = SearchStats()
+    if sort is None:
+        paths = list(islice(enumerate_paths(departure_index, parameters, stats=stats), limit))
+    else:
+        paths = list(rank_paths(departure_index, parameters, sort, limit, stats))
+    return paths, stats.expanded
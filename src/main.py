@@ -1,9 +1,74 @@
 """Main module."""
 
+import asyncio
+import contextlib
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from functools import partial
+
 from fastapi import FastAPI
 
+from src.api.middleware import ServerTimingMiddleware
 from src.api.routes.journeys import router as journeys_router
+from src.api.routes.metrics import router as metrics_router
+from src.commands import SearchJourneysCommand
+from src.core.dependencies import get_settings
+from src.core.http import create_http_client
+from src.core.metrics import MetricsRegistry
+from src.core.search_pool import SearchPool
+from src.repositories.flight_events import FlightEventsAPIRepository, FlightEventsRefresher
+from src.search import JourneySearchCache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Manage the resources shared across requests during the app lifetime."""
+    settings = get_settings()
+    app.state.journey_search_cache = JourneySearchCache(settings.journey_search_cache_size)
+    app.state.metrics = MetricsRegistry() if settings.metrics_enabled else None
+    app.state.journey_search_pool = None
+    if settings.journey_search_workers > 0:
+        app.state.journey_search_pool = SearchPool(
+            settings.journey_search_workers, settings.journey_search_parallel_threshold
+        )
+    async with create_http_client(settings) as http_client:
+        app.state.http_client = http_client
+        repository = FlightEventsAPIRepository(settings, http_client)
+        # the feed is only fetched from the API when it isn't read from a file
+        from_api = settings.flight_events_file_path is None
+        if from_api and settings.flight_events_snapshot_path is not None:
+            # a missing or unreadable snapshot only means the feed is fetched on demand
+            try:
+                repository.load_snapshot_file(settings.flight_events_snapshot_path)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Failed to load flight events snapshot: {e}")
+        refresher = None
+        if from_api and settings.flight_events_refresh_interval_seconds > 0:
+            refresher = asyncio.create_task(
+                FlightEventsRefresher(
+                    repository,
+                    settings.flight_events_refresh_interval_seconds,
+                    # changes to the feed only invalidate the searches they affect
+                    on_change=partial(
+                        SearchJourneysCommand.rebase_cache, app.state.journey_search_cache
+                    ),
+                ).run()
+            )
+        try:
+            yield
+        finally:
+            if refresher is not None:
+                refresher.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await refresher
+            if app.state.journey_search_pool is not None:
+                app.state.journey_search_pool.close()
+                app.state.journey_search_pool = None
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ServerTimingMiddleware)
 
 app.include_router(journeys_router, prefix="/journeys")
+app.include_router(metrics_router)
@@ -1,5 +1,28 @@
 """Models subpackage."""
 
-from .models import Airport, FlightEvent, Journey
+from .flight_table import FlightTable, FlightTableBuilder
+from .models import (
+    Airport,
+    FlightEvent,
+    Journey,
+    JourneySearchBatch,
+    JourneySearchQuery,
+    JourneySearchResult,
+    JourneysFormat,
+    JourneySort,
+    NormalizedJourneys,
+)
 
-__all__ = ["Airport", "FlightEvent", "Journey"]
+__all__ = [
+    "Airport",
+    "FlightEvent",
+    "FlightTable",
+    "FlightTableBuilder",
+    "Journey",
+    "JourneySearchBatch",
+    "JourneySearchQuery",
+    "JourneySearchResult",
+    "JourneySort",
+    "JourneysFormat",
+    "NormalizedJourneys",
+]
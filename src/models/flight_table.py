@@ -0,0 +1,191 @@
+"""Columnar storage of flight events."""
+
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from datetime import UTC, datetime, timedelta, timezone
+
+from .models import FlightEvent
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+MICROSECOND = timedelta(microseconds=1)
+# utc offset stored for naive datetimes, which are interpreted as UTC
+NAIVE = -(2**31)
+# columns of the table with a value per row, or per row and one more for the offsets
+_COLUMNS = (
+    "flight_number_offsets",
+    "from_airports",
+    "to_airports",
+    "departure_times",
+    "arrival_times",
+    "departure_offsets",
+    "arrival_offsets",
+)
+
+
+def to_timestamp(dt: datetime) -> int:
+    """Convert a datetime to microseconds since the epoch, naive datetimes being UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return (dt - EPOCH) // MICROSECOND
+
+
+class FlightTable(Sequence[FlightEvent]):
+    """Flight events stored by columns.
+
+    Times are stored as microseconds since the epoch, along with their UTC offset to
+    build back the same datetimes. Airports are interned to small integer ids, so the
+    search compares integers instead of hashing strings, and flight numbers are
+    concatenated in a single string indexed by offsets.
+
+    A row takes a few dozen bytes instead of the hundreds of a `FlightEvent`, which is
+    only built when a row is accessed as an item of the sequence.
+    """
+
+    __slots__ = (
+        "airports",
+        "airport_ids",
+        "flight_numbers",
+        "flight_number_offsets",
+        "from_airports",
+        "to_airports",
+        "departure_times",
+        "arrival_times",
+        "departure_offsets",
+        "arrival_offsets",
+        "_timezones",
+    )
+
+    def __init__(self) -> None:
+        """Initialize an empty table."""
+        self.airports: list[str] = []
+        self.airport_ids: dict[str, int] = {}
+        self.flight_numbers = ""
+        self.flight_number_offsets = array("I", [0])
+        # there are 26^3 possible airport codes, so ids fit in 16 bits
+        self.from_airports = array("H")
+        self.to_airports = array("H")
+        self.departure_times = array("q")
+        self.arrival_times = array("q")
+        self.departure_offsets = array("i")
+        self.arrival_offsets = array("i")
+        self._timezones: dict[int, timezone] = {}
+
+    @classmethod
+    def from_events(cls, flight_events: Iterable[FlightEvent]) -> "FlightTable":
+        """Build a table from flight events."""
+        builder = FlightTableBuilder()
+        for flight_event in flight_events:
+            builder.append(flight_event)
+        return builder.build()
+
+    def __len__(self) -> int:
+        """Amount of flight events in the table."""
+        return len(self.departure_times)
+
+    def __getitem__(self, row: int) -> FlightEvent:  # type: ignore[override]
+        """Build the flight event stored in a row."""
+        if row < 0:
+            row += len(self)
+        start, end = self.flight_number_offsets[row], self.flight_number_offsets[row + 1]
+        # values were validated when the row was added
+        return FlightEvent.model_construct(
+            flight_number=self.flight_numbers[start:end],
+            from_airport=self.airports[self.from_airports[row]],
+            to_airport=self.airports[self.to_airports[row]],
+            departure_time=self.__to_datetime(
+                self.departure_times[row], self.departure_offsets[row]
+            ),
+            arrival_time=self.__to_datetime(self.arrival_times[row], self.arrival_offsets[row]),
+        )
+
+    def __iter__(self) -> Iterator[FlightEvent]:
+        """Iterate over the flight events in the table."""
+        return (self[row] for row in range(len(self)))
+
+    def copy(self) -> "FlightTable":
+        """Copy the table, so rows can be appended to the copy without changing it."""
+        table = FlightTable()
+        table.airports = list(self.airports)
+        table.airport_ids = dict(self.airport_ids)
+        table.flight_numbers = self.flight_numbers
+        for column in _COLUMNS:
+            setattr(table, column, getattr(self, column)[:])
+        return table
+
+    def airport_id(self, airport: str) -> int | None:
+        """Get the id of an airport, or None if no flight departs or arrives there."""
+        return self.airport_ids.get(airport)
+
+    def departing(self, start: datetime | None = None, end: datetime | None = None) -> list[int]:
+        """Get the rows of the flight events departing within a time window.
+
+        Args:
+            start: Earliest departure time, inclusive. Unbounded if not given.
+            end: Latest departure time, inclusive. Unbounded if not given.
+
+        Returns:
+            The rows in table order.
+
+        """
+        low = -(2**63) if start is None else to_timestamp(start)
+        high = 2**63 - 1 if end is None else to_timestamp(end)
+        return [row for row, time in enumerate(self.departure_times) if low <= time <= high]
+
+    def __to_datetime(self, timestamp: int, utc_offset: int) -> datetime:
+        """Build a datetime from its timestamp and utc offset."""
+        dt = EPOCH + timestamp * MICROSECOND
+        if utc_offset == NAIVE:
+            return dt.replace(tzinfo=None)
+        if utc_offset == 0:
+            return dt
+        tz = self._timezones.get(utc_offset)
+        if tz is None:
+            tz = self._timezones[utc_offset] = timezone(timedelta(seconds=utc_offset))
+        return dt.astimezone(tz)
+
+
+class FlightTableBuilder:
+    """Builder of a flight table, appending one flight event at a time."""
+
+    def __init__(self, flight_table: FlightTable | None = None) -> None:
+        """Initialize the builder.
+
+        Args:
+            flight_table: Table to append the flight events to. An empty one if not given.
+
+        """
+        self._table = FlightTable() if flight_table is None else flight_table
+        self._flight_numbers = [self._table.flight_numbers]
+        self._flight_numbers_length = len(self._table.flight_numbers)
+
+    def append(self, flight_event: FlightEvent) -> None:
+        """Append a flight event to the table."""
+        table = self._table
+        self._flight_numbers.append(flight_event.flight_number)
+        self._flight_numbers_length += len(flight_event.flight_number)
+        table.flight_number_offsets.append(self._flight_numbers_length)
+        table.from_airports.append(self.__intern(flight_event.from_airport))
+        table.to_airports.append(self.__intern(flight_event.to_airport))
+        table.departure_times.append(to_timestamp(flight_event.departure_time))
+        table.arrival_times.append(to_timestamp(flight_event.arrival_time))
+        table.departure_offsets.append(_utc_offset(flight_event.departure_time))
+        table.arrival_offsets.append(_utc_offset(flight_event.arrival_time))
+
+    def build(self) -> FlightTable:
+        """Get the built table."""
+        self._table.flight_numbers = "".join(self._flight_numbers)
+        return self._table
+
+    def __intern(self, airport: str) -> int:
+        """Get the id of an airport, adding it to the table if needed."""
+        airport_id = self._table.airport_ids.get(airport)
+        if airport_id is None:
+            airport_id = self._table.airport_ids[airport] = len(self._table.airports)
+            self._table.airports.append(airport)
+        return airport_id
+
+
+def _utc_offset(dt: datetime) -> int:
+    """Get the UTC offset of a datetime in seconds."""
+    offset = dt.utcoffset()
+    return NAIVE if offset is None else offset // timedelta(seconds=1)
@@ -1,11 +1,13 @@
 """Models that represent business entities."""
 
-from datetime import datetime
+from datetime import date, datetime
+from enum import StrEnum
 from functools import cached_property
 from typing import Annotated
 
 from pydantic import (
     BaseModel,
+    ConfigDict,
     Field,
     FieldSerializationInfo,
     computed_field,
@@ -40,3 +42,48 @@ class Journey(BaseModel):
     def connections(self) -> int:
         """Amount of connections between flights."""
         return len(self.path) - 1
+
+
+class JourneySort(StrEnum):
+    """Criteria to rank journeys."""
+
+    EARLIEST_ARRIVAL = "earliest_arrival"
+    SHORTEST_DURATION = "shortest_duration"
+    FEWEST_CONNECTIONS = "fewest_connections"
+
+
+class JourneysFormat(StrEnum):
+    """Formats to respond journeys in."""
+
+    FULL = "full"
+    NORMALIZED = "normalized"
+
+
+class NormalizedJourneys(BaseModel):
+    """Journeys referencing their legs by index in a table of distinct flight events."""
+
+    legs: list[FlightEvent]
+    journeys: list[list[int]]
+
+
+class JourneySearchQuery(BaseModel):
+    """Search of journeys between two airports on a given date."""
+
+    model_config = ConfigDict(frozen=True, populate_by_name=True)
+
+    date: date
+    from_airport: Airport = Field(alias="from")
+    to_airport: Airport = Field(alias="to")
+
+
+class JourneySearchBatch(BaseModel):
+    """Batch of journey searches."""
+
+    queries: list[JourneySearchQuery] = Field(min_length=1, max_length=100)
+
+
+class JourneySearchResult(BaseModel):
+    """Journeys found for a search."""
+
+    query: JourneySearchQuery
+    journeys: list[Journey]
@@ -1,11 +1,30 @@
 """Flight events repository."""
 
+from .cache import flight_events_cache
 from .exceptions import FlightEventRetrievalError
-from .interface import FlightEventReadRepositoryInterface
+from .interface import (
+    FlightEventQuery,
+    FlightEventReadRepositoryInterface,
+    FlightEventsChange,
+    FlightEventsSnapshot,
+)
 from .main import FlightEventsAPIRepository
+from .mapped_file import FlightEventsFileRepository, convert_feed_file
+from .refresher import FlightEventsRefresher
+from .snapshot_file import map_snapshot_file, read_snapshot_file, write_snapshot_file
 
 __all__ = [
+    "FlightEventQuery",
     "FlightEventReadRepositoryInterface",
     "FlightEventsAPIRepository",
+    "FlightEventsFileRepository",
+    "FlightEventsRefresher",
     "FlightEventRetrievalError",
+    "FlightEventsChange",
+    "FlightEventsSnapshot",
+    "convert_feed_file",
+    "flight_events_cache",
+    "map_snapshot_file",
+    "read_snapshot_file",
+    "write_snapshot_file",
 ]
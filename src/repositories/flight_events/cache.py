@@ -0,0 +1,141 @@
+"""Process-wide cache for the flight events feed."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Coroutine, Hashable
+from dataclasses import dataclass, replace
+from typing import Any
+
+from .interface import FlightEventsSnapshot
+
+# the whole feed, and the latest windows queried when the API supports queries
+MAX_CACHED_FEEDS = 32
+
+
+@dataclass(frozen=True, slots=True)
+class CachedFlightEvents:
+    """Cache entry with a snapshot of the feed and its HTTP validators."""
+
+    snapshot: FlightEventsSnapshot
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+    @property
+    def age(self) -> float:
+        """Seconds since the feed was fetched or revalidated."""
+        return time.monotonic() - self.fetched_at
+
+    def revalidated(self) -> "CachedFlightEvents":
+        """Get a copy of the entry marked as fresh, after the upstream confirmed it."""
+        return replace(self, fetched_at=time.monotonic())
+
+
+class FlightEventsCache:
+    """In-memory cache of parsed feeds, keyed by feed URL, evicting the least recently used.
+
+    A single instance lives at module level, so the cached feed survives across
+    requests for the whole life of the process or warm Lambda container. When the
+    query is forwarded to the API, each window gets its own URL, so the amount of
+    feeds is bounded to keep the memory of the process bounded too.
+    """
+
+    def __init__(self, maxsize: int = MAX_CACHED_FEEDS) -> None:
+        """Initialize an empty cache.
+
+        Args:
+            maxsize: Max amount of feeds cached.
+
+        """
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, CachedFlightEvents] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Amount of feeds cached."""
+        return len(self._entries)
+
+    def get(self, key: str) -> CachedFlightEvents | None:
+        """Get the cache entry of a feed, if any."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CachedFlightEvents) -> None:
+        """Store the cache entry of a feed."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every cache entry."""
+        self._entries.clear()
+
+
+class FlightEventsFetches:
+    """Fetches of feeds in progress, shared by the concurrent callers needing them.
+
+    Under a burst of requests, the first one needing a feed starts fetching it and
+    the rest await the same fetch, instead of each one downloading and parsing the
+    feed again. A single instance lives at module level, like the cache.
+    """
+
+    def __init__(self) -> None:
+        """Initialize without fetches in progress."""
+        self._tasks: dict[Hashable, asyncio.Task[CachedFlightEvents]] = {}
+
+    def start(
+        self, key: Hashable, fetch: Callable[[], Coroutine[Any, Any, CachedFlightEvents]]
+    ) -> asyncio.Task[CachedFlightEvents]:
+        """Start a fetch, unless one with the same key is in progress.
+
+        Args:
+            key: Identifies the fetch, so only fetches with the same result are shared.
+            fetch: Starts the fetch, only called if none is in progress.
+
+        Returns:
+            The task of the fetch in progress.
+
+        """
+        task = self._tasks.get(key)
+        # a fetch left in progress by an event loop that was closed can't be awaited
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.create_task(fetch())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self.__remove(key, task))
+        return task
+
+    async def run(
+        self, key: Hashable, fetch: Callable[[], Coroutine[Any, Any, CachedFlightEvents]]
+    ) -> CachedFlightEvents:
+        """Run a fetch, or await the one in progress with the same key.
+
+        The fetch runs in a task of its own, so a caller cancelled while awaiting it,
+        like a request whose client disconnected, doesn't cancel it for the rest.
+
+        Args:
+            key: Identifies the fetch, so only fetches with the same result are shared.
+            fetch: Starts the fetch, only called if none is in progress.
+
+        Returns:
+            The fetched feed, the same for every caller awaiting the fetch.
+
+        Raises:
+            FlightEventRetrievalError: If the fetch failed, raised to every caller.
+
+        """
+        return await asyncio.shield(self.start(key, fetch))
+
+    def __remove(self, key: Hashable, task: asyncio.Task[CachedFlightEvents]) -> None:
+        """Forget a finished fetch, so the next caller starts a new one."""
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # every caller may have been cancelled, leaving a failure nobody retrieves
+        if not task.cancelled():
+            task.exception()
+
+
+flight_events_cache = FlightEventsCache()
+flight_events_fetches = FlightEventsFetches()
@@ -0,0 +1,112 @@
+"""Changes to the flight events feed, applied to a snapshot without building it again."""
+
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import chain
+
+from src.models import FlightEvent, FlightTable, FlightTableBuilder
+from src.models.flight_table import to_timestamp
+from src.search import DepartureIndex
+
+from .interface import FlightEventsSnapshot
+
+# identifies a flight event: flight number, departure airport and departure time
+DepartureKey = tuple[str, str, datetime]
+# fraction of the rows of the flight table removed from which it is built without them
+COMPACTION_THRESHOLD = 0.25
+
+
+@dataclass(frozen=True, slots=True)
+class FlightEventsDelta:
+    """Flight events upserted and deleted in the feed since a version of it.
+
+    Attributes:
+        upserts: Flight events added, replacing the ones with the same departure key.
+        deletes: Departure keys of the flight events removed.
+
+    """
+
+    upserts: list[FlightEvent]
+    deletes: list[DepartureKey]
+
+
+def apply_delta(
+    snapshot: FlightEventsSnapshot,
+    departure_index: DepartureIndex,
+    delta: FlightEventsDelta,
+    version: str,
+) -> tuple[FlightEventsSnapshot, list[FlightEvent]]:
+    """Apply a delta to a snapshot of the feed, leaving the snapshot unchanged.
+
+    Deletes are applied before upserts. The columns of the flight table are copied
+    with the upserted flight events appended, and only the index groups of the
+    airports with flight events removed or added are built again.
+
+    Removed rows stay in the table until they are more than `COMPACTION_THRESHOLD` of
+    it. Then the table and its index are built again without them, so a feed kept up
+    to date with deltas doesn't grow with every flight event replaced.
+
+    Args:
+        snapshot: The snapshot the delta applies to.
+        departure_index: Index of the flight table of the snapshot.
+        delta: The changes to apply.
+        version: Version of the feed with the changes.
+
+    Returns:
+        The snapshot with the changes, indexed, and the flight events changed: the
+        ones removed and the ones added.
+
+    """
+    flight_table = departure_index.flight_table
+    # the last upsert of a flight event wins
+    upserts = list({_departure_key(event): event for event in delta.upserts}.values())
+    removed_rows = set()
+    for flight_number, from_airport, departure_time in chain(
+        delta.deletes, map(_departure_key, upserts)
+    ):
+        airport_id = flight_table.airport_id(from_airport)
+        if airport_id is None:
+            continue
+        timestamp = to_timestamp(departure_time)
+        for row in departure_index.departure_rows(airport_id, timestamp, timestamp):
+            if flight_table[row].flight_number == flight_number:
+                removed_rows.add(row)
+
+    changed = [flight_table[row] for row in sorted(removed_rows)] + upserts
+    all_removed_rows = snapshot.removed_rows | removed_rows
+    if len(all_removed_rows) > COMPACTION_THRESHOLD * (len(flight_table) + len(upserts)):
+        compacted_table = FlightTable.from_events(
+            chain(
+                (
+                    flight_table[row]
+                    for row in range(len(flight_table))
+                    if row not in all_removed_rows
+                ),
+                upserts,
+            )
+        )
+        compacted = FlightEventsSnapshot(
+            flight_table=compacted_table,
+            version=version,
+            departure_index=DepartureIndex(compacted_table),
+        )
+        return compacted, changed
+
+    builder = FlightTableBuilder(flight_table.copy())
+    for flight_event in upserts:
+        builder.append(flight_event)
+    patched_table = builder.build()
+    patched = FlightEventsSnapshot(
+        flight_table=patched_table,
+        version=version,
+        departure_index=departure_index.patched(
+            patched_table, removed_rows, range(len(flight_table), len(patched_table))
+        ),
+        removed_rows=all_removed_rows,
+    )
+    return patched, changed
+
+
+def _departure_key(flight_event: FlightEvent) -> DepartureKey:
+    """Get the departure key of a flight event."""
+    return flight_event.flight_number, flight_event.from_airport, flight_event.departure_time
@@ -1,13 +1,110 @@
 """Flight event repository interface."""
 
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
 
-from src.models import FlightEvent
+from src.models import FlightEvent, FlightTable
+from src.models.flight_table import to_timestamp
+from src.search import DepartureIndex
+
+
+@dataclass(frozen=True, slots=True)
+class FlightEventQuery:
+    """Criteria to narrow the flight events retrieved from a repository.
+
+    Attributes:
+        departure_from: Earliest departure time, inclusive. Unbounded if None.
+        departure_to: Latest departure time, inclusive. Unbounded if None.
+        from_airport: Hint of the origin of the journeys the events are retrieved for.
+        to_airport: Hint of the destination of the journeys the events are retrieved for.
+            Airport hints must not be used to discard events, since connecting flights
+            depart from and arrive to other airports.
+
+    """
+
+    departure_from: datetime | None = None
+    departure_to: datetime | None = None
+    from_airport: str | None = None
+    to_airport: str | None = None
+
+    def matches(self, departure_time: datetime) -> bool:
+        """Check whether a flight departing at the given time matches the query.
+
+        Naive times are compared as UTC, as the flight table stores them.
+        """
+        timestamp = to_timestamp(departure_time)
+        if self.departure_from is not None and timestamp < to_timestamp(self.departure_from):
+            return False
+        return self.departure_to is None or timestamp <= to_timestamp(self.departure_to)
+
+
+@dataclass(frozen=True, slots=True)
+class FlightEventsSnapshot:
+    """Flight events retrieved at a point in time.
+
+    Attributes:
+        flight_table: The flight events, stored by columns.
+        version: Fingerprint of the data the events were read from. Snapshots with
+            the same version hold the same events, so it can be used as a cache key.
+            None when the repository can't tell the version of its data.
+        departure_index: Index of the flight table, when the repository built it
+            already. Searches build it themselves otherwise.
+        removed_rows: Rows of the flight table deleted by changes applied to the feed.
+            They are kept in the table, so the rows of the index stay valid, but they
+            aren't indexed nor listed.
+
+    """
+
+    flight_table: FlightTable
+    version: str | None = None
+    departure_index: DepartureIndex | None = None
+    removed_rows: frozenset[int] = field(default_factory=frozenset)
+
+
+@dataclass(frozen=True, slots=True)
+class FlightEventsChange:
+    """Flight events that changed in the feed from one version to the next.
+
+    Attributes:
+        previous_version: Version of the feed the changes were applied to.
+        version: Version of the feed with the changes.
+        flight_events: The flight events deleted, or replaced, and the ones added.
+
+    """
+
+    previous_version: str | None
+    version: str | None
+    flight_events: list[FlightEvent]
 
 
 class FlightEventReadRepositoryInterface(ABC):
     """Flight event repository interface."""
 
+    async def list(self, query: FlightEventQuery | None = None) -> list[FlightEvent]:
+        """List flight events.
+
+        Args:
+            query: Criteria of the flight events to list. All of them if not given.
+
+        Returns:
+            The flight events matching the query.
+
+        """
+        snapshot = await self.snapshot(query)
+        flight_table = snapshot.flight_table
+        if query is None:
+            rows = range(len(flight_table))
+        else:
+            rows = flight_table.departing(query.departure_from, query.departure_to)
+        return [flight_table[row] for row in rows if row not in snapshot.removed_rows]
+
     @abstractmethod
-    async def list(self) -> list[FlightEvent]:
-        """List flight events."""
+    async def snapshot(self, query: FlightEventQuery | None = None) -> FlightEventsSnapshot:
+        """Get the flight events along with the version of the data.
+
+        Args:
+            query: Criteria of the flight events needed. Repositories may return a
+                snapshot with more events than the ones matching the query.
+
+        """
@@ -1,38 +1,370 @@
 """Flight events repository that uses an external API."""
 
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+
 import httpx
 
+from src.core import metrics
 from src.core.config import Settings
-from src.models import FlightEvent
+from src.search import DepartureIndex
 
+from .cache import CachedFlightEvents, flight_events_cache, flight_events_fetches
+from .changes import FlightEventsDelta, apply_delta
 from .exceptions import FlightEventRetrievalError
-from .interface import FlightEventReadRepositoryInterface
+from .interface import (
+    FlightEventQuery,
+    FlightEventReadRepositoryInterface,
+    FlightEventsChange,
+    FlightEventsSnapshot,
+)
+from .snapshot_file import read_snapshot_file, write_snapshot_file
+from .streaming import DepartureWindow, FlightEventsFeedParser, parse_flight_events
 
 
 class FlightEventsAPIRepository(FlightEventReadRepositoryInterface):
-    """Flight events repository implementation."""
+    """Flight events repository implementation.
+
+    The feed is parsed incrementally while it is downloaded, so the raw body is never
+    held in memory as a whole, and it is stored in a columnar `FlightTable`.
+
+    The parsed feed is cached for the whole process during
+    `settings.flight_events_cache_ttl_seconds`. Once expired, it is revalidated with
+    the upstream ETag/Last-Modified validators, so an unchanged feed is not parsed again.
+    Concurrent requests needing the same feed share a single fetch, and the feed is
+    indexed once, in a thread, before they get it.
+
+    An expired feed younger than `settings.flight_events_max_staleness_seconds` is
+    still served, while it is revalidated in the background, so requests only wait on
+    the upstream when no usable feed is cached.
+    """
+
+    def __init__(self, settings: Settings, http_client: httpx.AsyncClient) -> None:
+        """Initialize the flight events repository.
+
+        Args:
+            settings: The application settings.
+            http_client: HTTP client shared across requests, to reuse its connections.
 
-    def __init__(self, settings: Settings) -> None:
-        """Initialize the flight events repository."""
+        """
+        self.http_client = http_client
         self.base_url = settings.flight_events_api_url
+        self.cache_ttl = settings.flight_events_cache_ttl_seconds
+        self.supports_query = settings.flight_events_api_supports_query
+        self.max_staleness = settings.flight_events_max_staleness_seconds
+        self.changes_url = settings.flight_events_changes_url
 
-    async def list(self) -> list[FlightEvent]:
-        """List flight events."""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(self.base_url)
+    async def snapshot(self, query: FlightEventQuery | None = None) -> FlightEventsSnapshot:
+        """Get the flight events along with the version of the feed.
 
-            if response.is_error:
-                raise FlightEventRetrievalError(
-                    f"Failed to retrieve flight events from API: {response.status_code}"
-                )
+        When the API supports it, the query is forwarded as query parameters so the
+        upstream only sends the relevant flight events. Otherwise, the whole feed is
+        retrieved, as it is the one kept in the cache, and the snapshot may include
+        flight events that don't match the query.
+
+        Args:
+            query: Criteria of the flight events needed.
+
+        """
+        params = self.__query_params(query)
+        cache_key = self.__cache_key(params)
+        cached = flight_events_cache.get(cache_key)
+        if cached is not None and cached.age < self.cache_ttl:
+            return cached.snapshot
+        if cached is not None and cached.age < self.max_staleness and self.cache_ttl > 0:
+            flight_events_fetches.start(
+                cache_key, lambda: self.__revalidate(cache_key, params, cached)
+            )
+            return cached.snapshot
+
+        if self.cache_ttl > 0:
+            entry = await flight_events_fetches.run(
+                cache_key, lambda: self.__refresh(cache_key, params, cached)
+            )
+        else:
+            # nothing is cached, so flight events out of the window are skipped while
+            # parsing, and only fetches for the same query are shared
+            entry = await flight_events_fetches.run(
+                (cache_key, query), lambda: self.__fetch_window(params, query)
+            )
+        return entry.snapshot
+
+    async def refresh(self) -> FlightEventsSnapshot:
+        """Fetch the whole feed, or revalidate the cached one, and index it.
+
+        The feed is indexed before it replaces the cached one, so searches never see a
+        feed without its index. The cached feed is kept if the refresh fails.
+
+        Returns:
+            The snapshot cached.
+
+        Raises:
+            FlightEventRetrievalError: If the feed couldn't be fetched.
+
+        """
+        cache_key = self.__cache_key({})
+        cached = flight_events_cache.get(cache_key)
+        entry = await flight_events_fetches.run(
+            cache_key, lambda: self.__refresh(cache_key, {}, cached)
+        )
+        return entry.snapshot
+
+    async def apply_changes(self) -> FlightEventsChange | None:
+        """Apply the changes to the whole feed since it was fetched.
+
+        The changes since the ETag of the cached feed are requested from
+        `settings.flight_events_changes_url`, and applied to the cached feed and its
+        index without fetching the whole feed again. The whole feed is fetched instead
+        when there is no changes URL or no cached feed with an ETag to ask the changes
+        since, or when the upstream doesn't keep the changes since it anymore.
+
+        Returns:
+            The change applied, or None if the feed didn't change or was fetched again.
+
+        Raises:
+            FlightEventRetrievalError: If the changes or the feed couldn't be fetched.
+
+        """
+        cache_key = self.__cache_key({})
+        changes: list[FlightEventsChange] = []
+        await flight_events_fetches.run(
+            cache_key, lambda: self.__apply_changes(cache_key, changes.append)
+        )
+        return changes[0] if changes else None
+
+    def feed_age(self) -> float | None:
+        """Get the seconds since the whole feed was fetched or revalidated.
+
+        Returns:
+            The age of the cached feed, or None if it isn't cached.
+
+        """
+        cached = flight_events_cache.get(self.__cache_key({}))
+        return None if cached is None else cached.age
+
+    def load_snapshot_file(self, path: str | Path) -> bool:
+        """Cache the whole feed from a snapshot file, unless it is cached already.
 
-            return [
-                FlightEvent(
-                    flight_number=event["flight_number"],
-                    from_airport=event["departure_city"],
-                    to_airport=event["arrival_city"],
-                    departure_time=event["departure_datetime"],
-                    arrival_time=event["arrival_datetime"],
+        The snapshot is used as if it was fetched when it was written: once older than
+        `settings.flight_events_cache_ttl_seconds`, it is revalidated with the validators
+        it was written with. Only searches that retrieve the whole feed use it, so it
+        has no effect when the API supports queries.
+
+        Args:
+            path: The snapshot file, written by `save_snapshot_file`.
+
+        Returns:
+            Whether the snapshot was loaded.
+
+        Raises:
+            OSError: If the file can't be read.
+            ValueError: If the file isn't a snapshot file that can be read.
+
+        """
+        cache_key = self.__cache_key({})
+        if flight_events_cache.get(cache_key) is not None:
+            return False
+        flight_events_cache.set(cache_key, read_snapshot_file(path))
+        return True
+
+    async def save_snapshot_file(self, path: str | Path) -> FlightEventsSnapshot:
+        """Fetch the whole feed and write it, indexed, to a snapshot file.
+
+        Args:
+            path: The file to write.
+
+        Returns:
+            The snapshot written.
+
+        """
+        entry = await self.__fetch({}, None, None)
+        write_snapshot_file(path, entry)
+        return entry.snapshot
+
+    def __cache_key(self, params: dict[str, str]) -> str:
+        """Get the key of the feed retrieved with some query parameters in the cache."""
+        return str(httpx.URL(self.base_url, params=params))
+
+    def __query_params(self, query: FlightEventQuery | None) -> dict[str, str]:
+        """Get the upstream query parameters for a query, if the API supports them."""
+        if query is None or not self.supports_query:
+            return {}
+        params = {
+            "departure_from": query.departure_from,
+            "departure_to": query.departure_to,
+            "origin": query.from_airport,
+            "destination": query.to_airport,
+        }
+        return {
+            name: value.isoformat() if isinstance(value, datetime) else value
+            for name, value in params.items()
+            if value is not None
+        }
+
+    async def __refresh(
+        self, cache_key: str, params: dict[str, str], cached: CachedFlightEvents | None
+    ) -> CachedFlightEvents:
+        """Fetch the feed, revalidating the cached one if given, and cache it indexed."""
+        entry = await self.__indexed(await self.__fetch(params, cached, None))
+        flight_events_cache.set(cache_key, entry)
+        return entry
+
+    async def __apply_changes(
+        self, cache_key: str, applied: Callable[[FlightEventsChange], None]
+    ) -> CachedFlightEvents:
+        """Apply the changes to the cached feed, passing the change applied to a callback."""
+        cached = flight_events_cache.get(cache_key)
+        if self.changes_url is None or cached is None or cached.etag is None:
+            return await self.__refresh(cache_key, {}, cached)
+
+        try:
+            response = await self.http_client.get(self.changes_url, params={"since": cached.etag})
+        except httpx.HTTPError as e:
+            raise FlightEventRetrievalError(f"Failed to reach flight events API: {e}") from e
+        if response.status_code == httpx.codes.NOT_MODIFIED:
+            entry = cached.revalidated()
+            flight_events_cache.set(cache_key, entry)
+            return entry
+        if response.status_code in (httpx.codes.NOT_FOUND, httpx.codes.GONE):
+            # the upstream doesn't keep the changes since the cached feed
+            return await self.__refresh(cache_key, {}, cached)
+        if response.is_error:
+            raise FlightEventRetrievalError(
+                f"Failed to retrieve flight events changes from API: {response.status_code}"
+            )
+
+        snapshot = cached.snapshot
+        delta = self.__parse_delta(response.content)
+        departure_index = snapshot.departure_index or DepartureIndex(snapshot.flight_table)
+        # the version follows from the version changed and the changes applied
+        digest = hashlib.blake2b(str(snapshot.version).encode(), digest_size=16)
+        digest.update(response.content)
+        # the table is copied, or compacted, in a thread so requests are served meanwhile
+        patched, flight_events = await asyncio.to_thread(
+            apply_delta, snapshot, departure_index, delta, digest.hexdigest()
+        )
+        entry = CachedFlightEvents(
+            snapshot=patched,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            fetched_at=time.monotonic(),
+        )
+        flight_events_cache.set(cache_key, entry)
+        applied(FlightEventsChange(snapshot.version, patched.version, flight_events))
+        return entry
+
+    @staticmethod
+    def __parse_delta(payload: bytes) -> FlightEventsDelta:
+        """Parse the changes to the feed, upserted records and deleted departure keys."""
+        try:
+            changes = json.loads(payload)
+            return FlightEventsDelta(
+                upserts=list(parse_flight_events(changes.get("upserts", []), None)),
+                deletes=[
+                    (
+                        record["flight_number"],
+                        record["departure_city"],
+                        datetime.fromisoformat(record["departure_datetime"]),
+                    )
+                    for record in changes.get("deletes", [])
+                ],
+            )
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise FlightEventRetrievalError(f"Invalid flight events changes payload: {e!r}") from e
+
+    async def __revalidate(
+        self, cache_key: str, params: dict[str, str], cached: CachedFlightEvents
+    ) -> CachedFlightEvents:
+        """Refresh an expired feed in the background, while it is still served."""
+        try:
+            return await self.__refresh(cache_key, params, cached)
+        except FlightEventRetrievalError as e:
+            logging.warning(f"Failed to revalidate flight events, serving stale ones: {e}")
+            raise
+
+    async def __fetch_window(
+        self, params: dict[str, str], query: FlightEventQuery | None
+    ) -> CachedFlightEvents:
+        """Fetch the feed, only keeping the flight events departing in the query window.
+
+        The version of the feed is combined with the window, so snapshots of different
+        windows of the same feed, that hold different events, get different versions.
+        """
+        if query is None or (query.departure_from is None and query.departure_to is None):
+            return await self.__indexed(await self.__fetch(params, None, None))
+        entry = await self.__fetch(params, None, query.matches)
+        snapshot = entry.snapshot
+        window = f"{snapshot.version}:{query.departure_from}:{query.departure_to}"
+        version = hashlib.blake2b(window.encode(), digest_size=16).hexdigest()
+        return await self.__indexed(replace(entry, snapshot=replace(snapshot, version=version)))
+
+    @staticmethod
+    async def __indexed(entry: CachedFlightEvents) -> CachedFlightEvents:
+        """Index a fetched feed, unless it is already, building the index in a thread.
+
+        Feeds are indexed once when fetched, so the searches sharing them don't index
+        them again, and the event loop keeps serving requests meanwhile.
+        """
+        if entry.snapshot.departure_index is not None:
+            return entry
+        departure_index = await asyncio.to_thread(DepartureIndex, entry.snapshot.flight_table)
+        return replace(entry, snapshot=replace(entry.snapshot, departure_index=departure_index))
+
+    async def __fetch(
+        self,
+        params: dict[str, str],
+        cached: CachedFlightEvents | None,
+        departure_window: DepartureWindow | None,
+    ) -> CachedFlightEvents:
+        """Fetch the feed, revalidating the cached one if given."""
+        headers = {}
+        if cached is not None and cached.etag is not None:
+            headers["If-None-Match"] = cached.etag
+        if cached is not None and cached.last_modified is not None:
+            headers["If-Modified-Since"] = cached.last_modified
+
+        start = time.perf_counter()
+        try:
+            async with self.http_client.stream(
+                "GET", self.base_url, params=params, headers=headers
+            ) as response:
+                # until the response headers, the body is downloaded while parsed
+                metrics.record("fetch", time.perf_counter() - start)
+                if cached is not None and response.status_code == httpx.codes.NOT_MODIFIED:
+                    return cached.revalidated()
+                if response.is_error:
+                    raise FlightEventRetrievalError(
+                        f"Failed to retrieve flight events from API: {response.status_code}"
+                    )
+                with metrics.timed("parse"):
+                    snapshot = await self.__parse(response, departure_window)
+                return CachedFlightEvents(
+                    snapshot=snapshot,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    fetched_at=time.monotonic(),
                 )
-                for event in response.json()
-            ]
+        except httpx.HTTPError as e:
+            raise FlightEventRetrievalError(f"Failed to reach flight events API: {e}") from e
+
+    @staticmethod
+    async def __parse(
+        response: httpx.Response, departure_window: DepartureWindow | None
+    ) -> FlightEventsSnapshot:
+        """Parse the flight events while the response body is downloaded."""
+        parser = FlightEventsFeedParser(departure_window)
+        try:
+            async for chunk in response.aiter_bytes():
+                parser.feed(chunk)
+            snapshot = parser.close()
+        except ValueError as e:
+            raise FlightEventRetrievalError(f"Invalid flight events payload: {e!r}") from e
+        metrics.count("flight_events_scanned", parser.scanned)
+        return snapshot
@@ -0,0 +1,95 @@
+"""Flight events repository that reads a snapshot file mapped in memory."""
+
+import time
+from pathlib import Path
+from typing import BinaryIO
+
+from .cache import CachedFlightEvents
+from .exceptions import FlightEventRetrievalError
+from .interface import FlightEventQuery, FlightEventReadRepositoryInterface, FlightEventsSnapshot
+from .snapshot_file import map_snapshot_file, write_snapshot_file
+from .streaming import FlightEventsFeedParser
+
+# bytes of the feed read at a time while converting it
+CHUNK_SIZE = 1 << 16
+
+# snapshot mapped from each file, along with the identity of the file it was mapped from
+_mapped_files: dict[Path, tuple[tuple[int, int, int], FlightEventsSnapshot]] = {}
+
+
+def convert_feed_file(source: BinaryIO, path: str | Path) -> FlightEventsSnapshot:
+    """Convert a feed, in the JSON format of the API, into a snapshot file.
+
+    The feed is parsed while it is read, like a feed downloaded from the API, and its
+    version is computed the same way, so both snapshots of a feed have the same version.
+
+    Args:
+        source: The JSON feed, opened in binary mode.
+        path: The snapshot file to write.
+
+    Returns:
+        The snapshot written.
+
+    Raises:
+        ValueError: If the feed isn't a valid JSON array of flight events.
+
+    """
+    parser = FlightEventsFeedParser()
+    while chunk := source.read(CHUNK_SIZE):
+        parser.feed(chunk)
+    snapshot = parser.close()
+    write_snapshot_file(
+        path,
+        CachedFlightEvents(
+            snapshot=snapshot, etag=None, last_modified=None, fetched_at=time.monotonic()
+        ),
+    )
+    return snapshot
+
+
+class FlightEventsFileRepository(FlightEventReadRepositoryInterface):
+    """Flight events repository implementation reading a snapshot file.
+
+    The file is mapped in memory instead of being read, so the feed is loaded without
+    parsing nor copying it, and every process serving it shares the pages of the file.
+    It can be written from a JSON feed with `convert_feed_file`, or from the API with
+    `FlightEventsAPIRepository.save_snapshot_file`, and serves the feed offline.
+
+    The mapped snapshot is reused for the whole process while the file stays the same.
+    Once the file is replaced, the next call maps the new one, and the previous mapping
+    is released when the searches using it finish.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """Initialize the flight events repository.
+
+        Args:
+            path: The snapshot file with the flight events.
+
+        """
+        self.path = Path(path)
+
+    async def snapshot(self, query: FlightEventQuery | None = None) -> FlightEventsSnapshot:
+        """Get the flight events along with the version of the file.
+
+        The snapshot holds every flight event in the file, whatever the query.
+
+        Args:
+            query: Criteria of the flight events needed.
+
+        Raises:
+            FlightEventRetrievalError: If the file can't be read.
+
+        """
+        try:
+            stat = self.path.stat()
+            identity = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            mapped = _mapped_files.get(self.path)
+            if mapped is None or mapped[0] != identity:
+                mapped = _mapped_files[self.path] = (
+                    identity,
+                    map_snapshot_file(self.path).snapshot,
+                )
+        except (OSError, ValueError) as e:
+            raise FlightEventRetrievalError(f"Failed to read flight events file: {e}") from e
+        return mapped[1]
@@ -0,0 +1,70 @@
+"""Background refresh of the flight events feed."""
+
+import asyncio
+import logging
+from collections.abc import Callable
+
+from .exceptions import FlightEventRetrievalError
+from .interface import FlightEventsChange
+from .main import FlightEventsAPIRepository
+
+# seconds before retrying a failed refresh, unless the interval is shorter
+RETRY_SECONDS = 30
+
+
+class FlightEventsRefresher:
+    """Keeps the cached feed fresh, refreshing it in the background.
+
+    The whole feed is fetched, or revalidated, and indexed once it is as old as the
+    refresh interval, so with an interval shorter than the cache TTL requests always
+    find a fresh, indexed feed. A failed refresh is retried, while the feed cached
+    keeps being served up to the max staleness of the repository.
+
+    When the upstream has a changes endpoint, only the changes to the feed are fetched
+    and applied to the cached one.
+    """
+
+    def __init__(
+        self,
+        repository: FlightEventsAPIRepository,
+        interval: float,
+        on_change: Callable[[FlightEventsChange], None] | None = None,
+    ) -> None:
+        """Initialize the refresher.
+
+        Args:
+            repository: Repository whose cached feed is refreshed.
+            interval: Seconds between refreshes.
+            on_change: Called with the changes applied to the feed, if any.
+
+        """
+        self.repository = repository
+        self.interval = interval
+        self.on_change = on_change
+
+    async def run(self) -> None:
+        """Refresh the feed until cancelled, starting right away if it isn't cached."""
+        while True:
+            age = self.repository.feed_age()
+            if age is not None and age < self.interval:
+                await asyncio.sleep(self.interval - age)
+                continue
+            try:
+                await self.__refresh()
+            except FlightEventRetrievalError as e:
+                logging.warning(f"Failed to refresh flight events: {e}")
+            except Exception:
+                # an unexpected error must not stop the refreshes for the whole process
+                logging.exception("Unexpected error refreshing flight events")
+            else:
+                continue
+            await asyncio.sleep(min(self.interval, RETRY_SECONDS))
+
+    async def __refresh(self) -> None:
+        """Refresh the feed, applying the changes to it if the upstream has them."""
+        if self.repository.changes_url is None:
+            await self.repository.refresh()
+            return
+        change = await self.repository.apply_changes()
+        if change is not None and self.on_change is not None:
+            self.on_change(change)
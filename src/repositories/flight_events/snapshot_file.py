@@ -0,0 +1,243 @@
+"""Prebuilt snapshots of the flight events feed, stored as binary files.
+
+A snapshot file holds the columns of the flight table and its departure index, so
+loading it is a copy of arrays instead of downloading, parsing and indexing the feed.
+
+The file starts with `MAGIC`, the format version and the length of a JSON header,
+followed by the header and the columns. The header has the HTTP validators of the
+feed, when it was fetched, the airports, and where each column starts, counting from
+the end of the header aligned to 8 bytes. Columns are stored as raw arrays, each one
+aligned to 8 bytes too. Rows removed by changes applied to the feed are stored too, as
+they stay in the flight table.
+
+Since the columns are aligned raw arrays, a file can also be mapped in memory and its
+columns used in place, so processes reading the same file share its pages.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Sequence
+from itertools import pairwise
+from pathlib import Path
+
+from src.models import FlightTable
+from src.search import DepartureIndex
+from src.search.departure_index import AirportGroups
+
+from .cache import CachedFlightEvents
+from .interface import FlightEventsSnapshot
+
+MAGIC = b"FLTSNAP\x00"
+FORMAT_VERSION = 2
+# format version and header length
+_PREAMBLE = struct.Struct("<II")
+_ALIGNMENT = 8
+
+
+def write_snapshot_file(path: str | Path, entry: CachedFlightEvents) -> None:
+    """Write a cached feed to a snapshot file, indexing it if it wasn't.
+
+    The file is written next to the destination and renamed, so a snapshot being
+    written is never read.
+
+    Args:
+        path: The file to write.
+        entry: The feed, with its HTTP validators.
+
+    """
+    snapshot = entry.snapshot
+    flight_table = snapshot.flight_table
+    departure_index = snapshot.departure_index or DepartureIndex(flight_table)
+    departures, arrivals = departure_index.groups()
+
+    columns = {
+        "flight_numbers": array("B", flight_table.flight_numbers.encode()),
+        "flight_number_offsets": flight_table.flight_number_offsets,
+        "from_airports": flight_table.from_airports,
+        "to_airports": flight_table.to_airports,
+        "departure_times": flight_table.departure_times,
+        "arrival_times": flight_table.arrival_times,
+        "departure_offsets": flight_table.departure_offsets,
+        "arrival_offsets": flight_table.arrival_offsets,
+        "removed_rows": array("I", sorted(snapshot.removed_rows)),
+        **_group_columns("departure_index", departures),
+        **_group_columns("arrival_index", arrivals),
+    }
+    offsets = {}
+    offset = 0
+    for name, column in columns.items():
+        offsets[name] = offset
+        offset = _aligned(offset + len(column) * column.itemsize)
+    header = json.dumps(
+        {
+            "byteorder": sys.byteorder,
+            "version": snapshot.version,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "fetched_at": time.time() - entry.age,
+            "airports": flight_table.airports,
+            "columns": {
+                name: [_typecode(column), column.itemsize, offsets[name], len(column)]
+                for name, column in columns.items()
+            },
+        }
+    ).encode()
+
+    path = Path(path)
+    temporary_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with temporary_path.open("wb") as file:
+        file.write(MAGIC)
+        file.write(_PREAMBLE.pack(FORMAT_VERSION, len(header)))
+        file.write(header)
+        data_start = _aligned(file.tell())
+        for name, column in columns.items():
+            file.write(b"\0" * (data_start + offsets[name] - file.tell()))
+            file.write(column)
+    temporary_path.replace(path)
+
+
+def read_snapshot_file(path: str | Path) -> CachedFlightEvents:
+    """Read a feed from a snapshot file.
+
+    Args:
+        path: The file to read.
+
+    Returns:
+        The feed, indexed, with its HTTP validators. Its age is the time since it was
+        fetched before being written to the file.
+
+    Raises:
+        ValueError: If the file isn't a snapshot file, or was written in a format or on
+            a platform that can't be read.
+
+    """
+    return _load(memoryview(Path(path).read_bytes()), path, copy=True)
+
+
+def map_snapshot_file(path: str | Path) -> CachedFlightEvents:
+    """Map a snapshot file in memory, reading the feed from it without copying the columns.
+
+    The columns of the flight table and its index are read-only views of the mapped file,
+    so loading the feed takes the same time whatever its size, and its pages are loaded
+    on demand and shared by every process mapping the file. The file is unmapped once the
+    snapshot is no longer used. Replacing the file, as `write_snapshot_file` does, doesn't
+    change the snapshots mapped before.
+
+    Files written on a platform with another byte order are copied, as `read_snapshot_file`
+    does.
+
+    Args:
+        path: The file to map.
+
+    Returns:
+        The feed, indexed, with its HTTP validators. Its flight table can't be appended to.
+
+    Raises:
+        ValueError: If the file isn't a snapshot file, or was written in a format or on
+            a platform that can't be read.
+
+    """
+    with Path(path).open("rb") as file:
+        # the mapping stays valid once the file is closed
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return _load(memoryview(mapping), path, copy=False)
+
+
+def _load(data: memoryview, path: str | Path, copy: bool) -> CachedFlightEvents:
+    """Load a feed from the content of a snapshot file.
+
+    Args:
+        data: The content of the file.
+        path: The file, to report errors.
+        copy: Whether to copy the columns into arrays, instead of viewing them in place.
+
+    Returns:
+        The feed, with its HTTP validators.
+
+    """
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"Not a flight events snapshot file: {path}")
+    format_version, header_length = _PREAMBLE.unpack_from(data, len(MAGIC))
+    if format_version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported flight events snapshot format: {format_version}")
+    header_start = len(MAGIC) + _PREAMBLE.size
+    header = json.loads(bytes(data[header_start : header_start + header_length]))
+    data = data[_aligned(header_start + header_length) :]
+    # columns written with another byte order have to be swapped, in a copy
+    copy = copy or header["byteorder"] != sys.byteorder
+
+    columns = {}
+    for name, (typecode, itemsize, offset, length) in header["columns"].items():
+        if array(typecode).itemsize != itemsize:
+            raise ValueError(f"Snapshot column {name} has items of {itemsize} bytes")
+        view = data[offset : offset + length * itemsize]
+        if not copy:
+            columns[name] = view.cast(typecode)
+            continue
+        column = array(typecode)
+        column.frombytes(view)
+        if header["byteorder"] != sys.byteorder:
+            column.byteswap()
+        columns[name] = column
+
+    flight_table = FlightTable()
+    flight_table.airports = header["airports"]
+    flight_table.airport_ids = {
+        airport: airport_id for airport_id, airport in enumerate(flight_table.airports)
+    }
+    flight_table.flight_numbers = columns.pop("flight_numbers").tobytes().decode()
+    removed_rows = frozenset(columns.pop("removed_rows"))
+    departures = _groups(columns, "departure_index")
+    arrivals = _groups(columns, "arrival_index")
+    for name, column in columns.items():
+        setattr(flight_table, name, column)
+
+    snapshot = FlightEventsSnapshot(
+        flight_table=flight_table,
+        version=header["version"],
+        departure_index=DepartureIndex.from_groups(flight_table, departures, arrivals),
+        removed_rows=removed_rows,
+    )
+    return CachedFlightEvents(
+        snapshot=snapshot,
+        etag=header["etag"],
+        last_modified=header["last_modified"],
+        fetched_at=time.monotonic() - max(0.0, time.time() - header["fetched_at"]),
+    )
+
+
+def _aligned(offset: int) -> int:
+    """Round an offset up to the alignment of the columns."""
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _typecode(column: array | memoryview) -> str:
+    """Get the type of the items of a column, also when viewed in a mapped file."""
+    return column.format if isinstance(column, memoryview) else column.typecode
+
+
+def _group_columns(prefix: str, groups: AirportGroups) -> dict[str, array]:
+    """Flatten the rows and times of each airport of an index into columns."""
+    rows, times = groups
+    bounds = array("I", [0])
+    for airport_rows in rows:
+        bounds.append(bounds[-1] + len(airport_rows))
+    return {
+        f"{prefix}_rows": array("I", b"".join(airport_rows.tobytes() for airport_rows in rows)),
+        f"{prefix}_times": array("q", b"".join(airport_times.tobytes() for airport_times in times)),
+        f"{prefix}_bounds": bounds,
+    }
+
+
+def _groups(columns: dict[str, Sequence[int]], prefix: str) -> AirportGroups:
+    """Split the columns of an index into the rows and times of each airport."""
+    rows = columns.pop(f"{prefix}_rows")
+    times = columns.pop(f"{prefix}_times")
+    bounds = columns.pop(f"{prefix}_bounds")
+    spans = [slice(start, end) for start, end in pairwise(bounds)]
+    return [rows[span] for span in spans], [times[span] for span in spans]
@@ -0,0 +1,199 @@
+"""Incremental decoding of JSON array payloads, like the flight events feed."""
+
+import codecs
+import hashlib
+import json
+import re
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime
+from typing import Any
+
+from src.models import FlightEvent, FlightTableBuilder
+
+from .interface import FlightEventsSnapshot
+
+DepartureWindow = Callable[[datetime], bool]
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# characters that may follow a complete item of the array
+_DELIMITERS = frozenset(" \t\n\r,]")
+
+
+class JSONArrayStreamDecoder:
+    """Incremental decoder for the items of a top-level JSON array.
+
+    The payload is fed in chunks of text, and every item is returned as soon as it is
+    complete, so only the item being decoded needs to be held in memory instead of
+    the whole payload.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the decoder, expecting the start of the array."""
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        # one of: "start", "item_or_end", "item", "separator", "end"
+        self._expecting = "start"
+
+    def feed(self, text: str) -> list[Any]:
+        """Feed a chunk of the payload.
+
+        Args:
+            text: The next chunk of the payload.
+
+        Returns:
+            The items completed by this chunk.
+
+        Raises:
+            ValueError: If the payload is not a JSON array.
+
+        """
+        self._buffer += text
+        return self.__drain(final=False)
+
+    def close(self) -> list[Any]:
+        """Signal the end of the payload.
+
+        Returns:
+            The items completed at the end of the payload.
+
+        Raises:
+            ValueError: If the payload ended before the array was closed.
+
+        """
+        items = self.__drain(final=True)
+        if self._expecting != "end":
+            raise ValueError("Unexpected end of JSON array")
+        return items
+
+    def __drain(self, final: bool) -> list[Any]:
+        """Decode every complete item in the buffer."""
+        items = []
+        buffer = self._buffer
+        position = 0
+        while True:
+            position = _WHITESPACE.match(buffer, position).end()
+            if position == len(buffer):
+                break
+
+            char = buffer[position]
+            if self._expecting == "start":
+                if char != "[":
+                    raise ValueError(f"Expected a JSON array, found {char!r}")
+                self._expecting = "item_or_end"
+                position += 1
+            elif self._expecting == "item_or_end" and char == "]":
+                self._expecting = "end"
+                position += 1
+            elif self._expecting in ("item_or_end", "item"):
+                try:
+                    item, end = self._decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    # the item continues in the next chunk
+                    break
+                if not final and (end == len(buffer) or buffer[end] not in _DELIMITERS):
+                    # a scalar, like a number cut at its fraction or exponent, may
+                    # continue in the next chunk until a delimiter follows it
+                    break
+                items.append(item)
+                self._expecting = "separator"
+                position = end
+            elif self._expecting == "separator" and char in ",]":
+                self._expecting = "item" if char == "," else "end"
+                position += 1
+            else:
+                raise ValueError(f"Unexpected {char!r} in JSON array")
+
+        self._buffer = buffer[position:]
+        return items
+
+
+def parse_flight_events(
+    records: Iterable[dict], departure_window: DepartureWindow | None
+) -> Iterator[FlightEvent]:
+    """Parse the flight events from records of the API payload.
+
+    Args:
+        records: Records of the API payload.
+        departure_window: Predicate on the departure time of the flight events to keep.
+            Records departing out of the window are skipped before building the model.
+
+    Yields:
+        The flight events departing in the window.
+
+    """
+    for record in records:
+        departure_time = record["departure_datetime"]
+        if departure_window is not None:
+            departure_time = datetime.fromisoformat(departure_time)
+            if not departure_window(departure_time):
+                continue
+        yield FlightEvent(
+            flight_number=record["flight_number"],
+            from_airport=record["departure_city"],
+            to_airport=record["arrival_city"],
+            departure_time=departure_time,
+            arrival_time=record["arrival_datetime"],
+        )
+
+
+class FlightEventsFeedParser:
+    """Incremental parser of a flight events feed, in the JSON format of the API.
+
+    The raw payload is fed in chunks, as it is downloaded or read, and its flight
+    events are validated one at a time, only keeping their columns. The payload is
+    hashed meanwhile, so a feed gets the same version wherever it is parsed from.
+    """
+
+    def __init__(self, departure_window: DepartureWindow | None = None) -> None:
+        """Initialize the parser, expecting the start of the payload.
+
+        Args:
+            departure_window: Predicate on the departure time of the flight events to
+                keep. Every flight event is kept if not given.
+
+        """
+        self.departure_window = departure_window
+        # records of the payload parsed, including the ones out of the window
+        self.scanned = 0
+        self._digest = hashlib.blake2b(digest_size=16)
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._array_decoder = JSONArrayStreamDecoder()
+        self._builder = FlightTableBuilder()
+
+    def feed(self, chunk: bytes) -> None:
+        """Feed a chunk of the payload.
+
+        Raises:
+            ValueError: If the payload isn't a JSON array of flight events.
+
+        """
+        self._digest.update(chunk)
+        self.__append(self._array_decoder.feed(self._text_decoder.decode(chunk)))
+
+    def close(self) -> FlightEventsSnapshot:
+        """Signal the end of the payload.
+
+        Returns:
+            The flight events of the payload, with its digest as version.
+
+        Raises:
+            ValueError: If the payload isn't a JSON array of flight events.
+
+        """
+        records = self._array_decoder.feed(self._text_decoder.decode(b"", final=True))
+        records.extend(self._array_decoder.close())
+        self.__append(records)
+        return FlightEventsSnapshot(
+            flight_table=self._builder.build(), version=self._digest.hexdigest()
+        )
+
+    def __append(self, records: list[Any]) -> None:
+        """Append the flight events of some records to the flight table."""
+        self.scanned += len(records)
+        try:
+            for flight_event in parse_flight_events(records, self.departure_window):
+                self._builder.append(flight_event)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid flight event record: {e!r}") from e
@@ -0,0 +1,23 @@
+"""Search package with the data structures used to find journeys."""
+
+from .cache import JourneySearchCache
+from .departure_index import DepartureIndex
+from .partitions import merge_ranked_paths, split_departure_window
+from .paths import PathParameters, SearchStats, enumerate_paths, path_rank_key, rank_paths
+from .raptor import raptor_paths
+from .reachability import Reachability, backward_reachability
+
+__all__ = [
+    "DepartureIndex",
+    "JourneySearchCache",
+    "PathParameters",
+    "Reachability",
+    "SearchStats",
+    "backward_reachability",
+    "enumerate_paths",
+    "merge_ranked_paths",
+    "path_rank_key",
+    "rank_paths",
+    "raptor_paths",
+    "split_departure_window",
+]
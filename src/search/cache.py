@@ -0,0 +1,107 @@
+"""In-process cache of journey search results."""
+
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+from src.models.models import Journey
+
+
+class JourneySearchCache:
+    """Bounded cache of the journeys found by searches, evicting the least recently used.
+
+    Each entry records the version of the flight events feed it was computed from. An
+    entry computed from an older version is discarded on lookup, so results are
+    invalidated as soon as the feed changes.
+
+    The journeys are cached as built models and returned as they are, so a hit skips
+    both the search and the validation of the models.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        """Initialize an empty cache.
+
+        Args:
+            maxsize: Max amount of searches cached. Nothing is cached if 0.
+
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[str, tuple[Journey, ...]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Amount of searches cached."""
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: str) -> list[Journey] | None:
+        """Get the journeys cached for a search, if computed from the given feed version.
+
+        Args:
+            key: Key identifying the search.
+            version: Version of the flight events feed the search runs against.
+
+        Returns:
+            The journeys found by the search, or None if they aren't cached.
+
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        entry_version, journeys = entry
+        if entry_version != version:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return list(journeys)
+
+    def set(self, key: Hashable, version: str, journeys: list[Journey]) -> None:
+        """Store the journeys found by a search.
+
+        Args:
+            key: Key identifying the search.
+            version: Version of the flight events feed the search ran against.
+            journeys: The journeys found.
+
+        """
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (version, tuple(journeys))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def rebase(self, version: str, new_version: str, keep: Callable[[Hashable], bool]) -> int:
+        """Carry the searches computed from a feed version over to a new version of it.
+
+        When the new version only changes a few flight events, the searches those flight
+        events can't be part of keep their journeys, instead of being searched again.
+
+        Args:
+            version: The feed version the searches were computed from.
+            new_version: The feed version to carry them over to.
+            keep: Whether the journeys of a search, by its key, are the same on the new
+                version. The searches not kept are removed.
+
+        Returns:
+            The amount of searches removed.
+
+        """
+        removed = 0
+        for key, (entry_version, journeys) in list(self._entries.items()):
+            if entry_version != version:
+                continue
+            if keep(key):
+                self._entries[key] = (new_version, journeys)
+            else:
+                del self._entries[key]
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """Remove every cached search and reset the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,255 @@
+"""Departure index."""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Collection, Iterable
+from datetime import datetime
+
+from src.models import FlightEvent, FlightTable
+from src.models.flight_table import to_timestamp
+
+MIN_TIMESTAMP = -(2**63)
+MAX_TIMESTAMP = 2**63 - 1
+
+# rows of the flight table of each airport id, and their times, sorted by time
+AirportGroups = tuple[list[array], list[array]]
+
+
+class DepartureIndex:
+    """Flight events grouped by departure airport and sorted by departure time.
+
+    Keeping the departures of every airport sorted allows looking up the flights
+    that depart within a time window with a binary search, instead of scanning
+    every departure from the airport.
+
+    The index holds rows of a `FlightTable`, grouped by airport id. Lookups by row
+    and timestamp are meant for the search hot path, while `departures` builds the
+    flight events. Flights are also grouped by arrival airport and sorted by arrival
+    time, to walk the flights backward from a destination.
+    """
+
+    def __init__(self, flight_events: FlightTable | Iterable[FlightEvent]) -> None:
+        """Build the index from a collection of flight events.
+
+        Args:
+            flight_events: Flight events to be indexed, in any order.
+
+        """
+        if not isinstance(flight_events, FlightTable):
+            flight_events = FlightTable.from_events(flight_events)
+        self.flight_table = flight_events
+
+        self._rows, self._departure_times = _group_rows(
+            flight_events.from_airports, flight_events.departure_times, len(flight_events.airports)
+        )
+        self._arrival_rows, self._arrival_times = _group_rows(
+            flight_events.to_airports, flight_events.arrival_times, len(flight_events.airports)
+        )
+
+    @classmethod
+    def from_groups(
+        cls, flight_table: FlightTable, departures: AirportGroups, arrivals: AirportGroups
+    ) -> "DepartureIndex":
+        """Build the index from flights already grouped, as returned by `groups`.
+
+        Args:
+            flight_table: The indexed flight events.
+            departures: Rows and departure times of the flights departing from each airport.
+            arrivals: Rows and arrival times of the flights arriving to each airport.
+
+        """
+        departure_index = cls.__new__(cls)
+        departure_index.flight_table = flight_table
+        departure_index._rows, departure_index._departure_times = departures
+        departure_index._arrival_rows, departure_index._arrival_times = arrivals
+        return departure_index
+
+    def patched(
+        self, flight_table: FlightTable, removed_rows: Collection[int], added_rows: Iterable[int]
+    ) -> "DepartureIndex":
+        """Build the index of a flight table with rows removed and appended.
+
+        Only the groups of the airports with flights removed or added are built again,
+        the rest are shared with this index, which is left unchanged.
+
+        Args:
+            flight_table: The indexed flight table with rows appended, as a copy of it.
+                Removed rows stay in the table, so the rows of the index remain valid.
+            removed_rows: Rows to leave out of the index.
+            added_rows: Rows appended to the table, to index.
+
+        Returns:
+            The index of the flight table.
+
+        """
+        added_rows = list(added_rows)
+        departures = _patch_groups(
+            (self._rows, self._departure_times),
+            flight_table.from_airports,
+            flight_table.departure_times,
+            len(flight_table.airports),
+            removed_rows,
+            added_rows,
+        )
+        arrivals = _patch_groups(
+            (self._arrival_rows, self._arrival_times),
+            flight_table.to_airports,
+            flight_table.arrival_times,
+            len(flight_table.airports),
+            removed_rows,
+            added_rows,
+        )
+        return DepartureIndex.from_groups(flight_table, departures, arrivals)
+
+    def groups(self) -> tuple[AirportGroups, AirportGroups]:
+        """Get the flights grouped by departure airport and by arrival airport."""
+        return (self._rows, self._departure_times), (self._arrival_rows, self._arrival_times)
+
+    def __len__(self) -> int:
+        """Amount of indexed flight events."""
+        return len(self.flight_table)
+
+    def departure_rows(
+        self, airport_id: int, start: int = MIN_TIMESTAMP, end: int = MAX_TIMESTAMP
+    ) -> array:
+        """Get the rows of the flight events departing from an airport within a time window.
+
+        Args:
+            airport_id: Id in the flight table of the airport the flights depart from.
+            start: Earliest departure timestamp, inclusive.
+            end: Latest departure timestamp, inclusive.
+
+        Returns:
+            The rows of the flight table, sorted by departure time.
+
+        """
+        times = self._departure_times[airport_id]
+        return self._rows[airport_id][bisect_left(times, start) : bisect_right(times, end)]
+
+    def departures_count(self, start: int = MIN_TIMESTAMP, end: int = MAX_TIMESTAMP) -> int:
+        """Count the flight events departing from any airport within a time window.
+
+        Args:
+            start: Earliest departure timestamp, inclusive.
+            end: Latest departure timestamp, inclusive.
+
+        Returns:
+            The amount of flight events, counted with a binary search per airport.
+
+        """
+        return sum(
+            bisect_right(times, end) - bisect_left(times, start) for times in self._departure_times
+        )
+
+    def arrival_rows(
+        self, airport_id: int, start: int = MIN_TIMESTAMP, end: int = MAX_TIMESTAMP
+    ) -> array:
+        """Get the rows of the flight events arriving to an airport within a time window.
+
+        Args:
+            airport_id: Id in the flight table of the airport the flights arrive to.
+            start: Earliest arrival timestamp, inclusive.
+            end: Latest arrival timestamp, inclusive.
+
+        Returns:
+            The rows of the flight table, sorted by arrival time.
+
+        """
+        times = self._arrival_times[airport_id]
+        return self._arrival_rows[airport_id][bisect_left(times, start) : bisect_right(times, end)]
+
+    def departures(
+        self,
+        airport: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> list[FlightEvent]:
+        """Get the flight events departing from an airport within a time window.
+
+        Args:
+            airport: The airport the flights depart from.
+            start: Earliest departure time, inclusive. Unbounded if not given.
+            end: Latest departure time, inclusive. Unbounded if not given.
+
+        Returns:
+            The flight events departing in the window, sorted by departure time.
+
+        """
+        airport_id = self.flight_table.airport_id(airport)
+        if airport_id is None:
+            return []
+        rows = self.departure_rows(
+            airport_id,
+            MIN_TIMESTAMP if start is None else to_timestamp(start),
+            MAX_TIMESTAMP if end is None else to_timestamp(end),
+        )
+        return [self.flight_table[row] for row in rows]
+
+
+def _group_rows(
+    airport_ids: array, times: array, airports_count: int
+) -> tuple[list[array], list[array]]:
+    """Group the rows of a flight table by airport, sorted by time.
+
+    Args:
+        airport_ids: Column with the airport id of each row.
+        times: Column with the time of each row.
+        airports_count: Amount of airports in the flight table.
+
+    Returns:
+        For each airport id, the rows and their times.
+
+    """
+    grouped: list[list[int]] = [[] for _ in range(airports_count)]
+    for row, airport_id in enumerate(airport_ids):
+        grouped[airport_id].append(row)
+
+    grouped_rows = []
+    grouped_times = []
+    for rows in grouped:
+        # sort is stable, so events with the same time keep the feed order
+        rows.sort(key=times.__getitem__)
+        grouped_rows.append(array("I", rows))
+        grouped_times.append(array("q", (times[row] for row in rows)))
+    return grouped_rows, grouped_times
+
+
+def _patch_groups(
+    groups: AirportGroups,
+    airport_ids: array,
+    times: array,
+    airports_count: int,
+    removed_rows: Collection[int],
+    added_rows: list[int],
+) -> AirportGroups:
+    """Group the rows of a flight table by airport, from the groups before some changes.
+
+    Args:
+        groups: Rows and times of each airport, before the changes.
+        airport_ids: Column with the airport id of each row.
+        times: Column with the time of each row.
+        airports_count: Amount of airports in the flight table.
+        removed_rows: Rows to remove from their groups.
+        added_rows: Rows to add to their groups.
+
+    Returns:
+        For each airport id, the rows and their times.
+
+    """
+    grouped_rows, grouped_times = groups
+    new_airports = airports_count - len(grouped_rows)
+    grouped_rows = grouped_rows + [array("I") for _ in range(new_airports)]
+    grouped_times = grouped_times + [array("q") for _ in range(new_airports)]
+
+    changed: dict[int, list[int]] = {airport_ids[row]: [] for row in removed_rows}
+    for row in added_rows:
+        changed.setdefault(airport_ids[row], []).append(row)
+    removed = set(removed_rows)
+    for airport_id, added in changed.items():
+        rows = [row for row in grouped_rows[airport_id] if row not in removed]
+        rows.extend(added)
+        # added rows come last in the table, so ties keep the order of a built index
+        rows.sort(key=times.__getitem__)
+        grouped_rows[airport_id] = array("I", rows)
+        grouped_times[airport_id] = array("q", (times[row] for row in rows))
+    return grouped_rows, grouped_times
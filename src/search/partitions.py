@@ -0,0 +1,73 @@
+"""Partitions of a path search by first flight, to run them in parallel."""
+
+import heapq
+from collections.abc import Iterable
+from dataclasses import replace
+from itertools import islice
+
+from src.models import JourneySort
+
+from .departure_index import DepartureIndex
+from .paths import PathParameters, path_rank_key
+
+
+def split_departure_window(
+    departure_index: DepartureIndex, parameters: PathParameters, partitions: int
+) -> list[PathParameters]:
+    """Split the departure window of a search into windows with as many first flights.
+
+    The paths from each first flight are found independently of the others, so the
+    searches of the windows find the same paths as the search of the whole window.
+    Flights departing at the same time stay in the same window, so the paths of the
+    windows, concatenated in order, are in the same order as the ones of the whole
+    window too.
+
+    Args:
+        departure_index: Index of the flight events the paths are built from.
+        parameters: Parameters of the search.
+        partitions: Max amount of windows.
+
+    Returns:
+        The parameters of the search of each window, in departure order.
+
+    """
+    departure_times = departure_index.flight_table.departure_times
+    first_flights = departure_index.departure_rows(
+        parameters.origin, parameters.departure_from, parameters.departure_to
+    )
+    windows = []
+    departure_from = parameters.departure_from
+    for partition in range(1, partitions):
+        boundary = len(first_flights) * partition // partitions
+        if boundary == 0:
+            continue
+        departure_to = departure_times[first_flights[boundary]] - 1
+        if departure_to >= departure_from:
+            windows.append(
+                replace(parameters, departure_from=departure_from, departure_to=departure_to)
+            )
+            departure_from = departure_to + 1
+    windows.append(replace(parameters, departure_from=departure_from))
+    return windows
+
+
+def merge_ranked_paths(
+    departure_index: DepartureIndex,
+    sort: JourneySort,
+    partitions: Iterable[list[tuple[int, ...]]],
+    limit: int | None = None,
+) -> list[tuple[int, ...]]:
+    """Merge the best paths of each partition of a search into the best ones overall.
+
+    Args:
+        departure_index: Index of the flight events the paths were built from.
+        sort: Criteria the paths are ranked by.
+        partitions: The best paths of each partition, from the best one, up to `limit`.
+        limit: Max amount of paths to keep. All of them if not given.
+
+    Returns:
+        The best paths, from the best one. Ties are in partition order.
+
+    """
+    key = path_rank_key(departure_index.flight_table, sort)
+    return list(islice(heapq.merge(*partitions, key=key), limit))
@@ -0,0 +1,441 @@
+"""Enumeration of the paths between two airports."""
+
+import heapq
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from itertools import count
+
+from src.models import FlightTable, JourneySort
+
+from .departure_index import DepartureIndex
+from .reachability import backward_reachability
+
+# a path prefix, as the row of its last flight and the prefix before it
+PathNode = tuple[int, "PathNode | None"]
+# a path suffix, as the row of its first flight and the suffix after it
+SuffixNode = tuple[int, "SuffixNode | None"]
+# the suffixes from an airport reaching the destination, each with its latest arrival
+Suffixes = list[tuple[int, SuffixNode]]
+# a point a path can connect from, as an airport, arrival timestamp and connections
+SuffixKey = tuple[int, int, int]
+
+
+@dataclass(frozen=True, slots=True)
+class PathParameters:
+    """Parameters of a path search, in flight table ids and microseconds.
+
+    Attributes:
+        origin: Id of the airport the paths depart from.
+        destination: Id of the airport the paths arrive to.
+        departure_from: Earliest departure timestamp of the first flight, inclusive.
+        departure_to: Latest departure timestamp of the first flight, inclusive.
+        max_connections: Max amount of connections between flights of a path.
+        max_connection_wait: Max time between a flight arrival and the next departure.
+        max_duration: Max time between the first departure and the last arrival.
+
+    """
+
+    origin: int
+    destination: int
+    departure_from: int
+    departure_to: int
+    max_connections: int
+    max_connection_wait: int
+    max_duration: int
+
+
+@dataclass(slots=True)
+class SearchStats:
+    """Work done by path searches.
+
+    Attributes:
+        expanded: Flights whose connections were looked up.
+
+    """
+
+    expanded: int = 0
+
+
+class PathSearch:
+    """Flights that can extend a path, shared by the path searches.
+
+    With more than one connection allowed, a backward pre-pass from the destination
+    finds the fewest flights and latest departure from each airport that can still
+    reach it, and flights to airports that can't finish the journey within the max
+    connections, or arrive after their latest useful departure, are skipped. With a
+    single connection, the flights from the intermediate airport are looked up anyway.
+
+    The suffixes reaching the destination are memoized by the airport, arrival time
+    and connections they continue from, as those are all the flights that can follow
+    depend on. Paths arriving to the same airport at the same time share them, instead
+    of exploring the same flights again.
+    """
+
+    def __init__(
+        self,
+        departure_index: DepartureIndex,
+        parameters: PathParameters,
+        stats: SearchStats | None = None,
+    ) -> None:
+        """Initialize the search, running the backward pre-pass if worth it."""
+        self.departure_index = departure_index
+        self.parameters = parameters
+        self.stats = SearchStats() if stats is None else stats
+        self.to_airports = departure_index.flight_table.to_airports
+        self.arrival_times = departure_index.flight_table.arrival_times
+        self.departure_times = departure_index.flight_table.departure_times
+        self.hops: list[int] | None = None
+        self.latest_departures: list[int] | None = None
+        if parameters.max_connections > 1:
+            reachability = backward_reachability(
+                departure_index,
+                parameters.destination,
+                parameters.departure_from,
+                parameters.departure_to + parameters.max_duration,
+                parameters.max_connections,
+            )
+            self.hops = reachability.hops
+            self.latest_departures = reachability.latest_departures
+        self.suffixes_memo: dict[SuffixKey, Suffixes] = {}
+
+    def first_flights(self) -> list[int]:
+        """Get the first flights of the paths, in departure order."""
+        parameters = self.parameters
+        first_flights = self.departure_index.departure_rows(
+            parameters.origin, parameters.departure_from, parameters.departure_to
+        )
+        if self.hops is None:
+            return list(first_flights)
+        return [row for row in first_flights if self.can_finish(row, 0)]
+
+    def next_flights(self, row: int, connections: int, max_arrival_time: int) -> list[int]:
+        """Get the flights that can follow a flight in a path, in departure order.
+
+        Args:
+            row: The last flight of the path.
+            connections: Amount of connections of the path.
+            max_arrival_time: Latest arrival timestamp allowed for the path.
+
+        """
+        return self.connecting_flights(
+            self.to_airports[row], self.arrival_times[row], connections, max_arrival_time
+        )
+
+    def connecting_flights(
+        self, airport: int, arrival_time: int, connections: int, max_arrival_time: int
+    ) -> list[int]:
+        """Get the flights a path arriving to an airport can continue with, in departure order.
+
+        Args:
+            airport: The airport the path arrives to.
+            arrival_time: Arrival timestamp of the path to the airport.
+            connections: Amount of connections of the path.
+            max_arrival_time: Latest arrival timestamp allowed for the path.
+
+        """
+        parameters = self.parameters
+        # discard paths with too many connections
+        if connections >= parameters.max_connections:
+            return []
+
+        self.stats.expanded += 1
+        arrival_times = self.arrival_times
+        hops = self.hops
+        # only flights departing after the arrival, without a long connection time
+        next_flights = self.departure_index.departure_rows(
+            airport, arrival_time, arrival_time + parameters.max_connection_wait
+        )
+        return [
+            next_flight
+            for next_flight in next_flights
+            # discard paths with too long travel time across the journey
+            if arrival_times[next_flight] <= max_arrival_time
+            # discard flights to airports the destination can't be reached from
+            and (hops is None or self.can_finish(next_flight, connections + 1))
+        ]
+
+    def suffixes(self, airport: int, arrival_time: int, connections: int) -> Suffixes:
+        """Get the suffixes a path arriving to an airport can reach the destination with.
+
+        The suffixes are computed once for the latest arrival any path arriving at that
+        time could be allowed, and each path keeps the ones arriving early enough for
+        it. They are computed bottom-up with an explicit stack, memoizing the suffixes
+        of every connection on the way.
+
+        Args:
+            airport: The airport the path arrives to.
+            arrival_time: Arrival timestamp of the path to the airport.
+            connections: Amount of connections of the path.
+
+        Returns:
+            The suffixes in depth-first order following the departure times, each with
+            the latest arrival timestamp of its flights.
+
+        """
+        memo = self.suffixes_memo
+        key = (airport, arrival_time, connections)
+        if key in memo:
+            return memo[key]
+
+        to_airports = self.to_airports
+        arrival_times = self.arrival_times
+        destination = self.parameters.destination
+        stack: list[tuple[SuffixKey, int, list[int]]] = []
+
+        def push(key: SuffixKey) -> None:
+            airport, arrival_time, connections = key
+            max_arrival_time = self.__max_arrival_time(arrival_time)
+            next_flights = self.connecting_flights(
+                airport, arrival_time, connections, max_arrival_time
+            )
+            stack.append((key, max_arrival_time, next_flights))
+
+        push(key)
+        while stack:
+            current, max_arrival_time, next_flights = stack[-1]
+            if current in memo:
+                # reached through several connections before being computed
+                stack.pop()
+                continue
+
+            connections = current[2] + 1
+            pending = False
+            for next_flight in next_flights:
+                next_key = (to_airports[next_flight], arrival_times[next_flight], connections)
+                if next_key[0] != destination and next_key not in memo:
+                    push(next_key)
+                    pending = True
+            if pending:
+                continue
+
+            stack.pop()
+            suffixes: Suffixes = []
+            for next_flight in next_flights:
+                next_arrival_time = arrival_times[next_flight]
+                next_airport = to_airports[next_flight]
+                if next_airport == destination:
+                    suffixes.append((next_arrival_time, (next_flight, None)))
+                    continue
+                for suffix_arrival_time, suffix in memo[
+                    (next_airport, next_arrival_time, connections)
+                ]:
+                    if suffix_arrival_time <= max_arrival_time:
+                        suffixes.append(
+                            (max(next_arrival_time, suffix_arrival_time), (next_flight, suffix))
+                        )
+            memo[current] = suffixes
+        return memo[key]
+
+    def __max_arrival_time(self, arrival_time: int) -> int:
+        """Latest arrival allowed for any path arriving somewhere at a given time.
+
+        Flights arrive after they depart, so the path departed no later than that, and
+        no later than the latest departure of the search.
+        """
+        parameters = self.parameters
+        return min(arrival_time, parameters.departure_to) + parameters.max_duration
+
+    def can_finish(self, row: int, connections: int) -> bool:
+        """Check whether a path ending with a flight could still reach the destination."""
+        airport = self.to_airports[row]
+        return (
+            connections + self.hops[airport] <= self.parameters.max_connections
+            and self.arrival_times[row] <= self.latest_departures[airport]
+        )
+
+
+def enumerate_paths(
+    departure_index: DepartureIndex,
+    parameters: PathParameters,
+    memoize: bool = True,
+    stats: SearchStats | None = None,
+) -> Iterator[tuple[int, ...]]:
+    """Enumerate the valid paths from the origin to the destination.
+
+    The search is a depth-first traversal with an explicit stack, so it doesn't
+    recurse once per flight. Branches are pruned before their connections are
+    looked up.
+
+    By default, the suffixes reaching the destination are memoized, so paths
+    connecting at the same airport and time share them. Otherwise, paths share their
+    prefixes through parent pointers and are only copied when they reach the
+    destination, and each one is yielded as soon as it is found.
+
+    Args:
+        departure_index: Index of the flight events to build paths from.
+        parameters: Parameters of the search.
+        memoize: Whether to memoize the suffixes reaching the destination.
+        stats: Stats to add the work done by the search to.
+
+    Yields:
+        The paths, as rows of the flight table, in depth-first order following the
+        departure times.
+
+    """
+    search = PathSearch(departure_index, parameters, stats)
+    if memoize:
+        yield from _enumerate_memoized_paths(search)
+        return
+
+    to_airports = search.to_airports
+    destination = parameters.destination
+    for first_flight in search.first_flights():
+        max_arrival_time = search.departure_times[first_flight] + parameters.max_duration
+        stack: list[tuple[int, PathNode | None, int]] = [(first_flight, None, 0)]
+        while stack:
+            row, parent, connections = stack.pop()
+            if to_airports[row] == destination:
+                yield _build_path((row, parent))
+                continue
+
+            node = (row, parent)
+            next_flights = search.next_flights(row, connections, max_arrival_time)
+            # pushed in reverse, so they are popped in departure order
+            for next_flight in reversed(next_flights):
+                stack.append((next_flight, node, connections + 1))
+
+
+def _enumerate_memoized_paths(search: PathSearch) -> Iterator[tuple[int, ...]]:
+    """Enumerate the valid paths from each first flight and its memoized suffixes."""
+    parameters = search.parameters
+    to_airports = search.to_airports
+    arrival_times = search.arrival_times
+    for first_flight in search.first_flights():
+        airport = to_airports[first_flight]
+        if airport == parameters.destination:
+            yield (first_flight,)
+            continue
+
+        max_arrival_time = search.departure_times[first_flight] + parameters.max_duration
+        for suffix_arrival_time, suffix in search.suffixes(airport, arrival_times[first_flight], 0):
+            if suffix_arrival_time <= max_arrival_time:
+                yield (first_flight, *_suffix_rows(suffix))
+
+
+def rank_paths(
+    departure_index: DepartureIndex,
+    parameters: PathParameters,
+    sort: JourneySort,
+    limit: int | None = None,
+    stats: SearchStats | None = None,
+) -> Iterator[tuple[int, ...]]:
+    """Enumerate the best valid paths from the origin to the destination.
+
+    The search is best-first: partial paths are explored in order of a lower bound
+    of the rank of any path extending them, so paths are completed in rank order and
+    the search stops as soon as `limit` paths are found, without exploring the
+    branches that can't beat them.
+
+    Args:
+        departure_index: Index of the flight events to build paths from.
+        parameters: Parameters of the search.
+        sort: Criteria to rank the paths.
+        limit: Max amount of paths to find. All of them if not given.
+        stats: Stats to add the work done by the search to.
+
+    Yields:
+        The paths, as rows of the flight table, from the best one.
+
+    """
+    search = PathSearch(departure_index, parameters, stats)
+    to_airports = search.to_airports
+    arrival_times = search.arrival_times
+    hops = search.hops
+    destination = parameters.destination
+
+    def rank(row: int, connections: int, first_departure_time: int) -> tuple[int, int]:
+        """Lower bound of the rank of the paths extending a path, as a sortable key.
+
+        The arrival time and connections can only grow as flights are added, so they
+        are lower bounds for every path extending the current one.
+        """
+        if sort == JourneySort.FEWEST_CONNECTIONS:
+            airport = to_airports[row]
+            if airport != destination:
+                connections += 1 if hops is None else hops[airport]
+            return connections, arrival_times[row]
+        if sort == JourneySort.SHORTEST_DURATION:
+            return arrival_times[row] - first_departure_time, arrival_times[row]
+        return arrival_times[row], connections
+
+    # ties are broken by the order paths were found, so the ranking is stable
+    sequence = count()
+    heap = []
+    for first_flight in search.first_flights():
+        first_departure_time = search.departure_times[first_flight]
+        heap.append(
+            (
+                rank(first_flight, 0, first_departure_time),
+                next(sequence),
+                (first_flight, None),
+                0,
+                first_departure_time,
+            )
+        )
+    heapq.heapify(heap)
+
+    found = 0
+    while heap and (limit is None or found < limit):
+        _, _, node, connections, first_departure_time = heapq.heappop(heap)
+        row = node[0]
+        if to_airports[row] == destination:
+            yield _build_path(node)
+            found += 1
+            continue
+
+        max_arrival_time = first_departure_time + parameters.max_duration
+        for next_flight in search.next_flights(row, connections, max_arrival_time):
+            heapq.heappush(
+                heap,
+                (
+                    rank(next_flight, connections + 1, first_departure_time),
+                    next(sequence),
+                    (next_flight, node),
+                    connections + 1,
+                    first_departure_time,
+                ),
+            )
+
+
+def path_rank_key(
+    flight_table: FlightTable, sort: JourneySort
+) -> Callable[[tuple[int, ...]], tuple[int, int]]:
+    """Get the key to sort paths of a flight table by a ranking criteria.
+
+    Paths are ranked as `rank_paths` finds them: by arrival and then connections, by
+    duration and then arrival, or by connections and then arrival.
+    """
+    arrival_times = flight_table.arrival_times
+    departure_times = flight_table.departure_times
+
+    def key(path: tuple[int, ...]) -> tuple[int, int]:
+        arrival_time = arrival_times[path[-1]]
+        connections = len(path) - 1
+        if sort == JourneySort.FEWEST_CONNECTIONS:
+            return connections, arrival_time
+        if sort == JourneySort.SHORTEST_DURATION:
+            return arrival_time - departure_times[path[0]], arrival_time
+        return arrival_time, connections
+
+    return key
+
+
+def _build_path(node: PathNode) -> tuple[int, ...]:
+    """Build a path from its last node, following the parent pointers."""
+    rows = []
+    current: PathNode | None = node
+    while current is not None:
+        rows.append(current[0])
+        current = current[1]
+    rows.reverse()
+    return tuple(rows)
+
+
+def _suffix_rows(node: SuffixNode) -> list[int]:
+    """Get the rows of a suffix, following the next pointers."""
+    rows = []
+    current: SuffixNode | None = node
+    while current is not None:
+        rows.append(current[0])
+        current = current[1]
+    return rows
@@ -0,0 +1,121 @@
+"""Round-based search of the Pareto-optimal paths between two airports."""
+
+from collections.abc import Iterator
+from itertools import groupby, islice
+
+from src.models import JourneySort
+
+from .departure_index import MAX_TIMESTAMP, DepartureIndex
+from .paths import PathParameters, PathSearch, SearchStats, path_rank_key
+from .reachability import UNREACHABLE
+
+
+def raptor_paths(
+    departure_index: DepartureIndex,
+    parameters: PathParameters,
+    sort: JourneySort | None = None,
+    limit: int | None = None,
+    stats: SearchStats | None = None,
+) -> Iterator[tuple[int, ...]]:
+    """Find the Pareto-optimal paths from the origin to the destination.
+
+    A path is kept unless another one departs no earlier, arrives no later and has
+    no more connections. This is a round-based search in the spirit of RAPTOR, where
+    every flight is a trip of its own: round `k` boards the flights reachable with
+    `k` connections from the ones boarded in round `k - 1`.
+
+    The first flights are searched from the latest departure backwards, the ones
+    departing at the same time together, and a flight is only boarded again if it is
+    reached with fewer connections than before. Once a flight was boarded departing
+    later, any path continuing from it departing earlier is dominated, as the later
+    one is allowed the same connections and a later arrival. So every flight is
+    boarded at most once per amount of connections, and the search is close to
+    linear in the flights that can be part of a path.
+
+    Args:
+        departure_index: Index of the flight events to build paths from.
+        parameters: Parameters of the search.
+        sort: Criteria to rank the paths. In departure order if not given.
+        limit: Max amount of paths to find. All of them if not given.
+        stats: Stats to add the work done by the search to.
+
+    Returns:
+        The paths, as rows of the flight table.
+
+    """
+    search = PathSearch(departure_index, parameters, stats)
+    stats = search.stats
+    departure_times = search.departure_times
+    arrival_times = search.arrival_times
+    to_airports = search.to_airports
+    hops = search.hops
+    destination = parameters.destination
+
+    # fewest connections each flight was boarded with, and the flight before it
+    boarded = [UNREACHABLE] * len(departure_index.flight_table)
+    previous_flights: list[int | None] = [None] * len(departure_index.flight_table)
+    # earliest arrival to the destination found with each amount of connections
+    best_arrival_times = [MAX_TIMESTAMP + 1] * (parameters.max_connections + 1)
+
+    paths = []
+    # first flights departing at the same time are searched at once, so a path from one
+    # of them doesn't keep one from another that arrives earlier with fewer connections
+    first_flights = reversed(search.first_flights())
+    for departure_time, group in groupby(first_flights, key=departure_times.__getitem__):
+        max_arrival_time = departure_time + parameters.max_duration
+        round_flights = list(group)
+        for first_flight in round_flights:
+            boarded[first_flight] = 0
+            previous_flights[first_flight] = None
+        for connections in range(parameters.max_connections + 1):
+            next_round_flights = []
+            arrivals = []
+            for row in round_flights:
+                if to_airports[row] == destination:
+                    arrivals.append(row)
+                    continue
+                if connections >= parameters.max_connections:
+                    continue
+                # like `search.connecting_flights`, checking the cheapest condition first
+                stats.expanded += 1
+                arrival_time = arrival_times[row]
+                for next_flight in departure_index.departure_rows(
+                    to_airports[row], arrival_time, arrival_time + parameters.max_connection_wait
+                ):
+                    if (
+                        boarded[next_flight] <= connections + 1
+                        or arrival_times[next_flight] > max_arrival_time
+                        or (
+                            hops is not None and not search.can_finish(next_flight, connections + 1)
+                        )
+                    ):
+                        continue
+                    boarded[next_flight] = connections + 1
+                    previous_flights[next_flight] = row
+                    next_round_flights.append(next_flight)
+
+            for row in sorted(arrivals, key=arrival_times.__getitem__):
+                if min(best_arrival_times[: connections + 1]) <= arrival_times[row]:
+                    continue
+                best_arrival_times[connections] = arrival_times[row]
+                paths.append(_build_path(row, previous_flights))
+
+            if not next_round_flights:
+                break
+            round_flights = next_round_flights
+
+    paths.sort(key=lambda path: [departure_times[row] for row in path])
+    if sort is not None:
+        paths.sort(key=path_rank_key(departure_index.flight_table, sort))
+    return islice(paths, limit)
+
+
+def _build_path(row: int, previous_flights: list[int | None]) -> tuple[int, ...]:
+    """Build a path from its last flight, following the flights before each one."""
+    rows = []
+    current: int | None = row
+    while current is not None:
+        rows.append(current)
+        current = previous_flights[current]
+    rows.reverse()
+    return tuple(rows)
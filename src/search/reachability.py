@@ -0,0 +1,84 @@
+"""Backward reachability toward a destination."""
+
+from dataclasses import dataclass
+
+from .departure_index import MIN_TIMESTAMP, DepartureIndex
+
+UNREACHABLE = 2**31
+
+
+@dataclass(frozen=True, slots=True)
+class Reachability:
+    """How each airport can reach a destination.
+
+    Both values are bounds computed without connection wait and journey duration
+    limits, so a flight can be discarded when they are not met, but meeting them
+    doesn't guarantee the destination is reached.
+
+    Attributes:
+        hops: Fewest flights from each airport id to the destination, or
+            `UNREACHABLE` if it can't be reached within the max amount of flights.
+        latest_departures: Latest departure timestamp from each airport id of a flight
+            that can still reach the destination, `MIN_TIMESTAMP` if there is none.
+
+    """
+
+    hops: list[int]
+    latest_departures: list[int]
+
+
+def backward_reachability(
+    departure_index: DepartureIndex,
+    destination: int,
+    departure_from: int,
+    arrival_to: int,
+    max_flights: int,
+) -> Reachability:
+    """Walk the flights backward from a destination.
+
+    Rounds go one flight further from the destination each, like a backward
+    round-based search: round `k` only looks at flights arriving to the airports
+    whose latest departure improved in round `k - 1`, no later than that departure.
+
+    Args:
+        departure_index: Index of the flight events.
+        destination: Id of the destination airport.
+        departure_from: Earliest departure timestamp of the flights to consider.
+        arrival_to: Latest arrival timestamp to the destination.
+        max_flights: Max amount of flights from an airport to the destination.
+
+    Returns:
+        The reachability of each airport.
+
+    """
+    flight_table = departure_index.flight_table
+    from_airports = flight_table.from_airports
+    departure_times = flight_table.departure_times
+    airports_count = len(flight_table.airports)
+
+    hops = [UNREACHABLE] * airports_count
+    latest_departures = [MIN_TIMESTAMP] * airports_count
+    hops[destination] = 0
+    latest_departures[destination] = arrival_to
+
+    frontier = {destination}
+    for flights in range(1, max_flights + 1):
+        improved = set()
+        for airport in frontier:
+            for row in departure_index.arrival_rows(
+                airport, MIN_TIMESTAMP, latest_departures[airport]
+            ):
+                departure_time = departure_times[row]
+                origin = from_airports[row]
+                if departure_time < departure_from or origin == destination:
+                    continue
+                if departure_time > latest_departures[origin]:
+                    latest_departures[origin] = departure_time
+                    improved.add(origin)
+                if hops[origin] > flights:
+                    hops[origin] = flights
+        if not improved:
+            break
+        frontier = improved
+
+    return Reachability(hops=hops, latest_departures=latest_departures)
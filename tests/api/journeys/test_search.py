@@ -1,17 +1,30 @@
 """Test the search journeys endpoint."""
 
-from collections.abc import Generator
-from datetime import datetime
+import json
+from collections.abc import AsyncIterator, Generator
+from datetime import date, datetime
 from unittest.mock import AsyncMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
 
+from src.commands import SearchJourneysBatchCommand, SearchJourneysCommand
 from src.core.config import Settings
-from src.core.dependencies import get_settings
+from src.core.dependencies import (
+    get_flight_events_repository,
+    get_journey_search_cache,
+    get_settings,
+)
 from src.main import app
-from src.models import FlightEvent, Journey
+from src.models import (
+    FlightEvent,
+    Journey,
+    JourneySearchQuery,
+    JourneySearchResult,
+    JourneySort,
+)
 from src.repositories.flight_events import FlightEventRetrievalError
+from src.search import JourneySearchCache
 
 
 @pytest.fixture(name="client")
@@ -22,7 +35,17 @@ def client_fixture(settings: Settings) -> Generator[TestClient, None, None]:
         """Override the session dependency."""
         yield settings
 
+    def get_flight_events_repository_override() -> AsyncMock:
+        """Override the flight events repository dependency."""
+        return AsyncMock()
+
+    def get_journey_search_cache_override() -> JourneySearchCache:
+        """Override the journey search cache dependency, caching nothing."""
+        return JourneySearchCache(maxsize=0)
+
     app.dependency_overrides[get_settings] = get_settings_override
+    app.dependency_overrides[get_flight_events_repository] = get_flight_events_repository_override
+    app.dependency_overrides[get_journey_search_cache] = get_journey_search_cache_override
 
     client = TestClient(app)
     yield client
@@ -79,3 +102,234 @@ class TestSearchJourneys:
         response = client.get("/journeys/search?date=2025-05-25&from=LON&to=PAR")
         assert response.status_code == 500
         assert response.json() == {"detail": "Failed to retrieve flight events"}
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            pytest.param("sort=cheapest", id="invalid-sort"),
+            pytest.param("limit=0", id="invalid-limit"),
+        ],
+    )
+    async def test_search_invalid_ranking(self, client: TestClient, query: str) -> None:
+        """Test the search journeys endpoint rejects invalid ranking parameters."""
+        response = client.get(f"/journeys/search?date=2024-09-12&from=BUE&to=MAD&{query}")
+        assert response.status_code == 422
+
+    async def test_search_date_range(self, client: TestClient) -> None:
+        """Test the journeys of each date of a range are searched in a batch."""
+        with patch.object(
+            SearchJourneysBatchCommand,
+            "execute",
+            autospec=True,
+            side_effect=lambda command: [
+                JourneySearchResult(query=query, journeys=[]) for query in command.queries
+            ],
+        ) as execute:
+            response = client.get(
+                "/journeys/search?date_from=2024-09-12&date_to=2024-09-14&from=BUE&to=MAD"
+                "&sort=earliest_arrival&limit=3"
+            )
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"query": {"date": day, "from": "BUE", "to": "MAD"}, "journeys": []}
+            for day in ("2024-09-12", "2024-09-13", "2024-09-14")
+        ]
+        command = execute.call_args.args[0]
+        assert (command.sort, command.limit) == (JourneySort.EARLIEST_ARRIVAL, 3)
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            pytest.param("", id="no-date"),
+            pytest.param("date=2024-09-12&date_from=2024-09-12&date_to=2024-09-13", id="both"),
+            pytest.param("date_from=2024-09-12", id="no-date-to"),
+            pytest.param("date_to=2024-09-12", id="no-date-from"),
+            pytest.param("date_from=2024-09-13&date_to=2024-09-12", id="reversed"),
+            pytest.param("date_from=2024-09-01&date_to=2024-10-02", id="too-long"),
+        ],
+    )
+    async def test_search_invalid_dates(self, client: TestClient, query: str) -> None:
+        """Test the search journeys endpoint rejects invalid dates and date ranges."""
+        response = client.get(f"/journeys/search?from=BUE&to=MAD&{query}")
+        assert response.status_code == 422
+
+    @pytest.mark.parametrize(
+        "url,headers",
+        [
+            pytest.param(
+                "/journeys/search?date=2024-09-12&from=BUE&to=MAD&format=normalized",
+                {},
+                id="query",
+            ),
+            pytest.param(
+                "/journeys/search?date=2024-09-12&from=BUE&to=MAD",
+                {"Accept": "application/vnd.journeys.normalized+json"},
+                id="accept-header",
+            ),
+        ],
+    )
+    async def test_search_normalized(
+        self, client: TestClient, url: str, headers: dict[str, str]
+    ) -> None:
+        """Test the search journeys endpoint responds normalized journeys."""
+        first_flight, *connections = (
+            FlightEvent(
+                flight_number=flight_number,
+                from_airport=from_airport,
+                to_airport=to_airport,
+                departure_time=datetime(2024, 9, 12, hour, 0, 0),
+                arrival_time=datetime(2024, 9, 12, hour + 1, 0, 0),
+            )
+            for flight_number, from_airport, to_airport, hour in (
+                ("XX1234", "BUE", "LIM", 10),
+                ("XX1235", "LIM", "MAD", 12),
+                ("XX1236", "LIM", "MAD", 14),
+            )
+        )
+        journeys = [Journey(path=[first_flight, connection]) for connection in connections]
+
+        with patch("src.commands.SearchJourneysCommand.execute", AsyncMock(return_value=journeys)):
+            response = client.get(url, headers=headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/vnd.journeys.normalized+json"
+        assert response.json() == {
+            "legs": [
+                {
+                    "flight_number": flight_number,
+                    "from": from_airport,
+                    "to": to_airport,
+                    "departure_time": f"2024-09-12 {hour}:00:00",
+                    "arrival_time": f"2024-09-12 {hour + 1}:00:00",
+                }
+                for flight_number, from_airport, to_airport, hour in (
+                    ("XX1234", "BUE", "LIM", 10),
+                    ("XX1235", "LIM", "MAD", 12),
+                    ("XX1236", "LIM", "MAD", 14),
+                )
+            ],
+            "journeys": [[0, 1], [0, 2]],
+        }
+
+    async def test_search_invalid_format(self, client: TestClient) -> None:
+        """Test the search journeys endpoint rejects unknown response formats."""
+        response = client.get("/journeys/search?date=2024-09-12&from=BUE&to=MAD&format=xml")
+        assert response.status_code == 422
+
+    @pytest.mark.parametrize(
+        "url,headers",
+        [
+            pytest.param(
+                "/journeys/search?date=2024-09-12&from=BUE&to=MAD&stream=true", {}, id="query"
+            ),
+            pytest.param(
+                "/journeys/search?date=2024-09-12&from=BUE&to=MAD",
+                {"Accept": "application/x-ndjson"},
+                id="accept-header",
+            ),
+        ],
+    )
+    async def test_search_stream(
+        self, client: TestClient, url: str, headers: dict[str, str]
+    ) -> None:
+        """Test the search journeys endpoint streams journeys as NDJSON."""
+
+        async def iter_journeys(self: SearchJourneysCommand) -> AsyncIterator[Journey]:
+            for flight_number in ("XX1234", "XX1235"):
+                yield Journey(
+                    path=[
+                        FlightEvent(
+                            flight_number=flight_number,
+                            from_airport="BUE",
+                            to_airport="MAD",
+                            departure_time=datetime(2024, 9, 12, 10, 0, 0),
+                            arrival_time=datetime(2024, 9, 12, 11, 0, 0),
+                        ),
+                    ],
+                )
+
+        with patch("src.commands.SearchJourneysCommand.iter_journeys", iter_journeys):
+            response = client.get(url, headers=headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = response.text.splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {
+                "connections": 0,
+                "path": [
+                    {
+                        "flight_number": flight_number,
+                        "from": "BUE",
+                        "to": "MAD",
+                        "departure_time": "2024-09-12 10:00:00",
+                        "arrival_time": "2024-09-12 11:00:00",
+                    }
+                ],
+            }
+            for flight_number in ("XX1234", "XX1235")
+        ]
+
+    async def test_search_stream_fails_retrieval_error(self, client: TestClient) -> None:
+        """Test the streamed search fails before starting if the retrieval error is raised."""
+
+        async def iter_journeys(self: SearchJourneysCommand) -> AsyncIterator[Journey]:
+            raise FlightEventRetrievalError("Failed to retrieve flight events")
+            yield
+
+        with patch("src.commands.SearchJourneysCommand.iter_journeys", iter_journeys):
+            response = client.get("/journeys/search?date=2025-05-25&from=LON&to=PAR&stream=true")
+
+        assert response.status_code == 500
+        assert response.json() == {"detail": "Failed to retrieve flight events"}
+
+
+@pytest.mark.asyncio
+class TestSearchJourneysBatch:
+    """Test the POST /journeys/search/batch endpoint."""
+
+    @patch(
+        "src.commands.SearchJourneysBatchCommand.execute",
+        AsyncMock(
+            return_value=[
+                JourneySearchResult(
+                    query=JourneySearchQuery(
+                        date=date(2024, 9, 12), from_airport="BUE", to_airport="MAD"
+                    ),
+                    journeys=[],
+                ),
+            ]
+        ),
+    )
+    async def test_search_batch_success(self, client: TestClient) -> None:
+        """Test the search journeys batch endpoint."""
+        response = client.post(
+            "/journeys/search/batch",
+            json={"queries": [{"date": "2024-09-12", "from": "BUE", "to": "MAD"}]},
+        )
+        assert response.status_code == 200
+        assert response.json() == [
+            {"query": {"date": "2024-09-12", "from": "BUE", "to": "MAD"}, "journeys": []}
+        ]
+
+    async def test_search_batch_invalid_query(self, client: TestClient) -> None:
+        """Test the search journeys batch endpoint validates the queries."""
+        response = client.post(
+            "/journeys/search/batch",
+            json={"queries": [{"date": "2024-09-12", "from": "BUENOS AIRES", "to": "MAD"}]},
+        )
+        assert response.status_code == 422
+
+    @patch(
+        "src.commands.SearchJourneysBatchCommand.execute",
+        AsyncMock(side_effect=FlightEventRetrievalError("Failed to retrieve flight events")),
+    )
+    async def test_search_batch_fails_retrieval_error(self, client: TestClient) -> None:
+        """Test the search journeys batch endpoint fails if the retrieval error is raised."""
+        response = client.post(
+            "/journeys/search/batch",
+            json={"queries": [{"date": "2025-05-25", "from": "LON", "to": "PAR"}]},
+        )
+        assert response.status_code == 500
+        assert response.json() == {"detail": "Failed to retrieve flight events"}
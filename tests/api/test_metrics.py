@@ -0,0 +1,77 @@
+"""Test the metrics of the API."""
+
+from collections.abc import Generator
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.core.config import Settings
+from src.core.dependencies import (
+    get_flight_events_repository,
+    get_journey_search_cache,
+    get_settings,
+)
+from src.core.metrics import MetricsRegistry
+from src.main import app
+from src.models import FlightEvent, FlightTable
+from src.repositories.flight_events import FlightEventsSnapshot
+from src.search import JourneySearchCache
+
+
+@pytest.fixture(name="client")
+def client_fixture(settings: Settings) -> Generator[TestClient, None, None]:
+    """Get a test client for the application, searching a single flight event."""
+    flight_table = FlightTable.from_events(
+        [
+            FlightEvent(
+                flight_number="IB1234",
+                from_airport="MAD",
+                to_airport="BUE",
+                departure_time=datetime(2021, 12, 31, 10, 0, 0, tzinfo=UTC),
+                arrival_time=datetime(2021, 12, 31, 12, 0, 0, tzinfo=UTC),
+            )
+        ]
+    )
+    search_cache = JourneySearchCache(maxsize=0)
+    app.dependency_overrides[get_settings] = lambda: settings
+    app.dependency_overrides[get_flight_events_repository] = lambda: AsyncMock(
+        **{"snapshot.return_value": FlightEventsSnapshot(flight_table)}
+    )
+    app.dependency_overrides[get_journey_search_cache] = lambda: search_cache
+    app.state.journey_search_cache = search_cache
+
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    app.state.metrics = None
+
+
+class TestMetrics:
+    """Test the Server-Timing header and the GET /metrics endpoint."""
+
+    def test_metrics_enabled(self, client: TestClient) -> None:
+        """Test the stages of a search are timed and exposed."""
+        app.state.metrics = MetricsRegistry()
+
+        response = client.get("/journeys/search?date=2021-12-31&from=MAD&to=BUE")
+        assert response.status_code == 200
+        stages = [timing.split(";")[0] for timing in response.headers["Server-Timing"].split(", ")]
+        assert stages == ["index", "search", "journeys", "serialize", "total"]
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain")
+        lines = response.text.splitlines()
+        assert 'journey_search_stage_seconds_count{stage="search"} 1' in lines
+        assert "journey_search_journeys_total 1" in lines
+        assert "journey_search_cache_misses_total 0" in lines
+
+    def test_metrics_disabled(self, client: TestClient) -> None:
+        """Test nothing is timed nor exposed when the metrics are disabled."""
+        app.state.metrics = None
+
+        response = client.get("/journeys/search?date=2021-12-31&from=MAD&to=BUE")
+        assert response.status_code == 200
+        assert "Server-Timing" not in response.headers
+        assert client.get("/metrics").status_code == 404
@@ -0,0 +1,89 @@
+"""Test the custom responses of the API."""
+
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+from pydantic import TypeAdapter
+
+from src.api.responses import JourneySerializer, JourneysResponse, NormalizedJourneysResponse
+from src.models import (
+    FlightEvent,
+    Journey,
+    JourneySearchQuery,
+    JourneySearchResult,
+    NormalizedJourneys,
+)
+
+OUTBOUND = FlightEvent(
+    flight_number="IB1234",
+    from_airport="MAD",
+    to_airport="LIM",
+    departure_time=datetime(2021, 12, 31, 10, 0, 0, tzinfo=UTC),
+    arrival_time=datetime(2021, 12, 31, 12, 0, 0, tzinfo=UTC),
+)
+CONNECTIONS = [
+    FlightEvent(
+        flight_number=flight_number,
+        from_airport="LIM",
+        to_airport="BUE",
+        departure_time=datetime(2021, 12, 31, hour, 0, 0, tzinfo=UTC),
+        arrival_time=datetime(2021, 12, 31, hour + 2, 0, 0, tzinfo=UTC),
+    )
+    for flight_number, hour in (("IB2345", 13), ("IB3456", 15))
+]
+JOURNEYS = [Journey(path=[OUTBOUND, connection]) for connection in CONNECTIONS]
+
+
+class TestJourneySerializer:
+    """Test the serializer of journeys by fragments."""
+
+    def test_same_json_as_pydantic(self) -> None:
+        """Test the journeys are serialized as pydantic does, with the aliases."""
+        assert JourneySerializer().journeys(JOURNEYS) == TypeAdapter(list[Journey]).dump_json(
+            JOURNEYS, by_alias=True
+        )
+        assert JourneySerializer().journeys([]) == b"[]"
+
+    def test_search_results_same_json_as_pydantic(self) -> None:
+        """Test the search results are serialized as pydantic does, with the aliases."""
+        query = JourneySearchQuery(
+            date=datetime(2021, 12, 31).date(), **{"from": "MAD", "to": "BUE"}
+        )
+        results = [
+            JourneySearchResult(query=query, journeys=JOURNEYS),
+            JourneySearchResult(query=query, journeys=[]),
+        ]
+        assert JourneySerializer().search_results(results) == TypeAdapter(
+            list[JourneySearchResult]
+        ).dump_json(results, by_alias=True)
+
+    def test_legs_serialized_once(self) -> None:
+        """Test each distinct flight event is serialized once."""
+        with patch.object(
+            FlightEvent, "model_dump_json", autospec=True, side_effect=FlightEvent.model_dump_json
+        ) as model_dump_json:
+            JourneySerializer().journeys(JOURNEYS)
+        assert model_dump_json.call_count == 3
+
+    def test_normalized_journeys(self) -> None:
+        """Test each distinct leg is in the table once and journeys reference them."""
+        normalized = NormalizedJourneys(legs=[OUTBOUND, *CONNECTIONS], journeys=[[0, 1], [0, 2]])
+        assert (
+            JourneySerializer().normalized_journeys(JOURNEYS)
+            == normalized.model_dump_json(by_alias=True).encode()
+        )
+        assert JourneySerializer().normalized_journeys([]) == b'{"legs":[],"journeys":[]}'
+
+
+def test_journeys_response() -> None:
+    """Test the journeys response body and media type."""
+    response = JourneysResponse(JOURNEYS)
+    assert response.media_type == "application/json"
+    assert response.body == JourneySerializer().journeys(JOURNEYS)
+
+
+def test_normalized_journeys_response() -> None:
+    """Test the normalized journeys response body and media type."""
+    response = NormalizedJourneysResponse(JOURNEYS)
+    assert response.media_type == "application/vnd.journeys.normalized+json"
+    assert response.body == JourneySerializer().normalized_journeys(JOURNEYS)
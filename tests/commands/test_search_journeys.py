@@ -1,13 +1,20 @@
 """Test the search journeys command."""
 
-from datetime import UTC, date, datetime
-from unittest.mock import AsyncMock
+from datetime import UTC, date, datetime, timedelta
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
-from src.commands.search_journeys import SearchJourneysCommand
-from src.core.config import Settings
-from src.models.models import FlightEvent, Journey
+from src.commands.search_journeys import JourneySearchKey, SearchJourneysCommand
+from src.core.config import SearchEngine, Settings
+from src.models.flight_table import FlightTable
+from src.models.models import FlightEvent, Journey, JourneySort
+from src.repositories.flight_events.interface import (
+    FlightEventQuery,
+    FlightEventsChange,
+    FlightEventsSnapshot,
+)
+from src.search import DepartureIndex, JourneySearchCache
 
 
 @pytest.mark.asyncio
@@ -192,7 +199,28 @@ class TestSearchJourneysCommand:
                 [],
                 id="discard-too-long-journey",
             ),
-            # Test case 8: journey at the end of the day
+            # Test case 8: discard connection departing before the previous arrival
+            pytest.param(
+                [
+                    FlightEvent(
+                        flight_number="IB1234",
+                        from_airport="MAD",
+                        to_airport="BOG",
+                        departure_time=datetime(2021, 12, 31, 10, 0, 0, tzinfo=UTC),
+                        arrival_time=datetime(2021, 12, 31, 12, 0, 0, tzinfo=UTC),
+                    ),
+                    FlightEvent(
+                        flight_number="IB1235",
+                        from_airport="BOG",
+                        to_airport="BUE",
+                        departure_time=datetime(2021, 12, 31, 11, 0, 0, tzinfo=UTC),
+                        arrival_time=datetime(2021, 12, 31, 15, 0, 0, tzinfo=UTC),
+                    ),
+                ],
+                [],
+                id="discard-connection-before-arrival",
+            ),
+            # Test case 9: journey at the end of the day
             pytest.param(
                 [
                     FlightEvent(
@@ -218,13 +246,29 @@ class TestSearchJourneysCommand:
                 ],
                 id="journey-at-the-end-of-the-day",
             ),
+            # Test case 10: discard journey starting after the search date
+            pytest.param(
+                [
+                    FlightEvent(
+                        flight_number="IB1234",
+                        from_airport="MAD",
+                        to_airport="BUE",
+                        departure_time=datetime(2022, 1, 1, 0, 0, 0, tzinfo=UTC),
+                        arrival_time=datetime(2022, 1, 1, 12, 0, 0, tzinfo=UTC),
+                    ),
+                ],
+                [],
+                id="discard-journey-after-the-date",
+            ),
         ],
     )
+    @pytest.mark.parametrize("engine", list(SearchEngine))
     async def test_search_journeys_command(
         self,
         flight_events: list[FlightEvent],
         expected_journeys: list[Journey],
         settings: Settings,
+        engine: SearchEngine,
     ) -> None:
         """Test the search journeys command with different flight event scenarios.
 
@@ -232,14 +276,272 @@ class TestSearchJourneysCommand:
             flight_events: List of flight events to be returned by the repository
             expected_journeys: Expected list of journeys to be returned by the command
             settings: Settings for the application
+            engine: Engine to search the journeys with
 
         """
-        flight_events_repository = AsyncMock(**{"list.return_value": flight_events})
+        flight_events_repository = AsyncMock(
+            **{
+                "snapshot.return_value": FlightEventsSnapshot(
+                    FlightTable.from_events(flight_events)
+                )
+            }
+        )
         command = SearchJourneysCommand(
             date=date(2021, 12, 31),
             from_airport="MAD",
             to_airport="BUE",
             flight_events_repository=flight_events_repository,
-            settings=settings,
+            settings=settings.model_copy(update={"journey_search_engine": engine}),
         )
         assert await command.execute() == expected_journeys
+
+    async def test_search_journeys_command_query(self, settings: Settings) -> None:
+        """Test the repository is queried with the departure window of the search."""
+        flight_events_repository = AsyncMock(
+            **{"snapshot.return_value": FlightEventsSnapshot(FlightTable())}
+        )
+        command = SearchJourneysCommand(
+            date=date(2021, 12, 31),
+            from_airport="MAD",
+            to_airport="BUE",
+            flight_events_repository=flight_events_repository,
+            settings=settings,
+        )
+        await command.execute()
+        flight_events_repository.snapshot.assert_awaited_once_with(
+            FlightEventQuery(
+                departure_from=datetime(2021, 12, 31, 0, 0, 0, tzinfo=UTC),
+                departure_to=datetime(2022, 1, 1, 23, 59, 59, 999999, tzinfo=UTC),
+                from_airport="MAD",
+                to_airport="BUE",
+            )
+        )
+
+    async def test_search_journeys_command_iter_journeys(self, settings: Settings) -> None:
+        """Test the journeys are yielded as they are found."""
+        flight_events = [
+            FlightEvent(
+                flight_number=flight_number,
+                from_airport="MAD",
+                to_airport="BUE",
+                departure_time=datetime(2021, 12, 31, hour, 0, 0, tzinfo=UTC),
+                arrival_time=datetime(2021, 12, 31, hour + 2, 0, 0, tzinfo=UTC),
+            )
+            for flight_number, hour in (("IB1234", 10), ("IB1235", 8))
+        ]
+        snapshot = FlightEventsSnapshot(FlightTable.from_events(flight_events))
+        command = SearchJourneysCommand(
+            date=date(2021, 12, 31),
+            from_airport="MAD",
+            to_airport="BUE",
+            flight_events_repository=AsyncMock(**{"snapshot.return_value": snapshot}),
+            settings=settings,
+        )
+        journeys = command.iter_journeys()
+        assert await anext(journeys) == Journey(path=[flight_events[1]])
+        assert [journey async for journey in journeys] == [Journey(path=[flight_events[0]])]
+
+    async def test_search_journeys_command_prebuilt_index(self, settings: Settings) -> None:
+        """Test the index of the snapshot is used when the repository built it."""
+        flight_event = FlightEvent(
+            flight_number="IB1234",
+            from_airport="MAD",
+            to_airport="BUE",
+            departure_time=datetime(2021, 12, 31, 10, 0, 0, tzinfo=UTC),
+            arrival_time=datetime(2021, 12, 31, 12, 0, 0, tzinfo=UTC),
+        )
+        departure_index = DepartureIndex([flight_event])
+        snapshot = FlightEventsSnapshot(
+            departure_index.flight_table, departure_index=departure_index
+        )
+        command = SearchJourneysCommand(
+            date=date(2021, 12, 31),
+            from_airport="MAD",
+            to_airport="BUE",
+            flight_events_repository=AsyncMock(**{"snapshot.return_value": snapshot}),
+            settings=settings,
+        )
+        with patch("src.commands.search_journeys.DepartureIndex") as departure_index_class:
+            assert await command.execute() == [Journey(path=[flight_event])]
+        departure_index_class.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "sort,expected_flight_numbers",
+        [
+            pytest.param(JourneySort.EARLIEST_ARRIVAL, ["IB1", "IB3"], id="earliest-arrival"),
+            pytest.param(JourneySort.SHORTEST_DURATION, ["IB2", "IB3"], id="shortest-duration"),
+            pytest.param(JourneySort.FEWEST_CONNECTIONS, ["IB1", "IB2"], id="fewest-connections"),
+        ],
+    )
+    async def test_search_journeys_command_sort(
+        self,
+        settings: Settings,
+        sort: JourneySort,
+        expected_flight_numbers: list[str],
+    ) -> None:
+        """Test the best journeys are returned by the sort criterion, up to the limit."""
+        flight_events = [
+            FlightEvent(
+                flight_number=flight_number,
+                from_airport=from_airport,
+                to_airport=to_airport,
+                departure_time=datetime(2021, 12, 31, departure_hour, 0, 0, tzinfo=UTC),
+                arrival_time=datetime(2021, 12, 31, arrival_hour, 0, 0, tzinfo=UTC),
+            )
+            for flight_number, from_airport, to_airport, departure_hour, arrival_hour in (
+                ("IB1", "MAD", "BUE", 6, 12),
+                ("IB2", "MAD", "BUE", 14, 16),
+                ("IB3", "MAD", "LIM", 8, 9),
+                ("IB4", "LIM", "BUE", 10, 13),
+            )
+        ]
+        snapshot = FlightEventsSnapshot(FlightTable.from_events(flight_events))
+        command = SearchJourneysCommand(
+            date=date(2021, 12, 31),
+            from_airport="MAD",
+            to_airport="BUE",
+            flight_events_repository=AsyncMock(**{"snapshot.return_value": snapshot}),
+            settings=settings,
+            sort=sort,
+            limit=2,
+        )
+        journeys = await command.execute()
+        assert [journey.path[0].flight_number for journey in journeys] == expected_flight_numbers
+
+    async def test_search_journeys_command_cache(self, settings: Settings) -> None:
+        """Test the journeys are cached until the flight events feed changes."""
+        flight_event = FlightEvent(
+            flight_number="IB1234",
+            from_airport="MAD",
+            to_airport="BUE",
+            departure_time=datetime(2021, 12, 31, 10, 0, 0, tzinfo=UTC),
+            arrival_time=datetime(2021, 12, 31, 12, 0, 0, tzinfo=UTC),
+        )
+        flight_table = FlightTable.from_events([flight_event])
+        flight_events_repository = AsyncMock(
+            **{"snapshot.return_value": FlightEventsSnapshot(flight_table, version="v1")}
+        )
+        search_cache = JourneySearchCache(maxsize=8)
+
+        def command() -> SearchJourneysCommand:
+            return SearchJourneysCommand(
+                date=date(2021, 12, 31),
+                from_airport="MAD",
+                to_airport="BUE",
+                flight_events_repository=flight_events_repository,
+                settings=settings,
+                search_cache=search_cache,
+            )
+
+        journeys = await command().execute()
+        assert journeys == [Journey(path=[flight_event])]
+        with patch.object(SearchJourneysCommand, "search") as search:
+            assert await command().execute() == journeys
+            assert [journey async for journey in command().iter_journeys()] == journeys
+            search.assert_not_called()
+        assert (search_cache.hits, search_cache.misses) == (2, 1)
+
+        flight_events_repository.snapshot.return_value = FlightEventsSnapshot(
+            FlightTable(), version="v2"
+        )
+        assert await command().execute() == []
+        assert (search_cache.hits, search_cache.misses) == (2, 2)
+
+
+def build_search_key(max_connections: int) -> JourneySearchKey:
+    """Build the key of a search from MAD to BUE on 2022-01-01, lasting up to a day."""
+    return JourneySearchKey(
+        date=date(2022, 1, 1),
+        from_airport="MAD",
+        to_airport="BUE",
+        max_connections=max_connections,
+        max_connection_wait=timedelta(hours=4),
+        max_journey_duration=timedelta(hours=24),
+        engine=SearchEngine.PATHS,
+        sort=None,
+        limit=None,
+    )
+
+
+def build_flight_event(from_airport: str, to_airport: str, departure_time: datetime) -> FlightEvent:
+    """Build a flight event lasting two hours."""
+    return FlightEvent(
+        flight_number="IB1234",
+        from_airport=from_airport,
+        to_airport=to_airport,
+        departure_time=departure_time,
+        arrival_time=departure_time + timedelta(hours=2),
+    )
+
+
+class TestJourneySearchKey:
+    """Test which changes of the flight events affect a cached search."""
+
+    @pytest.mark.parametrize(
+        "flight_event,max_connections,expected",
+        [
+            pytest.param(
+                build_flight_event("MAD", "BUE", datetime(2022, 1, 1, 10, tzinfo=UTC)),
+                0,
+                True,
+                id="direct-flight",
+            ),
+            pytest.param(
+                build_flight_event("MAD", "PMI", datetime(2022, 1, 1, 10, tzinfo=UTC)),
+                0,
+                False,
+                id="direct-search-other-destination",
+            ),
+            pytest.param(
+                build_flight_event("MAD", "PMI", datetime(2022, 1, 1, 10, tzinfo=UTC)),
+                1,
+                True,
+                id="connection-from-origin",
+            ),
+            pytest.param(
+                build_flight_event("PMI", "BUE", datetime(2022, 1, 2, 10, tzinfo=UTC)),
+                1,
+                True,
+                id="connection-to-destination-next-day",
+            ),
+            pytest.param(
+                build_flight_event("PMI", "BCN", datetime(2022, 1, 1, 10, tzinfo=UTC)),
+                1,
+                False,
+                id="connection-elsewhere",
+            ),
+            pytest.param(
+                build_flight_event("PMI", "BCN", datetime(2022, 1, 1, 10, tzinfo=UTC)),
+                2,
+                True,
+                id="connections-elsewhere",
+            ),
+            pytest.param(
+                build_flight_event("MAD", "BUE", datetime(2022, 1, 3, 10, tzinfo=UTC)),
+                2,
+                False,
+                id="out-of-window",
+            ),
+        ],
+    )
+    def test_affected_by(
+        self, flight_event: FlightEvent, max_connections: int, expected: bool
+    ) -> None:
+        """Test a search is affected by the flight events that may be part of its journeys."""
+        assert build_search_key(max_connections).affected_by([flight_event]) is expected
+
+    def test_rebase_cache(self) -> None:
+        """Test only the cached searches affected by a change are removed."""
+        search_cache = JourneySearchCache(maxsize=8)
+        direct, connecting = build_search_key(0), build_search_key(1)
+        search_cache.set(direct, "v1", [])
+        search_cache.set(connecting, "v1", [])
+        change = FlightEventsChange(
+            previous_version="v1",
+            version="v2",
+            flight_events=[build_flight_event("MAD", "PMI", datetime(2022, 1, 1, 10, tzinfo=UTC))],
+        )
+
+        assert SearchJourneysCommand.rebase_cache(search_cache, change) == 1
+        assert search_cache.get(direct, "v2") == []
+        assert search_cache.get(connecting, "v2") is None
@@ -0,0 +1,124 @@
+"""Test the search journeys batch command."""
+
+from datetime import UTC, date, datetime
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.commands.search_journeys_batch import SearchJourneysBatchCommand
+from src.core.config import Settings
+from src.models.flight_table import FlightTable
+from src.models.models import (
+    FlightEvent,
+    Journey,
+    JourneySearchQuery,
+    JourneySearchResult,
+    JourneySort,
+)
+from src.repositories.flight_events.interface import FlightEventQuery, FlightEventsSnapshot
+from src.search import JourneySearchCache
+
+FLIGHT_EVENTS = [
+    FlightEvent(
+        flight_number="IB1234",
+        from_airport="MAD",
+        to_airport="BUE",
+        departure_time=datetime(2021, 12, 31, 10, 0, 0, tzinfo=UTC),
+        arrival_time=datetime(2021, 12, 31, 12, 0, 0, tzinfo=UTC),
+    ),
+    FlightEvent(
+        flight_number="IB1235",
+        from_airport="BUE",
+        to_airport="MAD",
+        departure_time=datetime(2022, 1, 1, 13, 0, 0, tzinfo=UTC),
+        arrival_time=datetime(2022, 1, 1, 15, 0, 0, tzinfo=UTC),
+    ),
+]
+
+
+@pytest.mark.asyncio
+class TestSearchJourneysBatchCommand:
+    """Test the search journeys batch command."""
+
+    async def test_search_journeys_batch_command(self, settings: Settings) -> None:
+        """Test distinct queries are searched against a single snapshot."""
+        snapshot = FlightEventsSnapshot(FlightTable.from_events(FLIGHT_EVENTS))
+        flight_events_repository = AsyncMock(**{"snapshot.return_value": snapshot})
+        outbound = JourneySearchQuery(date=date(2021, 12, 31), from_airport="MAD", to_airport="BUE")
+        inbound = JourneySearchQuery(date=date(2022, 1, 1), from_airport="BUE", to_airport="MAD")
+        no_journeys = JourneySearchQuery(
+            date=date(2021, 12, 31), from_airport="BUE", to_airport="MAD"
+        )
+        command = SearchJourneysBatchCommand(
+            queries=[outbound, inbound, outbound, no_journeys],
+            flight_events_repository=flight_events_repository,
+            settings=settings,
+        )
+
+        assert await command.execute() == [
+            JourneySearchResult(query=outbound, journeys=[Journey(path=[FLIGHT_EVENTS[0]])]),
+            JourneySearchResult(query=inbound, journeys=[Journey(path=[FLIGHT_EVENTS[1]])]),
+            JourneySearchResult(query=no_journeys, journeys=[]),
+        ]
+        flight_events_repository.snapshot.assert_awaited_once_with(
+            FlightEventQuery(
+                departure_from=datetime(2021, 12, 31, 0, 0, 0, tzinfo=UTC),
+                departure_to=datetime(2022, 1, 2, 23, 59, 59, 999999, tzinfo=UTC),
+            )
+        )
+
+    async def test_search_journeys_batch_command_cache(self, settings: Settings) -> None:
+        """Test cached queries are not searched again, nor the flight events indexed."""
+        snapshot = FlightEventsSnapshot(FlightTable.from_events(FLIGHT_EVENTS), version="v1")
+        flight_events_repository = AsyncMock(**{"snapshot.return_value": snapshot})
+        search_cache = JourneySearchCache(maxsize=8)
+        outbound = JourneySearchQuery(date=date(2021, 12, 31), from_airport="MAD", to_airport="BUE")
+
+        def command() -> SearchJourneysBatchCommand:
+            return SearchJourneysBatchCommand(
+                queries=[outbound],
+                flight_events_repository=flight_events_repository,
+                settings=settings,
+                search_cache=search_cache,
+            )
+
+        results = await command().execute()
+        with patch("src.commands.search_journeys.DepartureIndex") as departure_index:
+            assert await command().execute() == results
+            departure_index.assert_not_called()
+        assert (search_cache.hits, search_cache.misses) == (1, 1)
+
+    async def test_search_journeys_batch_command_sort(self, settings: Settings) -> None:
+        """Test the journeys of each query are ranked and limited, as for a date range."""
+        flight_events = [
+            FlightEvent(
+                flight_number=flight_number,
+                from_airport="MAD",
+                to_airport="BUE",
+                departure_time=datetime(2021, 12, day, departure_hour, 0, 0, tzinfo=UTC),
+                arrival_time=datetime(2021, 12, day, arrival_hour, 0, 0, tzinfo=UTC),
+            )
+            for flight_number, day, departure_hour, arrival_hour in (
+                ("IB1", 30, 6, 12),
+                ("IB2", 30, 8, 10),
+                ("IB3", 31, 6, 9),
+                ("IB4", 31, 7, 8),
+            )
+        ]
+        snapshot = FlightEventsSnapshot(FlightTable.from_events(flight_events))
+        queries = [
+            JourneySearchQuery(date=date(2021, 12, day), from_airport="MAD", to_airport="BUE")
+            for day in (30, 31)
+        ]
+        command = SearchJourneysBatchCommand(
+            queries=queries,
+            flight_events_repository=AsyncMock(**{"snapshot.return_value": snapshot}),
+            settings=settings,
+            sort=JourneySort.EARLIEST_ARRIVAL,
+            limit=1,
+        )
+
+        assert await command.execute() == [
+            JourneySearchResult(query=queries[0], journeys=[Journey(path=[flight_events[1]])]),
+            JourneySearchResult(query=queries[1], journeys=[Journey(path=[flight_events[3]])]),
+        ]
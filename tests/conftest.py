@@ -1,8 +1,15 @@
 """Configuration for the tests."""
 
+import random
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
 import pytest
 
 from src.core.config import Settings
+from src.models import FlightEvent
+
+AIRPORTS = ["MAD", "BUE", "BOG", "GRU", "LIM", "SCL"]
 
 
 @pytest.fixture
@@ -14,3 +21,33 @@ def settings() -> Settings:
         max_journey_duration_hours=24,
         max_connextion_duration_hours=4,
     )
+
+
+@pytest.fixture
+def random_flight_events() -> Callable[[int, int], list[FlightEvent]]:
+    """Fixture for a factory of random flight events between a few airports.
+
+    The factory takes a seed and the amount of flight events, and returns flight
+    events over two days starting on 2021-12-31.
+    """
+
+    def factory(seed: int, amount: int) -> list[FlightEvent]:
+        rng = random.Random(seed)
+        flight_events = []
+        for number in range(amount):
+            from_airport, to_airport = rng.sample(AIRPORTS, 2)
+            departure_time = datetime(2021, 12, 31, tzinfo=UTC) + timedelta(
+                minutes=15 * rng.randrange(4 * 48)
+            )
+            flight_events.append(
+                FlightEvent(
+                    flight_number=f"IB{number:04}",
+                    from_airport=from_airport,
+                    to_airport=to_airport,
+                    departure_time=departure_time,
+                    arrival_time=departure_time + timedelta(minutes=30 * rng.randint(1, 12)),
+                )
+            )
+        return flight_events
+
+    return factory
@@ -0,0 +1,54 @@
+"""Test the in-process metrics."""
+
+from src.core import metrics
+from src.core.metrics import MetricsRegistry
+
+
+class TestMetrics:
+    """Test the in-process metrics."""
+
+    def test_nothing_recorded_outside_requests(self) -> None:
+        """Test stages and counters are ignored when not recording."""
+        with metrics.timed("search"):
+            pass
+        metrics.record("fetch", 1.0)
+        metrics.count("journeys", 3)
+
+        with metrics.recording() as request_metrics:
+            pass
+        assert request_metrics.timings == {}
+        assert request_metrics.counters == {}
+
+    def test_recording(self) -> None:
+        """Test stages are timed and counters added while recording."""
+        with metrics.recording() as request_metrics:
+            metrics.record("fetch", 0.5)
+            with metrics.timed("search"):
+                pass
+            metrics.record("fetch", 0.25)
+            metrics.count("journeys", 3)
+            metrics.count("journeys")
+
+        assert list(request_metrics.timings) == ["fetch", "search"]
+        assert request_metrics.timings["fetch"] == 0.75
+        assert request_metrics.timings["search"] >= 0
+        assert request_metrics.counters == {"journeys": 4}
+
+    def test_render(self) -> None:
+        """Test the metrics of every request are rendered in the Prometheus format."""
+        registry = MetricsRegistry()
+        for seconds in (0.002, 0.2):
+            with metrics.recording() as request_metrics:
+                metrics.record("search", seconds)
+                metrics.count("journeys", 2)
+            registry.collect(request_metrics)
+
+        lines = registry.render({"cache_hits": 1}).splitlines()
+        assert 'journey_search_stage_seconds_bucket{stage="search",le="0.001"} 0' in lines
+        assert 'journey_search_stage_seconds_bucket{stage="search",le="0.0025"} 1' in lines
+        assert 'journey_search_stage_seconds_bucket{stage="search",le="0.25"} 2' in lines
+        assert 'journey_search_stage_seconds_bucket{stage="search",le="+Inf"} 2' in lines
+        assert 'journey_search_stage_seconds_sum{stage="search"} 0.202' in lines
+        assert 'journey_search_stage_seconds_count{stage="search"} 2' in lines
+        assert "journey_search_journeys_total 4" in lines
+        assert "journey_search_cache_hits_total 1" in lines
@@ -0,0 +1,222 @@
+"""Test the pool of processes searching journeys."""
+
+import asyncio
+from collections.abc import Callable, Iterator
+from datetime import date
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from src.commands.search_journeys import SearchJourneysCommand
+from src.core.config import Settings
+from src.core.search_pool import SearchPool
+from src.models import FlightEvent, FlightTable, JourneySort
+from src.repositories.flight_events import FlightEventsAPIRepository
+from src.repositories.flight_events.interface import FlightEventsSnapshot
+from src.search import DepartureIndex, SearchStats, enumerate_paths, path_rank_key, rank_paths
+
+
+@pytest.fixture(scope="module")
+def search_pool() -> Iterator[SearchPool]:
+    """Fixture for a pool of two workers running every search."""
+    search_pool = SearchPool(workers=2, threshold=0)
+    yield search_pool
+    search_pool.close()
+
+
+@pytest.fixture
+def snapshot(
+    random_flight_events: Callable[[int, int], list[FlightEvent]],
+) -> FlightEventsSnapshot:
+    """Fixture for a versioned snapshot of random flight events."""
+    return FlightEventsSnapshot(
+        flight_table=FlightTable.from_events(random_flight_events(0, 400)), version="v1"
+    )
+
+
+def command(
+    settings: Settings, snapshot: FlightEventsSnapshot, **kwargs: object
+) -> SearchJourneysCommand:
+    """Build a command searching journeys from MAD to BUE on the snapshot."""
+    return SearchJourneysCommand(
+        date=date(2021, 12, 31),
+        from_airport="MAD",
+        to_airport="BUE",
+        flight_events_repository=AsyncMock(snapshot=AsyncMock(return_value=snapshot)),
+        settings=settings.model_copy(update={"max_connections": 2}),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+class TestSearchPool:
+    """Test the pool of processes searching journeys."""
+
+    async def test_same_paths_as_inline_search(
+        self, settings: Settings, search_pool: SearchPool, snapshot: FlightEventsSnapshot
+    ) -> None:
+        """Test the paths found in the pool, in order, match the ones found inline."""
+        departure_index = DepartureIndex(snapshot.flight_table)
+        parameters = command(settings, snapshot).path_parameters(snapshot.flight_table)
+        stats = SearchStats()
+        paths = await search_pool.search(snapshot, departure_index, parameters, stats=stats)
+
+        assert paths
+        assert paths == list(enumerate_paths(departure_index, parameters))
+        assert stats.expanded > 0
+
+    @pytest.mark.parametrize("limit", [None, 3])
+    @pytest.mark.parametrize("sort", list(JourneySort))
+    async def test_same_ranking_as_inline_search(
+        self,
+        settings: Settings,
+        search_pool: SearchPool,
+        snapshot: FlightEventsSnapshot,
+        sort: JourneySort,
+        limit: int | None,
+    ) -> None:
+        """Test the paths ranked in the pool are ranked as the ones found inline."""
+        departure_index = DepartureIndex(snapshot.flight_table)
+        parameters = command(settings, snapshot).path_parameters(snapshot.flight_table)
+        paths = await search_pool.search(snapshot, departure_index, parameters, sort, limit)
+        ranked = list(rank_paths(departure_index, parameters, sort, limit))
+
+        key = path_rank_key(snapshot.flight_table, sort)
+        assert [key(path) for path in paths] == [key(path) for path in ranked]
+
+    async def test_command_journeys(
+        self, settings: Settings, search_pool: SearchPool, snapshot: FlightEventsSnapshot
+    ) -> None:
+        """Test the command finds the same journeys in the pool as inline, in order."""
+        journeys = await command(settings, snapshot, search_pool=search_pool).execute()
+
+        assert journeys
+        assert journeys == await command(settings, snapshot).execute()
+
+    async def test_command_ranked_journeys(
+        self, settings: Settings, search_pool: SearchPool, snapshot: FlightEventsSnapshot
+    ) -> None:
+        """Test the command ranks the journeys found in the pool as inline."""
+        sort = JourneySort.EARLIEST_ARRIVAL
+        journeys = await command(settings, snapshot, sort=sort, search_pool=search_pool).execute()
+        inline_journeys = await command(settings, snapshot, sort=sort).execute()
+
+        # journeys arriving at the same time may be in a different order
+        assert [journey.path[-1].arrival_time for journey in journeys] == [
+            journey.path[-1].arrival_time for journey in inline_journeys
+        ]
+        assert {journey.model_dump_json() for journey in journeys} == {
+            journey.model_dump_json() for journey in inline_journeys
+        }
+
+    async def test_handles_large_versioned_searches(
+        self, settings: Settings, snapshot: FlightEventsSnapshot
+    ) -> None:
+        """Test only versioned searches with enough relevant flight events run in the pool."""
+        departure_index = DepartureIndex(snapshot.flight_table)
+        parameters = command(settings, snapshot).path_parameters(snapshot.flight_table)
+        relevant = departure_index.departures_count(
+            parameters.departure_from, parameters.departure_to + parameters.max_duration
+        )
+        search_pool = SearchPool(workers=1, threshold=relevant)
+        try:
+            assert search_pool.handles(snapshot, departure_index, parameters)
+            search_pool.threshold = relevant + 1
+            assert not search_pool.handles(snapshot, departure_index, parameters)
+            search_pool.threshold = 0
+            unversioned = FlightEventsSnapshot(flight_table=snapshot.flight_table)
+            assert not search_pool.handles(unversioned, departure_index, parameters)
+        finally:
+            search_pool.close()
+
+    async def test_snapshot_files_of_latest_feeds_kept(
+        self,
+        settings: Settings,
+        search_pool: SearchPool,
+        random_flight_events: Callable[[int, int], list[FlightEvent]],
+    ) -> None:
+        """Test the workers search the latest feed, with the files of older ones removed."""
+        for version, seed in (("v2", 1), ("v3", 2), ("v4", 3)):
+            snapshot = FlightEventsSnapshot(
+                flight_table=FlightTable.from_events(random_flight_events(seed, 200)),
+                version=version,
+            )
+            journeys = await command(settings, snapshot, search_pool=search_pool).execute()
+            assert journeys == await command(settings, snapshot).execute()
+
+        assert sorted(search_pool._snapshot_files) == ["v3", "v4"]
+        assert all(path.exists() for path, _ in search_pool._snapshot_files.values())
+
+    async def test_snapshot_files_kept_while_searched(
+        self,
+        settings: Settings,
+        search_pool: SearchPool,
+        random_flight_events: Callable[[int, int], list[FlightEvent]],
+    ) -> None:
+        """Test files of older feeds are only removed once their queued searches finish."""
+        snapshots = [
+            FlightEventsSnapshot(
+                flight_table=FlightTable.from_events(random_flight_events(seed, 200)),
+                version=f"v{seed}",
+            )
+            for seed in range(10, 16)
+        ]
+        journeys = await asyncio.gather(
+            *(
+                command(settings, snapshot, search_pool=search_pool).execute()
+                for snapshot in snapshots
+            )
+        )
+
+        for snapshot, snapshot_journeys in zip(snapshots, journeys, strict=True):
+            assert snapshot_journeys == await command(settings, snapshot).execute()
+        assert sorted(search_pool._snapshot_files) == ["v14", "v15"]
+        assert search_pool._searches == {}
+        assert sorted(Path(search_pool._directory.name).iterdir()) == sorted(
+            path for path, _ in search_pool._snapshot_files.values()
+        )
+
+
+@pytest.mark.asyncio
+async def test_uncached_feed_windows(settings: Settings) -> None:
+    """Test searches on other dates of an uncached feed search their own flight events."""
+    payload = [
+        {
+            "flight_number": flight_number,
+            "departure_city": from_airport,
+            "arrival_city": to_airport,
+            "departure_datetime": departure_time,
+            "arrival_datetime": arrival_time,
+        }
+        for flight_number, from_airport, to_airport, departure_time, arrival_time in (
+            ("A1", "MAD", "BUE", "2022-01-01T10:00:00Z", "2022-01-01T12:00:00Z"),
+            ("B1", "LIM", "SCL", "2022-01-05T10:00:00Z", "2022-01-05T13:00:00Z"),
+            ("C1", "SCL", "MAD", "2022-01-05T15:00:00Z", "2022-01-05T20:00:00Z"),
+        )
+    ]
+    http_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda _: httpx.Response(200, json=payload))
+    )
+    settings.flight_events_cache_ttl_seconds = 0
+    repository = FlightEventsAPIRepository(settings, http_client)
+    search_pool = SearchPool(workers=1, threshold=0)
+    try:
+        for day, from_airport, to_airport, flight_number in (
+            (date(2022, 1, 1), "MAD", "BUE", "A1"),
+            (date(2022, 1, 5), "LIM", "SCL", "B1"),
+        ):
+            journeys = await SearchJourneysCommand(
+                date=day,
+                from_airport=from_airport,
+                to_airport=to_airport,
+                flight_events_repository=repository,
+                settings=settings,
+                search_pool=search_pool,
+            ).execute()
+            assert [[leg.flight_number for leg in journey.path] for journey in journeys] == [
+                [flight_number]
+            ]
+    finally:
+        search_pool.close()
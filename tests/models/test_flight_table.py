@@ -0,0 +1,85 @@
+"""Test the columnar flight table."""
+
+from datetime import UTC, datetime, timedelta, timezone
+
+import pytest
+
+from src.models import FlightEvent, FlightTable, FlightTableBuilder
+
+FLIGHT_EVENTS = [
+    FlightEvent(
+        flight_number="IB1234",
+        from_airport="MAD",
+        to_airport="BUE",
+        departure_time=datetime(2021, 12, 31, 23, 59, 59, 123000, tzinfo=UTC),
+        arrival_time=datetime(2022, 1, 1, 9, 0, 0, tzinfo=timezone(timedelta(hours=-3))),
+    ),
+    FlightEvent(
+        flight_number="AR12",
+        from_airport="BUE",
+        to_airport="MAD",
+        departure_time=datetime(2022, 1, 1, 13, 0, 0),
+        arrival_time=datetime(2022, 1, 2, 5, 0, 0),
+    ),
+]
+
+
+class TestFlightTable:
+    """Test the columnar flight table."""
+
+    @pytest.fixture
+    def flight_table(self) -> FlightTable:
+        """Fixture for a table with the flight events."""
+        return FlightTable.from_events(FLIGHT_EVENTS)
+
+    def test_flight_events_round_trip(self, flight_table: FlightTable) -> None:
+        """Test the flight events are built back with the same values and timezones."""
+        assert len(flight_table) == 2
+        assert list(flight_table) == FLIGHT_EVENTS
+        assert flight_table[-1] == FLIGHT_EVENTS[-1]
+        assert flight_table[0].arrival_time.utcoffset() == timedelta(hours=-3)
+        assert flight_table[1].departure_time.tzinfo is None
+
+    def test_flight_events_serialization(self, flight_table: FlightTable) -> None:
+        """Test built flight events serialize as the original ones."""
+        assert [event.model_dump(by_alias=True) for event in flight_table] == [
+            event.model_dump(by_alias=True) for event in FLIGHT_EVENTS
+        ]
+
+    def test_airports_interned(self, flight_table: FlightTable) -> None:
+        """Test airports are stored as ids shared across rows."""
+        assert flight_table.airports == ["MAD", "BUE"]
+        assert flight_table.airport_id("BUE") == 1
+        assert flight_table.airport_id("GRU") is None
+        assert list(flight_table.from_airports) == [0, 1]
+        assert list(flight_table.to_airports) == [1, 0]
+
+    @pytest.mark.parametrize(
+        "start,end,expected",
+        [
+            pytest.param(None, None, [0, 1], id="unbounded"),
+            pytest.param(datetime(2022, 1, 1, tzinfo=UTC), None, [1], id="naive-as-utc"),
+            pytest.param(None, datetime(2021, 12, 31, 23, 59, 59, tzinfo=UTC), [], id="end"),
+        ],
+    )
+    def test_departing(
+        self,
+        flight_table: FlightTable,
+        start: datetime | None,
+        end: datetime | None,
+        expected: list[int],
+    ) -> None:
+        """Test the rows departing within a window."""
+        assert flight_table.departing(start, end) == expected
+
+    def test_copy_appended(self, flight_table: FlightTable) -> None:
+        """Test rows appended to a copy of the table don't change the original."""
+        builder = FlightTableBuilder(flight_table.copy())
+        builder.append(FLIGHT_EVENTS[0].model_copy(update={"to_airport": "GRU"}))
+        appended = builder.build()
+
+        assert list(flight_table) == FLIGHT_EVENTS
+        assert list(appended)[:2] == FLIGHT_EVENTS
+        assert appended[2].to_airport == "GRU"
+        assert appended.airports == ["MAD", "BUE", "GRU"]
+        assert flight_table.airports == ["MAD", "BUE"]
@@ -0,0 +1,71 @@
+"""Test the changes to the flight events feed applied to a snapshot."""
+
+from datetime import UTC, datetime, timedelta
+
+from src.models import FlightEvent, FlightTable
+from src.repositories.flight_events.changes import FlightEventsDelta, apply_delta
+from src.repositories.flight_events.interface import FlightEventsSnapshot
+from src.search import DepartureIndex
+
+FLIGHT_EVENTS = [
+    FlightEvent(
+        flight_number=f"IB{number:04}",
+        from_airport="MAD",
+        to_airport="BUE",
+        departure_time=datetime(2022, 1, 1, tzinfo=UTC) + timedelta(hours=number),
+        arrival_time=datetime(2022, 1, 1, 12, tzinfo=UTC) + timedelta(hours=number),
+    )
+    for number in range(8)
+]
+
+
+def snapshot() -> FlightEventsSnapshot:
+    """Get an indexed snapshot of the flight events."""
+    flight_table = FlightTable.from_events(FLIGHT_EVENTS)
+    return FlightEventsSnapshot(
+        flight_table=flight_table, version="v1", departure_index=DepartureIndex(flight_table)
+    )
+
+
+def delete(*flight_events: FlightEvent) -> FlightEventsDelta:
+    """Get a delta deleting flight events."""
+    return FlightEventsDelta(
+        upserts=[],
+        deletes=[
+            (event.flight_number, event.from_airport, event.departure_time)
+            for event in flight_events
+        ],
+    )
+
+
+def test_removed_rows_kept() -> None:
+    """Test a few removed rows are left in the table, out of the index."""
+    previous = snapshot()
+    patched, changed = apply_delta(
+        previous, previous.departure_index, delete(FLIGHT_EVENTS[0]), "v2"
+    )
+
+    assert changed == FLIGHT_EVENTS[:1]
+    assert len(patched.flight_table) == len(FLIGHT_EVENTS)
+    assert patched.removed_rows == {0}
+    assert patched.departure_index.departures("MAD") == FLIGHT_EVENTS[1:]
+
+
+def test_removed_rows_compacted() -> None:
+    """Test the table is built again without the removed rows once they are many."""
+    previous = snapshot()
+    patched, _ = apply_delta(previous, previous.departure_index, delete(FLIGHT_EVENTS[0]), "v2")
+    upsert = FLIGHT_EVENTS[1].model_copy(update={"to_airport": "LIM"})
+    compacted, changed = apply_delta(
+        patched,
+        patched.departure_index,
+        FlightEventsDelta(upserts=[upsert], deletes=delete(FLIGHT_EVENTS[2]).deletes),
+        "v3",
+    )
+
+    assert changed == [FLIGHT_EVENTS[1], FLIGHT_EVENTS[2], upsert]
+    assert compacted.version == "v3"
+    assert compacted.removed_rows == frozenset()
+    assert list(compacted.flight_table) == [*FLIGHT_EVENTS[3:], upsert]
+    assert compacted.departure_index.flight_table is compacted.flight_table
+    assert compacted.departure_index.departures("MAD") == [upsert, *FLIGHT_EVENTS[3:]]
@@ -1,90 +1,629 @@
 """Test the flight events API."""
 
-from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+from collections.abc import Callable, Generator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
 
+import httpx
 import pytest
 
+from src.core import metrics
 from src.core.config import Settings
 from src.models import FlightEvent
+from src.repositories.flight_events.cache import MAX_CACHED_FEEDS, flight_events_cache
 from src.repositories.flight_events.exceptions import FlightEventRetrievalError
+from src.repositories.flight_events.interface import FlightEventQuery
 from src.repositories.flight_events.main import FlightEventsAPIRepository
 
+FLIGHT_EVENTS_PAYLOAD = [
+    {
+        "flight_number": "IB1234",
+        "departure_city": "MAD",
+        "arrival_city": "BUE",
+        "departure_datetime": "2021-12-31T23:59:59.000Z",
+        "arrival_datetime": "2022-01-01T12:00:00.000Z",
+    },
+    {
+        "flight_number": "IB2345",
+        "departure_city": "MAD",
+        "arrival_city": "VLC",
+        "departure_datetime": "2022-01-01T17:00:00.000Z",
+        "arrival_datetime": "2022-01-02T18:00:00.000Z",
+    },
+]
+
+FLIGHT_EVENTS = [
+    FlightEvent(
+        flight_number="IB1234",
+        from_airport="MAD",
+        to_airport="BUE",
+        departure_time="2021-12-31T23:59:59.000Z",
+        arrival_time="2022-01-01T12:00:00.000Z",
+    ),
+    FlightEvent(
+        flight_number="IB2345",
+        from_airport="MAD",
+        to_airport="VLC",
+        departure_time="2022-01-01T17:00:00.000Z",
+        arrival_time="2022-01-02T18:00:00.000Z",
+    ),
+]
+
+Handler = Callable[[httpx.Request], httpx.Response]
+CONCURRENT_REQUESTS = 5
+
+
+@pytest.fixture(autouse=True)
+def clear_flight_events_cache() -> Generator[None, None, None]:
+    """Start every test with an empty flight events cache."""
+    flight_events_cache.clear()
+    yield
+    flight_events_cache.clear()
+
+
+def build_repository(
+    settings: Settings, *responses: httpx.Response
+) -> tuple[FlightEventsAPIRepository, list[httpx.Request]]:
+    """Build a repository whose API answers with the given responses, in order.
+
+    Returns:
+        The repository and the list where the requests sent to the API are recorded.
+
+    """
+    requests = []
+    pending = list(responses)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return pending.pop(0)
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return FlightEventsAPIRepository(settings, http_client), requests
+
+
+def build_blocked_repository(
+    settings: Settings, response: httpx.Response
+) -> tuple[FlightEventsAPIRepository, list[httpx.Request], asyncio.Event]:
+    """Build a repository whose API only answers once an event is set.
+
+    Returns:
+        The repository, the list where the requests sent to the API are recorded, and
+        the event releasing the response to every request.
+
+    """
+    requests = []
+    released = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await released.wait()
+        return response
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return FlightEventsAPIRepository(settings, http_client), requests, released
+
 
 @pytest.mark.asyncio
 class TestFlightEventsAPI:
     """Test the flight events API."""
 
-    @pytest.fixture
-    def repository(self, settings: Settings) -> FlightEventsAPIRepository:
-        """Fixture for the repository."""
-        return FlightEventsAPIRepository(settings)
-
-    @patch(
-        "httpx.AsyncClient.get",
-        AsyncMock(
-            **{
-                "return_value": MagicMock(
-                    **{
-                        "is_error": False,
-                        "status_code": 200,
-                        "json.return_value": [
-                            {
-                                "flight_number": "IB1234",
-                                "departure_city": "MAD",
-                                "arrival_city": "BUE",
-                                "departure_datetime": "2021-12-31T23:59:59.000Z",
-                                "arrival_datetime": "2022-01-01T12:00:00.000Z",
-                            },
-                            {
-                                "flight_number": "IB2345",
-                                "departure_city": "MAD",
-                                "arrival_city": "VLC",
-                                "departure_datetime": "2022-01-01T17:00:00.000Z",
-                                "arrival_datetime": "2022-01-02T18:00:00.000Z",
-                            },
-                        ],
-                    }
-                )
-            }
-        ),
-    )
-    async def test_flight_events_api_list(self, repository: FlightEventsAPIRepository) -> None:
+    async def test_flight_events_api_list(self, settings: Settings) -> None:
         """Test the flight events API list method."""
+        repository, _ = build_repository(settings, httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD))
         flight_events = await repository.list()
-        assert flight_events == [
-            FlightEvent(
-                flight_number="IB1234",
-                from_airport="MAD",
-                to_airport="BUE",
-                departure_time="2021-12-31T23:59:59.000Z",
-                arrival_time="2022-01-01T12:00:00.000Z",
-            ),
-            FlightEvent(
-                flight_number="IB2345",
+        assert flight_events == FLIGHT_EVENTS
+
+    async def test_flight_events_api_list_error(self, settings: Settings) -> None:
+        """Test the flight events API list method with an error."""
+        repository, _ = build_repository(
+            settings, httpx.Response(500, json={"message": "Internal server error"})
+        )
+        with pytest.raises(FlightEventRetrievalError):
+            await repository.list()
+
+    async def test_flight_events_api_list_connection_error(self, settings: Settings) -> None:
+        """Test the flight events API list method when the API can't be reached."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectTimeout("timed out", request=request)
+
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        repository = FlightEventsAPIRepository(settings, http_client)
+        with pytest.raises(FlightEventRetrievalError):
+            await repository.list()
+
+    @pytest.mark.parametrize("payload", [{"events": []}, [1, 2], ["IB1234"]])
+    async def test_flight_events_api_list_invalid_payload(
+        self, settings: Settings, payload: object
+    ) -> None:
+        """Test the flight events API list method with a payload that is not a list of events."""
+        repository, _ = build_repository(settings, httpx.Response(200, json=payload))
+        with pytest.raises(FlightEventRetrievalError):
+            await repository.list()
+
+    @pytest.mark.parametrize("cache_ttl", [0, 300])
+    async def test_flight_events_api_list_query(self, settings: Settings, cache_ttl: float) -> None:
+        """Test only flight events departing in the query window are listed."""
+        settings.flight_events_cache_ttl_seconds = cache_ttl
+        repository, requests = build_repository(
+            settings, httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD)
+        )
+        flight_events = await repository.list(
+            FlightEventQuery(
+                departure_from=datetime(2022, 1, 1, tzinfo=UTC),
+                departure_to=datetime(2022, 1, 1, 23, 59, 59, tzinfo=UTC),
                 from_airport="MAD",
+            )
+        )
+        assert flight_events == FLIGHT_EVENTS[1:]
+        assert dict(requests[0].url.params) == {}
+
+    @pytest.mark.parametrize("cache_ttl", [0, 300])
+    async def test_flight_events_api_list_query_naive_times(
+        self, settings: Settings, cache_ttl: float
+    ) -> None:
+        """Test naive departure times are compared with the query window as UTC."""
+        settings.flight_events_cache_ttl_seconds = cache_ttl
+        payload = [
+            {**record, "departure_datetime": record["departure_datetime"].removesuffix("Z")}
+            for record in FLIGHT_EVENTS_PAYLOAD
+        ]
+        repository, _ = build_repository(settings, httpx.Response(200, json=payload))
+        flight_events = await repository.list(
+            FlightEventQuery(
+                departure_from=datetime(2022, 1, 1, tzinfo=UTC),
+                departure_to=datetime(2022, 1, 1, 23, 59, 59, tzinfo=UTC),
+            )
+        )
+        assert [flight_event.flight_number for flight_event in flight_events] == [
+            flight_event.flight_number for flight_event in FLIGHT_EVENTS[1:]
+        ]
+
+    async def test_flight_events_api_list_query_forwarded(self, settings: Settings) -> None:
+        """Test the query is forwarded to the API when it supports it."""
+        settings.flight_events_api_supports_query = True
+        repository, requests = build_repository(
+            settings, httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD[1:])
+        )
+        flight_events = await repository.list(
+            FlightEventQuery(
+                departure_from=datetime(2022, 1, 1, tzinfo=UTC),
                 to_airport="VLC",
-                departure_time="2022-01-01T17:00:00.000Z",
-                arrival_time="2022-01-02T18:00:00.000Z",
+            )
+        )
+        assert flight_events == FLIGHT_EVENTS[1:]
+        assert dict(requests[0].url.params) == {
+            "departure_from": "2022-01-01T00:00:00+00:00",
+            "destination": "VLC",
+        }
+
+    async def test_flight_events_api_cache_hit(self, settings: Settings) -> None:
+        """Test the feed is not requested again while the cache is fresh."""
+        repository, requests = build_repository(
+            settings, httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD)
+        )
+        first = await repository.snapshot()
+        second = await repository.snapshot()
+
+        assert len(requests) == 1
+        assert second is first
+        assert first.version is not None
+
+    @pytest.mark.parametrize("cache_ttl", [0, 300])
+    async def test_flight_events_api_fetch_indexed(
+        self, settings: Settings, cache_ttl: float
+    ) -> None:
+        """Test fetched feeds are indexed once, cached or only holding the query window."""
+        settings.flight_events_cache_ttl_seconds = cache_ttl
+        repository, _ = build_repository(settings, httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD))
+        snapshot = await repository.snapshot(
+            FlightEventQuery(departure_from=datetime(2022, 1, 1, tzinfo=UTC))
+        )
+
+        assert snapshot.departure_index is not None
+        assert snapshot.departure_index.flight_table is snapshot.flight_table
+        if cache_ttl:
+            assert await repository.snapshot() is snapshot
+
+    async def test_flight_events_api_cache_revalidation(self, settings: Settings) -> None:
+        """Test an expired feed is revalidated and reused when the upstream didn't change."""
+        settings.flight_events_cache_ttl_seconds = 1e-9
+        repository, requests = build_repository(
+            settings,
+            httpx.Response(
+                200,
+                json=FLIGHT_EVENTS_PAYLOAD,
+                headers={"ETag": '"v1"', "Last-Modified": "Fri, 31 Dec 2021 10:00:00 GMT"},
             ),
+            httpx.Response(304),
+        )
+        first = await repository.snapshot()
+        second = await repository.snapshot()
+
+        assert requests[1].headers["If-None-Match"] == '"v1"'
+        assert requests[1].headers["If-Modified-Since"] == "Fri, 31 Dec 2021 10:00:00 GMT"
+        assert second == first
+
+    async def test_flight_events_api_cache_version_changes(self, settings: Settings) -> None:
+        """Test a changed feed is parsed again and gets a new version."""
+        settings.flight_events_cache_ttl_seconds = 0
+        repository, requests = build_repository(
+            settings,
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD),
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD[:1]),
+        )
+        first = await repository.snapshot()
+        second = await repository.snapshot()
+
+        assert len(requests) == 2
+        assert list(second.flight_table) == FLIGHT_EVENTS[:1]
+        assert second.version != first.version
+
+    async def test_flight_events_api_window_version(self, settings: Settings) -> None:
+        """Test uncached snapshots of a feed get a version per query window."""
+        settings.flight_events_cache_ttl_seconds = 0
+        repository, _ = build_repository(
+            settings, *(httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD) for _ in range(3))
+        )
+        first_day = FlightEventQuery(
+            departure_from=datetime(2021, 12, 31, tzinfo=UTC),
+            departure_to=datetime(2021, 12, 31, 23, 59, 59, tzinfo=UTC),
+        )
+        second_day = FlightEventQuery(
+            departure_from=datetime(2022, 1, 1, tzinfo=UTC),
+            departure_to=datetime(2022, 1, 1, 23, 59, 59, tzinfo=UTC),
+        )
+        first = await repository.snapshot(first_day)
+        second = await repository.snapshot(second_day)
+        again = await repository.snapshot(first_day)
+
+        assert list(second.flight_table) == FLIGHT_EVENTS[1:]
+        assert second.version != first.version
+        assert again.version == first.version
+
+    async def test_flight_events_api_cache_bounded(self, settings: Settings) -> None:
+        """Test the least recently used feeds are evicted from the cache."""
+        settings.flight_events_api_supports_query = True
+        repository, requests = build_repository(
+            settings,
+            *(httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD) for _ in range(MAX_CACHED_FEEDS + 2)),
+        )
+        queries = [
+            FlightEventQuery(departure_from=datetime(2022, 1, 1, tzinfo=UTC) + timedelta(days=day))
+            for day in range(MAX_CACHED_FEEDS + 1)
+        ]
+        for query in queries:
+            await repository.snapshot(query)
+        await repository.snapshot(queries[-1])
+        assert len(flight_events_cache) == MAX_CACHED_FEEDS
+        assert len(requests) == MAX_CACHED_FEEDS + 1
+
+        await repository.snapshot(queries[0])
+        assert len(requests) == MAX_CACHED_FEEDS + 2
+
+    async def test_flight_events_api_metrics(self, settings: Settings) -> None:
+        """Test the fetch and parse stages are timed and the flight events counted."""
+        repository, _ = build_repository(settings, httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD))
+        with metrics.recording() as request_metrics:
+            await repository.snapshot()
+
+        assert list(request_metrics.timings) == ["fetch", "parse"]
+        assert request_metrics.counters == {"flight_events_scanned": len(FLIGHT_EVENTS_PAYLOAD)}
+
+    async def test_flight_events_api_save_and_load_snapshot_file(
+        self, settings: Settings, tmp_path: Path
+    ) -> None:
+        """Test a snapshot file of the feed is cached and revalidated once expired."""
+        path = tmp_path / "flight-events.snapshot"
+        repository, requests = build_repository(
+            settings,
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD, headers={"ETag": '"v1"'}),
+            httpx.Response(304),
+        )
+        saved = await repository.save_snapshot_file(path)
+
+        assert repository.load_snapshot_file(path)
+        loaded = await repository.snapshot()
+        assert len(requests) == 1
+        assert list(loaded.flight_table) == FLIGHT_EVENTS
+        assert loaded.version == saved.version
+        assert loaded.departure_index is not None
+
+        settings.flight_events_cache_ttl_seconds = 1e-9
+        repository = FlightEventsAPIRepository(settings, repository.http_client)
+        assert await repository.snapshot() == loaded
+        assert requests[1].headers["If-None-Match"] == '"v1"'
+
+    async def test_flight_events_api_load_snapshot_file_cached(
+        self, settings: Settings, tmp_path: Path
+    ) -> None:
+        """Test a snapshot file doesn't replace a feed cached already."""
+        path = tmp_path / "flight-events.snapshot"
+        repository, _ = build_repository(
+            settings,
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD),
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD[:1]),
+        )
+        await repository.save_snapshot_file(path)
+        cached = await repository.snapshot()
+
+        assert not repository.load_snapshot_file(path)
+        assert await repository.snapshot() is cached
+
+
+@pytest.mark.asyncio
+class TestFlightEventsAPICoalescing:
+    """Test concurrent requests for the same feed share a single fetch."""
+
+    @pytest.mark.parametrize("cache_ttl", [0, 300])
+    async def test_concurrent_snapshots_share_fetch(
+        self, settings: Settings, cache_ttl: float
+    ) -> None:
+        """Test concurrent callers await a single fetch and get the same snapshot."""
+        settings.flight_events_cache_ttl_seconds = cache_ttl
+        repository, requests, released = build_blocked_repository(
+            settings, httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD)
+        )
+        snapshots = asyncio.gather(*(repository.snapshot() for _ in range(CONCURRENT_REQUESTS)))
+        await asyncio.sleep(0.01)
+        released.set()
+        first, *rest = await snapshots
+
+        assert len(requests) == 1
+        assert all(snapshot is first for snapshot in rest)
+        assert list(first.flight_table) == FLIGHT_EVENTS
+
+    async def test_concurrent_snapshots_share_error(self, settings: Settings) -> None:
+        """Test a failed fetch raises a retrieval error to every caller, and isn't kept."""
+        repository, requests, released = build_blocked_repository(
+            settings, httpx.Response(500, json={"message": "Internal server error"})
+        )
+        snapshots = asyncio.gather(
+            *(repository.snapshot() for _ in range(CONCURRENT_REQUESTS)),
+            return_exceptions=True,
+        )
+        await asyncio.sleep(0.01)
+        released.set()
+        errors = await snapshots
+
+        assert len(requests) == 1
+        assert all(isinstance(error, FlightEventRetrievalError) for error in errors)
+        with pytest.raises(FlightEventRetrievalError):
+            await repository.snapshot()
+        assert len(requests) == 2
+
+    async def test_cancelled_caller_does_not_cancel_fetch(self, settings: Settings) -> None:
+        """Test the fetch goes on for the other callers when the first one is cancelled."""
+        repository, requests, released = build_blocked_repository(
+            settings, httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD)
+        )
+        first = asyncio.create_task(repository.snapshot())
+        second = asyncio.create_task(repository.snapshot())
+        await asyncio.sleep(0.01)
+        first.cancel()
+        released.set()
+
+        assert list((await second).flight_table) == FLIGHT_EVENTS
+        assert first.cancelled()
+        assert len(requests) == 1
+
+    async def test_uncached_queries_fetched_separately(self, settings: Settings) -> None:
+        """Test fetches filtered for different queries aren't shared without a cache."""
+        settings.flight_events_cache_ttl_seconds = 0
+        repository, requests, released = build_blocked_repository(
+            settings, httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD)
+        )
+        queries = [
+            FlightEventQuery(departure_from=datetime(2022, 1, 1, tzinfo=UTC)),
+            FlightEventQuery(departure_to=datetime(2022, 1, 1, tzinfo=UTC)),
         ]
+        snapshots = asyncio.gather(*(repository.snapshot(query) for query in queries))
+        await asyncio.sleep(0.01)
+        released.set()
+        later, earlier = await snapshots
+
+        assert len(requests) == 2
+        assert list(later.flight_table) == FLIGHT_EVENTS[1:]
+        assert list(earlier.flight_table) == FLIGHT_EVENTS[:1]
+
+
+@pytest.mark.asyncio
+class TestFlightEventsAPIStaleWhileRevalidate:
+    """Test expired feeds are served while they are revalidated in the background."""
+
+    @pytest.fixture(autouse=True)
+    def stale_settings(self, settings: Settings) -> None:
+        """Expire the cached feed right away, while keeping it usable."""
+        settings.flight_events_cache_ttl_seconds = 1e-9
+        settings.flight_events_max_staleness_seconds = 300
 
-    @patch(
-        "httpx.AsyncClient.get",
-        AsyncMock(
-            **{
-                "return_value": AsyncMock(
-                    **{
-                        "is_error": True,
-                        "status_code": 500,
-                        "json.return_value": {"message": "Internal server error"},
-                    }
-                )
+    async def test_stale_feed_served_while_revalidated(self, settings: Settings) -> None:
+        """Test an expired feed is served without waiting, and replaced once refreshed."""
+        repository, requests = build_repository(
+            settings,
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD),
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD[:1]),
+            httpx.Response(304),
+        )
+        first = await repository.snapshot()
+        stale = await repository.snapshot()
+        assert stale is first
+        assert len(requests) == 1
+
+        await asyncio.sleep(0.01)
+        refreshed = await repository.snapshot()
+        assert len(requests) >= 2
+        assert list(refreshed.flight_table) == FLIGHT_EVENTS[:1]
+        assert refreshed.departure_index is not None
+
+    async def test_stale_feed_kept_when_revalidation_fails(
+        self, settings: Settings, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """Test the expired feed keeps being served when it can't be refreshed."""
+        repository, requests = build_repository(
+            settings,
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD),
+            httpx.Response(500),
+            httpx.Response(500),
+        )
+        first = await repository.snapshot()
+        assert await repository.snapshot() is first
+        await asyncio.sleep(0.01)
+
+        assert await repository.snapshot() is first
+        assert len(requests) >= 2
+        assert "Failed to revalidate flight events" in caplog.text
+
+    async def test_feed_past_max_staleness_waits(self, settings: Settings) -> None:
+        """Test a feed older than the max staleness isn't served, but fetched again."""
+        settings.flight_events_max_staleness_seconds = 1e-9
+        repository, requests = build_repository(
+            settings,
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD),
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD[:1]),
+        )
+        await repository.snapshot()
+        second = await repository.snapshot()
+
+        assert len(requests) == 2
+        assert list(second.flight_table) == FLIGHT_EVENTS[:1]
+
+    async def test_refresh_indexes_feed(self, settings: Settings) -> None:
+        """Test a refresh caches the feed indexed, and keeps it when the refresh fails."""
+        repository, _ = build_repository(
+            settings,
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD, headers={"ETag": '"v1"'}),
+            httpx.Response(304),
+            httpx.Response(500),
+        )
+        assert repository.feed_age() is None
+        refreshed = await repository.refresh()
+        assert refreshed.departure_index is not None
+        assert repository.feed_age() is not None
+
+        assert await repository.refresh() == refreshed
+        with pytest.raises(FlightEventRetrievalError):
+            await repository.refresh()
+        assert await repository.snapshot() == refreshed
+
+
+@pytest.mark.asyncio
+class TestFlightEventsAPIChanges:
+    """Test the changes to the feed are applied to the cached one."""
+
+    CHANGES = {
+        "upserts": [
+            {
+                "flight_number": "IB3456",
+                "departure_city": "VLC",
+                "arrival_city": "MAD",
+                "departure_datetime": "2022-01-01T08:00:00.000Z",
+                "arrival_datetime": "2022-01-01T09:00:00.000Z",
+            },
+            {**FLIGHT_EVENTS_PAYLOAD[1], "arrival_datetime": "2022-01-02T19:00:00.000Z"},
+        ],
+        "deletes": [
+            {
+                "flight_number": "IB1234",
+                "departure_city": "MAD",
+                "departure_datetime": "2021-12-31T23:59:59.000Z",
             }
-        ),
+        ],
+    }
+
+    @pytest.fixture(autouse=True)
+    def changes_settings(self, settings: Settings) -> None:
+        """Configure the changes endpoint of the API."""
+        settings.flight_events_changes_url = "https://api.flight-events.com/changes"
+
+    async def test_changes_applied(self, settings: Settings) -> None:
+        """Test upserts and deletes are applied to the cached feed and its index."""
+        repository, requests = build_repository(
+            settings,
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD, headers={"ETag": '"v1"'}),
+            httpx.Response(200, json=self.CHANGES, headers={"ETag": '"v2"'}),
+        )
+        snapshot = await repository.refresh()
+        change = await repository.apply_changes()
+
+        assert dict(requests[1].url.params) == {"since": '"v1"'}
+        patched = await repository.snapshot()
+        assert patched.version != snapshot.version
+        assert change is not None
+        assert (change.previous_version, change.version) == (snapshot.version, patched.version)
+        assert [event.flight_number for event in change.flight_events] == [
+            "IB1234",
+            "IB2345",
+            "IB3456",
+            "IB2345",
+        ]
+        assert [event.flight_number for event in await repository.list()] == [
+            "IB3456",
+            "IB2345",
+        ]
+        assert patched.departure_index is not None
+        assert [event.flight_number for event in patched.departure_index.departures("MAD")] == [
+            "IB2345"
+        ]
+        # the cached snapshot is replaced, not changed
+        assert list(snapshot.flight_table) == FLIGHT_EVENTS
+        assert flight_events_cache.get(settings.flight_events_api_url).etag == '"v2"'
+
+    async def test_no_changes(self, settings: Settings) -> None:
+        """Test the cached feed is kept, marked as fresh, when it didn't change."""
+        settings.flight_events_cache_ttl_seconds = 1e-9
+        repository, _ = build_repository(
+            settings,
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD, headers={"ETag": '"v1"'}),
+            httpx.Response(304),
+        )
+        snapshot = await repository.refresh()
+        assert await repository.apply_changes() is None
+        assert repository.feed_age() < 1
+        assert flight_events_cache.get(settings.flight_events_api_url).snapshot is snapshot
+
+    @pytest.mark.parametrize("status_code", [404, 410])
+    async def test_changes_unknown(self, settings: Settings, status_code: int) -> None:
+        """Test the whole feed is fetched when the changes since the cached one are unknown."""
+        repository, requests = build_repository(
+            settings,
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD, headers={"ETag": '"v1"'}),
+            httpx.Response(status_code),
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD[:1], headers={"ETag": '"v3"'}),
+        )
+        await repository.refresh()
+
+        assert await repository.apply_changes() is None
+        assert requests[2].url == settings.flight_events_api_url
+        assert list((await repository.snapshot()).flight_table) == FLIGHT_EVENTS[:1]
+
+    async def test_nothing_cached(self, settings: Settings) -> None:
+        """Test the whole feed is fetched when there is no cached feed to apply changes to."""
+        repository, requests = build_repository(
+            settings, httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD, headers={"ETag": '"v1"'})
+        )
+        assert await repository.apply_changes() is None
+        assert len(requests) == 1
+        assert (await repository.snapshot()).departure_index is not None
+
+    @pytest.mark.parametrize(
+        "response",
+        [
+            pytest.param(httpx.Response(500), id="error"),
+            pytest.param(httpx.Response(200, json={"deletes": [{}]}), id="invalid-payload"),
+        ],
     )
-    async def test_flight_events_api_list_error(
-        self, repository: FlightEventsAPIRepository
+    async def test_changes_retrieval_error(
+        self, settings: Settings, response: httpx.Response
     ) -> None:
-        """Test the flight events API list method with an error."""
+        """Test the cached feed is kept when the changes can't be retrieved."""
+        repository, _ = build_repository(
+            settings,
+            httpx.Response(200, json=FLIGHT_EVENTS_PAYLOAD, headers={"ETag": '"v1"'}),
+            response,
+        )
+        snapshot = await repository.refresh()
         with pytest.raises(FlightEventRetrievalError):
-            await repository.list()
+            await repository.apply_changes()
+        assert await repository.snapshot() is snapshot
@@ -0,0 +1,158 @@
+"""Test the flight events repository reading a snapshot file mapped in memory."""
+
+import io
+import json
+import os
+from datetime import UTC, date, datetime
+from pathlib import Path
+
+import pytest
+
+from src.commands.search_journeys import SearchJourneysCommand
+from src.core.config import SearchEngine, Settings
+from src.models import FlightEvent
+from src.models.models import Journey
+from src.repositories.flight_events import (
+    FlightEventQuery,
+    FlightEventRetrievalError,
+    FlightEventsFileRepository,
+    convert_feed_file,
+)
+
+FLIGHT_EVENTS_PAYLOAD = [
+    {
+        "flight_number": "IB1234",
+        "departure_city": "MAD",
+        "arrival_city": "BUE",
+        "departure_datetime": "2021-12-31T10:00:00.000Z",
+        "arrival_datetime": "2021-12-31T14:00:00.000Z",
+    },
+    {
+        "flight_number": "IB2345",
+        "departure_city": "BUE",
+        "arrival_city": "LIM",
+        "departure_datetime": "2021-12-31T16:00:00.000Z",
+        "arrival_datetime": "2021-12-31T20:00:00.000Z",
+    },
+    {
+        "flight_number": "IB3456",
+        "departure_city": "MAD",
+        "arrival_city": "LIM",
+        "departure_datetime": "2022-01-02T09:00:00.000Z",
+        "arrival_datetime": "2022-01-02T21:00:00.000Z",
+    },
+]
+FLIGHT_EVENTS = [
+    FlightEvent(
+        flight_number="IB1234",
+        from_airport="MAD",
+        to_airport="BUE",
+        departure_time=datetime(2021, 12, 31, 10, 0, 0, tzinfo=UTC),
+        arrival_time=datetime(2021, 12, 31, 14, 0, 0, tzinfo=UTC),
+    ),
+    FlightEvent(
+        flight_number="IB2345",
+        from_airport="BUE",
+        to_airport="LIM",
+        departure_time=datetime(2021, 12, 31, 16, 0, 0, tzinfo=UTC),
+        arrival_time=datetime(2021, 12, 31, 20, 0, 0, tzinfo=UTC),
+    ),
+    FlightEvent(
+        flight_number="IB3456",
+        from_airport="MAD",
+        to_airport="LIM",
+        departure_time=datetime(2022, 1, 2, 9, 0, 0, tzinfo=UTC),
+        arrival_time=datetime(2022, 1, 2, 21, 0, 0, tzinfo=UTC),
+    ),
+]
+
+
+def convert(path: Path, payload: list[dict]) -> None:
+    """Convert a feed payload into a snapshot file."""
+    convert_feed_file(io.BytesIO(json.dumps(payload).encode()), path)
+
+
+@pytest.mark.asyncio
+class TestFlightEventsFileRepository:
+    """Test the flight events repository reading a snapshot file."""
+
+    async def test_list(self, tmp_path: Path) -> None:
+        """Test the flight events of the converted feed are listed, filtered by the query."""
+        path = tmp_path / "flight-events.snapshot"
+        convert(path, FLIGHT_EVENTS_PAYLOAD)
+        repository = FlightEventsFileRepository(path)
+
+        assert await repository.list() == FLIGHT_EVENTS
+        assert (
+            await repository.list(FlightEventQuery(departure_to=datetime(2022, 1, 1, tzinfo=UTC)))
+            == FLIGHT_EVENTS[:2]
+        )
+
+    async def test_snapshot_mapped(self, tmp_path: Path) -> None:
+        """Test the snapshot views the columns of the file, mapped once while unchanged."""
+        path = tmp_path / "flight-events.snapshot"
+        snapshot = convert_feed_file(io.BytesIO(json.dumps(FLIGHT_EVENTS_PAYLOAD).encode()), path)
+        mapped = await FlightEventsFileRepository(path).snapshot()
+
+        assert mapped.version == snapshot.version
+        assert isinstance(mapped.flight_table.departure_times, memoryview)
+        assert mapped.departure_index is not None
+        assert mapped.departure_index.departures("MAD") == [FLIGHT_EVENTS[0], FLIGHT_EVENTS[2]]
+        assert await FlightEventsFileRepository(path).snapshot() is mapped
+
+    async def test_snapshot_file_replaced(self, tmp_path: Path) -> None:
+        """Test a replaced file is mapped again, leaving the previous snapshot unchanged."""
+        path = tmp_path / "flight-events.snapshot"
+        convert(path, FLIGHT_EVENTS_PAYLOAD)
+        repository = FlightEventsFileRepository(path)
+        previous = await repository.snapshot()
+
+        convert(path, FLIGHT_EVENTS_PAYLOAD[:1])
+        # the file may be replaced within the resolution of the modification time
+        os.utime(path, ns=(0, 0))
+        snapshot = await repository.snapshot()
+
+        assert snapshot.version != previous.version
+        assert list(snapshot.flight_table) == FLIGHT_EVENTS[:1]
+        assert list(previous.flight_table) == FLIGHT_EVENTS
+
+    @pytest.mark.parametrize("content", [None, b"", b"[]"])
+    async def test_snapshot_unreadable(self, tmp_path: Path, content: bytes | None) -> None:
+        """Test a missing file, or one that isn't a snapshot file, can't be retrieved."""
+        path = tmp_path / "flight-events.snapshot"
+        if content is not None:
+            path.write_bytes(content)
+        with pytest.raises(FlightEventRetrievalError):
+            await FlightEventsFileRepository(path).snapshot()
+
+    @pytest.mark.parametrize("engine", list(SearchEngine))
+    async def test_search_journeys(
+        self, tmp_path: Path, settings: Settings, engine: SearchEngine
+    ) -> None:
+        """Test journeys are searched over the mapped snapshot."""
+        path = tmp_path / "flight-events.snapshot"
+        convert(path, FLIGHT_EVENTS_PAYLOAD)
+        command = SearchJourneysCommand(
+            date=date(2021, 12, 31),
+            from_airport="MAD",
+            to_airport="LIM",
+            flight_events_repository=FlightEventsFileRepository(path),
+            settings=settings.model_copy(update={"journey_search_engine": engine}),
+        )
+        assert await command.execute() == [Journey(path=FLIGHT_EVENTS[:2])]
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        pytest.param(b'[{"flight_number": "IB1234"}]', id="missing-fields"),
+        pytest.param(b'[{"flight_number": ', id="truncated"),
+        pytest.param(b"\xff", id="not-utf8"),
+    ],
+)
+def test_convert_invalid_feed(tmp_path: Path, content: bytes) -> None:
+    """Test an invalid feed isn't converted."""
+    path = tmp_path / "flight-events.snapshot"
+    with pytest.raises(ValueError):
+        convert_feed_file(io.BytesIO(content), path)
+    assert not path.exists()
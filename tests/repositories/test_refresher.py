@@ -0,0 +1,87 @@
+"""Test the background refresh of the flight events feed."""
+
+import logging
+from unittest.mock import AsyncMock, MagicMock, call, patch
+
+import pytest
+
+from src.models import FlightTable
+from src.repositories.flight_events import (
+    FlightEventRetrievalError,
+    FlightEventsAPIRepository,
+    FlightEventsChange,
+    FlightEventsRefresher,
+    FlightEventsSnapshot,
+)
+from src.repositories.flight_events.refresher import RETRY_SECONDS
+
+
+class Stopped(Exception):
+    """Stops the refresher, that runs until cancelled."""
+
+
+@pytest.mark.asyncio
+class TestFlightEventsRefresher:
+    """Test the background refresh of the flight events feed."""
+
+    @patch("src.repositories.flight_events.refresher.asyncio.sleep")
+    async def test_refresh_schedule(self, sleep: AsyncMock) -> None:
+        """Test the feed is refreshed once as old as the interval, retrying failures."""
+        repository = MagicMock(spec=FlightEventsAPIRepository, changes_url=None)
+        repository.feed_age.side_effect = [None, None, 100.0, 900.0, 0.0]
+        repository.refresh = AsyncMock(
+            side_effect=[
+                FlightEventRetrievalError("Failed to reach flight events API"),
+                FlightEventsSnapshot(FlightTable()),
+                FlightEventsSnapshot(FlightTable()),
+            ]
+        )
+        sleep.side_effect = [None, None, Stopped]
+
+        with pytest.raises(Stopped):
+            await FlightEventsRefresher(repository, interval=600).run()
+
+        assert repository.refresh.await_count == 3
+        assert sleep.await_args_list == [
+            call(RETRY_SECONDS),
+            call(500.0),
+            call(600.0),
+        ]
+
+    @patch("src.repositories.flight_events.refresher.asyncio.sleep")
+    async def test_apply_changes(self, sleep: AsyncMock) -> None:
+        """Test the changes to the feed are applied and reported, when available."""
+        repository = MagicMock(
+            spec=FlightEventsAPIRepository, changes_url="https://api.flight-events.com/changes"
+        )
+        repository.feed_age.side_effect = [900.0, 900.0, 0.0]
+        change = FlightEventsChange(previous_version="v1", version="v2", flight_events=[])
+        repository.apply_changes = AsyncMock(side_effect=[change, None])
+        on_change = MagicMock()
+        sleep.side_effect = Stopped
+
+        with pytest.raises(Stopped):
+            await FlightEventsRefresher(repository, interval=600, on_change=on_change).run()
+
+        repository.refresh.assert_not_called()
+        assert repository.apply_changes.await_count == 2
+        on_change.assert_called_once_with(change)
+
+    @patch("src.repositories.flight_events.refresher.asyncio.sleep")
+    async def test_unexpected_error_retried(
+        self, sleep: AsyncMock, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """Test an unexpected error is logged and the refresh retried, instead of stopping."""
+        repository = MagicMock(
+            spec=FlightEventsAPIRepository, changes_url="https://api.flight-events.com/changes"
+        )
+        repository.feed_age.side_effect = [900.0, 900.0, 0.0]
+        repository.apply_changes = AsyncMock(side_effect=[KeyError("version"), None])
+        sleep.side_effect = [None, Stopped]
+
+        with caplog.at_level(logging.ERROR), pytest.raises(Stopped):
+            await FlightEventsRefresher(repository, interval=600).run()
+
+        assert repository.apply_changes.await_count == 2
+        assert sleep.await_args_list == [call(RETRY_SECONDS), call(600.0)]
+        assert caplog.records[0].exc_info[0] is KeyError
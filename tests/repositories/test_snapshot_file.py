@@ -0,0 +1,158 @@
+"""Test the snapshot files of the flight events feed."""
+
+import struct
+import time
+from datetime import UTC, datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from src.models import FlightEvent, FlightTable
+from src.repositories.flight_events.cache import CachedFlightEvents
+from src.repositories.flight_events.interface import FlightEventsSnapshot
+from src.repositories.flight_events.snapshot_file import (
+    FORMAT_VERSION,
+    MAGIC,
+    map_snapshot_file,
+    read_snapshot_file,
+    write_snapshot_file,
+)
+from src.search import DepartureIndex
+
+FLIGHT_EVENTS = [
+    FlightEvent(
+        flight_number="IB1234",
+        from_airport="MAD",
+        to_airport="BUE",
+        departure_time=datetime(2021, 12, 31, 10, 0, 0, tzinfo=UTC),
+        arrival_time=datetime(2022, 1, 1, 2, 0, 0, tzinfo=timezone(timedelta(hours=-3))),
+    ),
+    # flight numbers aren't restricted to ascii
+    FlightEvent(
+        flight_number="ÑA7",
+        from_airport="BUE",
+        to_airport="LIM",
+        departure_time=datetime(2022, 1, 1, 8, 0, 0),
+        arrival_time=datetime(2022, 1, 1, 11, 0, 0),
+    ),
+    FlightEvent(
+        flight_number="IB2345",
+        from_airport="MAD",
+        to_airport="LIM",
+        departure_time=datetime(2021, 12, 31, 9, 0, 0, tzinfo=UTC),
+        arrival_time=datetime(2021, 12, 31, 21, 0, 0, tzinfo=UTC),
+    ),
+]
+
+
+def cached_flight_events(age: float = 0) -> CachedFlightEvents:
+    """Get a cached feed of the flight events, fetched some seconds ago."""
+    return CachedFlightEvents(
+        snapshot=FlightEventsSnapshot(
+            flight_table=FlightTable.from_events(FLIGHT_EVENTS), version="v1"
+        ),
+        etag='"v1"',
+        last_modified="Fri, 31 Dec 2021 10:00:00 GMT",
+        fetched_at=time.monotonic() - age,
+    )
+
+
+def test_snapshot_file_round_trip(tmp_path: Path) -> None:
+    """Test a snapshot file holds the flight events, their index and the validators."""
+    path = tmp_path / "flight-events.snapshot"
+    write_snapshot_file(path, cached_flight_events(age=60))
+    entry = read_snapshot_file(path)
+
+    snapshot = entry.snapshot
+    assert list(snapshot.flight_table) == FLIGHT_EVENTS
+    assert snapshot.version == "v1"
+    assert entry.etag == '"v1"'
+    assert entry.last_modified == "Fri, 31 Dec 2021 10:00:00 GMT"
+    assert entry.age == pytest.approx(60, abs=5)
+    assert snapshot.departure_index is not None
+    assert snapshot.departure_index.groups() == DepartureIndex(snapshot.flight_table).groups()
+    assert [event.flight_number for event in snapshot.departure_index.departures("MAD")] == [
+        "IB2345",
+        "IB1234",
+    ]
+
+
+def test_snapshot_file_mapped(tmp_path: Path) -> None:
+    """Test a mapped snapshot file views its columns in place, and can be written again."""
+    path = tmp_path / "flight-events.snapshot"
+    write_snapshot_file(path, cached_flight_events(age=60))
+    entry = map_snapshot_file(path)
+
+    snapshot = entry.snapshot
+    assert isinstance(snapshot.flight_table.arrival_times, memoryview)
+    assert list(snapshot.flight_table) == FLIGHT_EVENTS
+    assert snapshot.departure_index is not None
+    assert snapshot.departure_index.departures("MAD") == [FLIGHT_EVENTS[2], FLIGHT_EVENTS[0]]
+    assert entry.etag == '"v1"'
+    assert entry.age == pytest.approx(60, abs=5)
+
+    copy_path = tmp_path / "copy.snapshot"
+    write_snapshot_file(copy_path, entry)
+    copy = read_snapshot_file(copy_path).snapshot
+    assert list(copy.flight_table) == FLIGHT_EVENTS
+    assert copy.departure_index is not None
+    assert copy.departure_index.groups() == snapshot.departure_index.groups()
+
+
+def test_snapshot_file_removed_rows(tmp_path: Path) -> None:
+    """Test a snapshot file keeps out of the index the rows removed by changes to the feed."""
+    path = tmp_path / "flight-events.snapshot"
+    flight_table = FlightTable.from_events(FLIGHT_EVENTS)
+    write_snapshot_file(
+        path,
+        CachedFlightEvents(
+            snapshot=FlightEventsSnapshot(
+                flight_table=flight_table,
+                version="v2",
+                departure_index=DepartureIndex(flight_table).patched(flight_table, {0}, []),
+                removed_rows=frozenset({0}),
+            ),
+            etag='"v2"',
+            last_modified=None,
+            fetched_at=time.monotonic(),
+        ),
+    )
+    snapshot = read_snapshot_file(path).snapshot
+
+    assert snapshot.removed_rows == {0}
+    assert snapshot.departure_index is not None
+    assert snapshot.departure_index.departures("MAD") == [FLIGHT_EVENTS[2]]
+
+
+def test_snapshot_file_empty_feed(tmp_path: Path) -> None:
+    """Test a snapshot of a feed without flight events can be read."""
+    path = tmp_path / "flight-events.snapshot"
+    write_snapshot_file(
+        path,
+        CachedFlightEvents(
+            snapshot=FlightEventsSnapshot(flight_table=FlightTable()),
+            etag=None,
+            last_modified=None,
+            fetched_at=time.monotonic(),
+        ),
+    )
+    entry = read_snapshot_file(path)
+    assert len(entry.snapshot.flight_table) == 0
+    assert entry.snapshot.version is None
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        pytest.param(b'[{"flight_number": "IB1234"}]', id="not-a-snapshot"),
+        pytest.param(
+            MAGIC + struct.pack("<II", FORMAT_VERSION + 1, 2) + b"{}", id="unsupported-format"
+        ),
+    ],
+)
+def test_snapshot_file_invalid(tmp_path: Path, content: bytes) -> None:
+    """Test files that aren't snapshots in a supported format are rejected."""
+    path = tmp_path / "flight-events.snapshot"
+    path.write_bytes(content)
+    with pytest.raises(ValueError):
+        read_snapshot_file(path)
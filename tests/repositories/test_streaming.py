@@ -0,0 +1,127 @@
+"""Test the incremental JSON array decoder and flight events feed parser."""
+
+import json
+
+import pytest
+
+from src.repositories.flight_events.streaming import (
+    FlightEventsFeedParser,
+    JSONArrayStreamDecoder,
+)
+
+PAYLOAD = json.dumps(
+    [
+        {"flight_number": "IB1234", "departure_city": "MAD", "arrival_city": "BUE"},
+        {"flight_number": "IB2345", "departure_city": "MAD", "arrival_city": "VLC"},
+        12,
+        "a, ]",
+    ],
+    indent=2,
+)
+
+
+def decode(chunks: list[str]) -> list:
+    """Decode a payload fed in the given chunks."""
+    decoder = JSONArrayStreamDecoder()
+    items = []
+    for chunk in chunks:
+        items.extend(decoder.feed(chunk))
+    items.extend(decoder.close())
+    return items
+
+
+class TestJSONArrayStreamDecoder:
+    """Test the incremental JSON array decoder and flight events feed parser."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, len(PAYLOAD)])
+    def test_decode_chunks(self, chunk_size: int) -> None:
+        """Test the items are decoded regardless of where chunks are split."""
+        chunks = [PAYLOAD[i : i + chunk_size] for i in range(0, len(PAYLOAD), chunk_size)]
+        assert decode(chunks) == json.loads(PAYLOAD)
+
+    def test_items_returned_when_complete(self) -> None:
+        """Test each item is returned as soon as it is complete."""
+        decoder = JSONArrayStreamDecoder()
+        assert decoder.feed('[{"a": 1}, {"b"') == [{"a": 1}]
+        assert decoder.feed(": 2}]") == [{"b": 2}]
+        assert decoder.close() == []
+
+    @pytest.mark.parametrize(
+        "chunks",
+        [
+            pytest.param(["[-1.", "25]"], id="fraction"),
+            pytest.param(["[-1.25e", "2, 3]"], id="exponent"),
+            pytest.param(["[-1.25E+", "2 ,3]"], id="exponent-sign"),
+        ],
+    )
+    def test_number_split_in_chunks(self, chunks: list[str]) -> None:
+        """Test a number isn't decoded until it is followed by a delimiter."""
+        decoder = JSONArrayStreamDecoder()
+        assert decoder.feed(chunks[0]) == []
+        assert decoder.feed(chunks[1]) == json.loads("".join(chunks))
+        assert decoder.close() == []
+
+    def test_empty_array(self) -> None:
+        """Test an empty array has no items."""
+        assert decode([" [ ", "] "]) == []
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            pytest.param('{"a": 1}', id="not-an-array"),
+            pytest.param('[{"a": 1}', id="unterminated-array"),
+            pytest.param('[{"a": 1} {"b": 2}]', id="missing-separator"),
+            pytest.param('[{"a": 1}] []', id="trailing-data"),
+            pytest.param('[{"a": }]', id="invalid-item"),
+        ],
+    )
+    def test_invalid_payload(self, payload: str) -> None:
+        """Test invalid payloads raise a ValueError."""
+        with pytest.raises(ValueError):
+            decode([payload])
+
+
+FEED = json.dumps(
+    [
+        {
+            "flight_number": "IB1234",
+            "departure_city": "MAD",
+            "arrival_city": "BUE",
+            "departure_datetime": "2021-12-31T10:00:00Z",
+            "arrival_datetime": "2021-12-31T22:00:00Z",
+        },
+        {
+            "flight_number": "ÑA7",
+            "departure_city": "BUE",
+            "arrival_city": "LIM",
+            "departure_datetime": "2022-01-01T08:00:00Z",
+            "arrival_datetime": "2022-01-01T11:00:00Z",
+        },
+    ]
+).encode()
+
+
+class TestFlightEventsFeedParser:
+    """Test the incremental parser of the flight events feed."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, len(FEED)])
+    def test_parse_chunks(self, chunk_size: int) -> None:
+        """Test the feed is parsed the same, and gets the same version, whatever the chunks."""
+        parser = FlightEventsFeedParser()
+        for start in range(0, len(FEED), chunk_size):
+            parser.feed(FEED[start : start + chunk_size])
+        snapshot = parser.close()
+
+        assert [event.flight_number for event in snapshot.flight_table] == ["IB1234", "ÑA7"]
+        assert parser.scanned == 2
+        whole = FlightEventsFeedParser()
+        whole.feed(FEED)
+        assert snapshot.version == whole.close().version
+
+    @pytest.mark.parametrize("payload", [b"[1, 2]", b'[{"flight_number": "IB1234"}]', b"\xff"])
+    def test_invalid_feed(self, payload: bytes) -> None:
+        """Test a payload that isn't an array of flight events raises ValueError."""
+        parser = FlightEventsFeedParser()
+        with pytest.raises(ValueError):
+            parser.feed(payload)
+            parser.close()
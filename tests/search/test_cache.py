@@ -0,0 +1,93 @@
+"""Test the journey search cache."""
+
+from datetime import UTC, datetime
+
+from src.models import FlightEvent, Journey
+from src.search import JourneySearchCache
+
+
+def journey(flight_number: str) -> Journey:
+    """Get a direct journey with the given flight."""
+    return Journey(
+        path=[
+            FlightEvent(
+                flight_number=flight_number,
+                from_airport="MAD",
+                to_airport="BUE",
+                departure_time=datetime(2021, 12, 31, 10, 0, 0, tzinfo=UTC),
+                arrival_time=datetime(2021, 12, 31, 12, 0, 0, tzinfo=UTC),
+            )
+        ]
+    )
+
+
+class TestJourneySearchCache:
+    """Test the journey search cache."""
+
+    def test_hit(self) -> None:
+        """Test the cached journeys are returned as the same models."""
+        cache = JourneySearchCache(maxsize=2)
+        journeys = [journey("IB1234")]
+        cache.set("search", "v1", journeys)
+
+        cached = cache.get("search", "v1")
+        assert cached == journeys
+        assert cached[0] is journeys[0]
+        assert (cache.hits, cache.misses) == (1, 0)
+
+    def test_miss(self) -> None:
+        """Test a search never cached is a miss."""
+        cache = JourneySearchCache(maxsize=2)
+        assert cache.get("search", "v1") is None
+        assert (cache.hits, cache.misses) == (0, 1)
+
+    def test_version_change_invalidates(self) -> None:
+        """Test journeys computed from another version of the feed are discarded."""
+        cache = JourneySearchCache(maxsize=2)
+        cache.set("search", "v1", [journey("IB1234")])
+
+        assert cache.get("search", "v2") is None
+        assert len(cache) == 0
+        assert cache.get("search", "v1") is None
+        assert (cache.hits, cache.misses) == (0, 2)
+
+    def test_least_recently_used_evicted(self) -> None:
+        """Test the least recently used search is evicted when the cache is full."""
+        cache = JourneySearchCache(maxsize=2)
+        cache.set("first", "v1", [journey("IB1")])
+        cache.set("second", "v1", [journey("IB2")])
+        cache.get("first", "v1")
+        cache.set("third", "v1", [journey("IB3")])
+
+        assert len(cache) == 2
+        assert cache.get("second", "v1") is None
+        assert cache.get("first", "v1") == [journey("IB1")]
+        assert cache.get("third", "v1") == [journey("IB3")]
+
+    def test_disabled(self) -> None:
+        """Test nothing is cached with a size of 0."""
+        cache = JourneySearchCache(maxsize=0)
+        cache.set("search", "v1", [journey("IB1234")])
+        assert cache.get("search", "v1") is None
+
+    def test_clear(self) -> None:
+        """Test clearing the cache removes the searches and resets the counters."""
+        cache = JourneySearchCache(maxsize=2)
+        cache.set("search", "v1", [journey("IB1234")])
+        cache.get("search", "v1")
+        cache.clear()
+
+        assert len(cache) == 0
+        assert (cache.hits, cache.misses) == (0, 0)
+
+    def test_rebase(self) -> None:
+        """Test searches are carried over to a new version unless they aren't kept."""
+        cache = JourneySearchCache(maxsize=4)
+        cache.set("kept", "v1", [journey("IB1")])
+        cache.set("removed", "v1", [journey("IB2")])
+        cache.set("stale", "v0", [journey("IB3")])
+
+        assert cache.rebase("v1", "v2", lambda key: key == "kept") == 1
+        assert cache.get("kept", "v2") == [journey("IB1")]
+        assert cache.get("removed", "v2") is None
+        assert cache.get("stale", "v2") is None
@@ -0,0 +1,146 @@
+"""Test the departure index."""
+
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+import pytest
+
+from src.models import FlightEvent, FlightTableBuilder
+from src.models.flight_table import to_timestamp
+from src.search import DepartureIndex
+
+
+def flight_event(flight_number: str, from_airport: str, hour: int) -> FlightEvent:
+    """Build a one hour flight event departing at the given hour."""
+    return FlightEvent(
+        flight_number=flight_number,
+        from_airport=from_airport,
+        to_airport="BUE",
+        departure_time=datetime(2021, 12, 31, hour, 0, 0, tzinfo=UTC),
+        arrival_time=datetime(2021, 12, 31, hour + 1, 0, 0, tzinfo=UTC),
+    )
+
+
+class TestDepartureIndex:
+    """Test the departure index."""
+
+    @pytest.fixture
+    def departure_index(self) -> DepartureIndex:
+        """Fixture for an index with unsorted departures from two airports."""
+        return DepartureIndex(
+            [
+                flight_event("IB0003", "MAD", 15),
+                flight_event("IB0001", "MAD", 10),
+                flight_event("IB0004", "BOG", 11),
+                flight_event("IB0002", "MAD", 12),
+                flight_event("IB0005", "MAD", 12),
+            ]
+        )
+
+    def test_departures_sorted_by_time(self, departure_index: DepartureIndex) -> None:
+        """Test the departures of an airport are sorted by time, keeping ties in order."""
+        departures = departure_index.departures("MAD")
+        assert [event.flight_number for event in departures] == [
+            "IB0001",
+            "IB0002",
+            "IB0005",
+            "IB0003",
+        ]
+        assert len(departure_index) == 5
+
+    @pytest.mark.parametrize(
+        "start,end,expected",
+        [
+            pytest.param(12, 15, ["IB0002", "IB0005", "IB0003"], id="inclusive-bounds"),
+            pytest.param(11, 14, ["IB0002", "IB0005"], id="inner-window"),
+            pytest.param(13, 14, [], id="empty-window"),
+            pytest.param(None, 11, ["IB0001"], id="open-start"),
+            pytest.param(12, None, ["IB0002", "IB0005", "IB0003"], id="open-end"),
+        ],
+    )
+    def test_departures_window(
+        self,
+        departure_index: DepartureIndex,
+        start: int | None,
+        end: int | None,
+        expected: list[str],
+    ) -> None:
+        """Test only the departures within the window are returned."""
+        departures = departure_index.departures(
+            "MAD",
+            None if start is None else datetime(2021, 12, 31, start, 0, 0, tzinfo=UTC),
+            None if end is None else datetime(2021, 12, 31, end, 0, 0, tzinfo=UTC),
+        )
+        assert [event.flight_number for event in departures] == expected
+
+    def test_arrival_rows(self, departure_index: DepartureIndex) -> None:
+        """Test the rows arriving to an airport within a window, sorted by arrival time."""
+        flight_table = departure_index.flight_table
+        rows = departure_index.arrival_rows(
+            flight_table.airport_id("BUE"),
+            start=flight_table.arrival_times[1],
+            end=flight_table.arrival_times[3],
+        )
+        assert [flight_table[row].flight_number for row in rows] == [
+            "IB0001",
+            "IB0004",
+            "IB0002",
+            "IB0005",
+        ]
+
+    def test_departures_unknown_airport(self, departure_index: DepartureIndex) -> None:
+        """Test an airport without departures returns no flight events."""
+        assert departure_index.departures("GRU") == []
+
+    @pytest.mark.parametrize(
+        "start,end,expected",
+        [
+            pytest.param(None, None, 5, id="every-departure"),
+            pytest.param(11, 12, 3, id="inclusive-bounds"),
+            pytest.param(13, 14, 0, id="empty-window"),
+        ],
+    )
+    def test_departures_count(
+        self, departure_index: DepartureIndex, start: int | None, end: int | None, expected: int
+    ) -> None:
+        """Test the departures from every airport within the window are counted."""
+        bounds = {
+            name: to_timestamp(datetime(2021, 12, 31, hour, 0, 0, tzinfo=UTC))
+            for name, hour in (("start", start), ("end", end))
+            if hour is not None
+        }
+        assert departure_index.departures_count(**bounds) == expected
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_patched_index(
+    random_flight_events: Callable[[int, int], list[FlightEvent]], seed: int
+) -> None:
+    """Test a patched index finds the same flights as an index built from scratch."""
+    flight_events = random_flight_events(seed, 100)
+    added = random_flight_events(seed + 100, 10) + [flight_event("IB9999", "VLC", 10)]
+    departure_index = DepartureIndex(flight_events)
+    removed_rows = set(range(0, 100, 7))
+
+    builder = FlightTableBuilder(departure_index.flight_table.copy())
+    for event in added:
+        builder.append(event)
+    flight_table = builder.build()
+    patched = departure_index.patched(flight_table, removed_rows, range(100, len(flight_table)))
+    expected = DepartureIndex(
+        [event for row, event in enumerate(flight_events) if row not in removed_rows] + added
+    )
+
+    for airport in flight_table.airports:
+        airport_id = flight_table.airport_id(airport)
+        assert patched.departures(airport) == expected.departures(airport)
+        assert [flight_table[row] for row in patched.arrival_rows(airport_id)] == [
+            expected.flight_table[row]
+            for row in expected.arrival_rows(expected.flight_table.airport_id(airport))
+        ]
+    # the index patched is left as it was
+    assert sorted(
+        row
+        for airport_id in range(len(departure_index.flight_table.airports))
+        for row in departure_index.departure_rows(airport_id)
+    ) == list(range(100))
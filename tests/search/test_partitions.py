@@ -0,0 +1,106 @@
+"""Test the partitions of a path search by first flight."""
+
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from itertools import chain
+
+import pytest
+
+from src.models import FlightEvent, JourneySort
+from src.models.flight_table import MICROSECOND, to_timestamp
+from src.search import (
+    DepartureIndex,
+    PathParameters,
+    enumerate_paths,
+    merge_ranked_paths,
+    path_rank_key,
+    rank_paths,
+    split_departure_window,
+)
+
+
+def path_parameters(departure_index: DepartureIndex) -> PathParameters:
+    """Get the parameters to search paths from MAD to BUE departing on 2021-12-31."""
+    flight_table = departure_index.flight_table
+    return PathParameters(
+        origin=flight_table.airport_id("MAD"),
+        destination=flight_table.airport_id("BUE"),
+        departure_from=to_timestamp(datetime(2021, 12, 31, tzinfo=UTC)),
+        departure_to=to_timestamp(datetime(2021, 12, 31, 23, 59, 59, 999999, tzinfo=UTC)),
+        max_connections=2,
+        max_connection_wait=timedelta(hours=4) // MICROSECOND,
+        max_duration=timedelta(hours=24) // MICROSECOND,
+    )
+
+
+class TestSplitDepartureWindow:
+    """Test the split of the departure window of a search."""
+
+    @pytest.mark.parametrize("partitions", [1, 2, 3, 8, 1000])
+    @pytest.mark.parametrize("seed", range(3))
+    def test_same_paths_as_whole_window(
+        self,
+        random_flight_events: Callable[[int, int], list[FlightEvent]],
+        seed: int,
+        partitions: int,
+    ) -> None:
+        """Test the paths of the windows, concatenated, match the ones of the whole window."""
+        departure_index = DepartureIndex(random_flight_events(seed, 300))
+        parameters = path_parameters(departure_index)
+        windows = split_departure_window(departure_index, parameters, partitions)
+
+        assert 1 <= len(windows) <= partitions
+        assert windows[0].departure_from == parameters.departure_from
+        assert windows[-1].departure_to == parameters.departure_to
+        assert list(
+            chain.from_iterable(enumerate_paths(departure_index, window) for window in windows)
+        ) == list(enumerate_paths(departure_index, parameters))
+
+    def test_balanced_first_flights(
+        self, random_flight_events: Callable[[int, int], list[FlightEvent]]
+    ) -> None:
+        """Test the windows have about as many first flights each."""
+        departure_index = DepartureIndex(random_flight_events(0, 1000))
+        parameters = path_parameters(departure_index)
+        windows = split_departure_window(departure_index, parameters, 4)
+        first_flights = [
+            len(
+                departure_index.departure_rows(
+                    parameters.origin, window.departure_from, window.departure_to
+                )
+            )
+            for window in windows
+        ]
+
+        assert len(windows) == 4
+        assert max(first_flights) - min(first_flights) <= 0.5 * max(first_flights)
+
+
+class TestMergeRankedPaths:
+    """Test the merge of the ranked paths of the partitions of a search."""
+
+    @pytest.mark.parametrize("limit", [None, 1, 5])
+    @pytest.mark.parametrize("sort", list(JourneySort))
+    @pytest.mark.parametrize("seed", range(3))
+    def test_same_ranking_as_whole_window(
+        self,
+        random_flight_events: Callable[[int, int], list[FlightEvent]],
+        seed: int,
+        sort: JourneySort,
+        limit: int | None,
+    ) -> None:
+        """Test the merged paths are ranked as the ones of the whole window."""
+        departure_index = DepartureIndex(random_flight_events(seed, 300))
+        parameters = path_parameters(departure_index)
+        partitions = [
+            list(rank_paths(departure_index, window, sort, limit))
+            for window in split_departure_window(departure_index, parameters, 4)
+        ]
+        merged = merge_ranked_paths(departure_index, sort, partitions, limit)
+        ranked = list(rank_paths(departure_index, parameters, sort, limit))
+
+        # paths ranked the same may be in a different order
+        key = path_rank_key(departure_index.flight_table, sort)
+        assert [key(path) for path in merged] == [key(path) for path in ranked]
+        if limit is None:
+            assert sorted(merged) == sorted(ranked)
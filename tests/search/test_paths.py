@@ -0,0 +1,214 @@
+"""Test the path enumeration."""
+
+from collections.abc import Callable
+from dataclasses import replace
+from datetime import UTC, datetime, timedelta
+from string import ascii_uppercase
+from unittest.mock import patch
+
+import pytest
+
+from src.models import FlightEvent, JourneySort
+from src.models.flight_table import MICROSECOND, to_timestamp
+from src.search import DepartureIndex, PathParameters, enumerate_paths, rank_paths
+
+MIN_DEPARTURE_TIME = datetime(2021, 12, 31, tzinfo=UTC)
+MAX_DEPARTURE_TIME = datetime(2021, 12, 31, 23, 59, 59, 999999, tzinfo=UTC)
+MAX_CONNECTION_WAIT = timedelta(hours=4)
+MAX_DURATION = timedelta(hours=24)
+
+
+def reference_paths(
+    flight_events: list[FlightEvent], destination: str, max_connections: int
+) -> list[list[FlightEvent]]:
+    """Find paths with a plain recursive search, to compare the enumeration against."""
+    by_departure = sorted(flight_events, key=lambda event: event.departure_time)
+
+    def find(path: list[FlightEvent]) -> list[list[FlightEvent]]:
+        if path[-1].to_airport == destination:
+            return [path]
+        if len(path) > max_connections:
+            return []
+        paths = []
+        for event in by_departure:
+            if (
+                event.from_airport == path[-1].to_airport
+                and path[-1].arrival_time
+                <= event.departure_time
+                <= path[-1].arrival_time + MAX_CONNECTION_WAIT
+                and event.arrival_time - path[0].departure_time <= MAX_DURATION
+            ):
+                paths.extend(find(path + [event]))
+        return paths
+
+    return [
+        path
+        for event in by_departure
+        if event.from_airport == "MAD"
+        and MIN_DEPARTURE_TIME <= event.departure_time <= MAX_DEPARTURE_TIME
+        for path in find([event])
+    ]
+
+
+def path_parameters(
+    departure_index: DepartureIndex, destination: str, max_connections: int
+) -> PathParameters:
+    """Get the parameters to search paths from MAD to the destination."""
+    flight_table = departure_index.flight_table
+    return PathParameters(
+        origin=flight_table.airport_id("MAD"),
+        destination=flight_table.airport_id(destination),
+        departure_from=to_timestamp(MIN_DEPARTURE_TIME),
+        departure_to=to_timestamp(MAX_DEPARTURE_TIME),
+        max_connections=max_connections,
+        max_connection_wait=MAX_CONNECTION_WAIT // MICROSECOND,
+        max_duration=MAX_DURATION // MICROSECOND,
+    )
+
+
+def search(
+    departure_index: DepartureIndex, destination: str, max_connections: int, memoize: bool = True
+) -> list[list[FlightEvent]]:
+    """Enumerate the paths from MAD to the destination as flight events."""
+    parameters = path_parameters(departure_index, destination, max_connections)
+    return [
+        [departure_index.flight_table[row] for row in path]
+        for path in enumerate_paths(departure_index, parameters, memoize)
+    ]
+
+
+def rank_key(path: list[FlightEvent], sort: JourneySort) -> timedelta | datetime | int:
+    """Get the value paths are ranked by."""
+    if sort == JourneySort.FEWEST_CONNECTIONS:
+        return len(path) - 1
+    if sort == JourneySort.SHORTEST_DURATION:
+        return path[-1].arrival_time - path[0].departure_time
+    return path[-1].arrival_time
+
+
+class TestEnumeratePaths:
+    """Test the path enumeration."""
+
+    @pytest.mark.parametrize("memoize", [True, False])
+    @pytest.mark.parametrize("max_connections", [0, 1, 2, 3, 4])
+    @pytest.mark.parametrize("seed", range(5))
+    def test_same_paths_as_recursive_search(
+        self,
+        random_flight_events: Callable[[int, int], list[FlightEvent]],
+        seed: int,
+        max_connections: int,
+        memoize: bool,
+    ) -> None:
+        """Test the paths and their order match a plain recursive search."""
+        flight_events = random_flight_events(seed, 150)
+        departure_index = DepartureIndex(flight_events)
+        assert search(departure_index, "BUE", max_connections, memoize) == reference_paths(
+            flight_events, "BUE", max_connections
+        )
+
+    def test_memoized_suffixes_shared(self) -> None:
+        """Test paths connecting at the same airport and time share the suffixes found.
+
+        The suffixes are only kept for the paths they don't make too long.
+        """
+        departure_time = MIN_DEPARTURE_TIME + timedelta(hours=6)
+        flight_events = [
+            FlightEvent(
+                flight_number=flight_number,
+                from_airport=from_airport,
+                to_airport=to_airport,
+                departure_time=departure_time + timedelta(hours=departure_hours),
+                arrival_time=departure_time + timedelta(hours=arrival_hours),
+            )
+            for flight_number, from_airport, to_airport, departure_hours, arrival_hours in (
+                ("IB1", "MAD", "LIM", 0, 4),
+                ("IB2", "MAD", "LIM", 3, 4),
+                ("IB3", "LIM", "BOG", 5, 6),
+                ("IB4", "BOG", "BUE", 7, 10.5),
+            )
+        ]
+        departure_index = DepartureIndex(flight_events)
+        parameters = replace(
+            path_parameters(departure_index, "BUE", 2),
+            max_duration=timedelta(hours=10) // MICROSECOND,
+        )
+
+        with patch.object(
+            DepartureIndex,
+            "departure_rows",
+            autospec=True,
+            side_effect=DepartureIndex.departure_rows,
+        ) as departure_rows:
+            paths = list(enumerate_paths(departure_index, parameters))
+
+        assert [[flight_events[row].flight_number for row in path] for path in paths] == [
+            ["IB2", "IB3", "IB4"]
+        ]
+        lim = departure_index.flight_table.airport_id("LIM")
+        assert [call.args[1] for call in departure_rows.call_args_list].count(lim) == 1
+
+    @pytest.mark.parametrize("memoize", [True, False])
+    def test_long_paths_do_not_recurse(self, memoize: bool) -> None:
+        """Test paths with more connections than the recursion limit are found."""
+        connections = [
+            prefix + first + second
+            for prefix in "XY"
+            for first in ascii_uppercase
+            for second in ascii_uppercase
+        ]
+        airports = ["MAD", *connections, "BUE"]
+        flight_events = [
+            FlightEvent(
+                flight_number=f"IB{number:04}",
+                from_airport=from_airport,
+                to_airport=to_airport,
+                departure_time=MIN_DEPARTURE_TIME + timedelta(seconds=2 * number),
+                arrival_time=MIN_DEPARTURE_TIME + timedelta(seconds=2 * number + 1),
+            )
+            for number, (from_airport, to_airport) in enumerate(
+                zip(airports, airports[1:], strict=False)
+            )
+        ]
+        [path] = search(DepartureIndex(flight_events), "BUE", len(flight_events), memoize)
+        assert path == flight_events
+
+
+class TestRankPaths:
+    """Test the ranked path search."""
+
+    @pytest.mark.parametrize("sort", list(JourneySort))
+    @pytest.mark.parametrize("max_connections", [0, 1, 3])
+    @pytest.mark.parametrize("seed", range(5))
+    def test_ranked_paths(
+        self,
+        random_flight_events: Callable[[int, int], list[FlightEvent]],
+        seed: int,
+        max_connections: int,
+        sort: JourneySort,
+    ) -> None:
+        """Test every path is found, in rank order."""
+        departure_index = DepartureIndex(random_flight_events(seed, 150))
+        parameters = path_parameters(departure_index, "BUE", max_connections)
+        ranked = list(rank_paths(departure_index, parameters, sort))
+
+        assert sorted(ranked) == sorted(enumerate_paths(departure_index, parameters))
+        keys = [
+            rank_key([departure_index.flight_table[row] for row in path], sort) for path in ranked
+        ]
+        assert keys == sorted(keys)
+
+    @pytest.mark.parametrize("sort", list(JourneySort))
+    @pytest.mark.parametrize("seed", range(5))
+    def test_ranked_paths_limit(
+        self,
+        random_flight_events: Callable[[int, int], list[FlightEvent]],
+        seed: int,
+        sort: JourneySort,
+    ) -> None:
+        """Test the best paths are found when limiting the amount of paths."""
+        departure_index = DepartureIndex(random_flight_events(seed, 150))
+        parameters = path_parameters(departure_index, "BUE", 2)
+        ranked = list(rank_paths(departure_index, parameters, sort))
+        top = list(rank_paths(departure_index, parameters, sort, limit=3))
+
+        assert top == ranked[:3]
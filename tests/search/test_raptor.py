@@ -0,0 +1,120 @@
+"""Test the round-based search of Pareto-optimal paths."""
+
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.models import FlightEvent, JourneySort
+from src.models.flight_table import MICROSECOND, to_timestamp
+from src.search import DepartureIndex, PathParameters, enumerate_paths, raptor_paths
+
+# departure time negated, arrival time and connections, so lower is better for all
+Criteria = tuple[int, int, int]
+
+
+def path_parameters(departure_index: DepartureIndex, max_connections: int) -> PathParameters:
+    """Get the parameters to search paths from MAD to BUE on 2021-12-31."""
+    flight_table = departure_index.flight_table
+    return PathParameters(
+        origin=flight_table.airport_id("MAD"),
+        destination=flight_table.airport_id("BUE"),
+        departure_from=to_timestamp(datetime(2021, 12, 31, tzinfo=UTC)),
+        departure_to=to_timestamp(datetime(2022, 1, 1, tzinfo=UTC)) - 1,
+        max_connections=max_connections,
+        max_connection_wait=timedelta(hours=4) // MICROSECOND,
+        max_duration=timedelta(hours=24) // MICROSECOND,
+    )
+
+
+def criteria(departure_index: DepartureIndex, path: tuple[int, ...]) -> Criteria:
+    """Get the criteria a path is compared by."""
+    flight_table = departure_index.flight_table
+    return (
+        -flight_table.departure_times[path[0]],
+        flight_table.arrival_times[path[-1]],
+        len(path) - 1,
+    )
+
+
+def pareto_front(values: list[Criteria]) -> set[Criteria]:
+    """Get the values not dominated by a different one."""
+    return {
+        value
+        for value in values
+        if not any(
+            other != value and all(o <= v for o, v in zip(other, value, strict=True))
+            for other in values
+        )
+    }
+
+
+class TestRaptorPaths:
+    """Test the round-based search of Pareto-optimal paths."""
+
+    @pytest.mark.parametrize("max_connections", [0, 1, 2, 3, 4])
+    @pytest.mark.parametrize("seed", range(5))
+    def test_pareto_optimal_paths(
+        self,
+        random_flight_events: Callable[[int, int], list[FlightEvent]],
+        seed: int,
+        max_connections: int,
+    ) -> None:
+        """Test a valid path is found for every Pareto-optimal criteria, and only them."""
+        departure_index = DepartureIndex(random_flight_events(seed, 150))
+        parameters = path_parameters(departure_index, max_connections)
+        every_path = set(enumerate_paths(departure_index, parameters))
+        paths = list(raptor_paths(departure_index, parameters))
+
+        assert set(paths) <= every_path
+        found = [criteria(departure_index, path) for path in paths]
+        assert len(found) == len(set(found))
+        assert set(found) == pareto_front([criteria(departure_index, path) for path in every_path])
+
+    def test_same_departure_time(self) -> None:
+        """Test a path is dominated by one departing at the same time on another first flight."""
+
+        def flight_event(
+            flight_number: str, from_airport: str, to_airport: str, departure: int, arrival: int
+        ) -> FlightEvent:
+            start = datetime(2021, 12, 31, tzinfo=UTC)
+            return FlightEvent(
+                flight_number=flight_number,
+                from_airport=from_airport,
+                to_airport=to_airport,
+                departure_time=start + timedelta(minutes=departure),
+                arrival_time=start + timedelta(minutes=arrival),
+            )
+
+        departure_index = DepartureIndex(
+            [
+                flight_event("F51", "MAD", "BUE", 21 * 60 + 30, 25 * 60),
+                flight_event("F58", "MAD", "LIM", 21 * 60 + 30, 23 * 60),
+                flight_event("F34", "LIM", "BUE", 23 * 60 + 30, 29 * 60),
+            ]
+        )
+        paths = list(raptor_paths(departure_index, path_parameters(departure_index, 1)))
+
+        assert paths == [(0,)]
+
+    @pytest.mark.parametrize("sort", list(JourneySort))
+    @pytest.mark.parametrize("seed", range(5))
+    def test_sorted_paths(
+        self,
+        random_flight_events: Callable[[int, int], list[FlightEvent]],
+        seed: int,
+        sort: JourneySort,
+    ) -> None:
+        """Test the paths are ranked and limited."""
+        departure_index = DepartureIndex(random_flight_events(seed, 150))
+        parameters = path_parameters(departure_index, 3)
+        paths = list(raptor_paths(departure_index, parameters, sort))
+        ranks = {
+            JourneySort.EARLIEST_ARRIVAL: lambda values: values[1],
+            JourneySort.SHORTEST_DURATION: lambda values: values[0] + values[1],
+            JourneySort.FEWEST_CONNECTIONS: lambda values: values[2],
+        }
+        keys = [ranks[sort](criteria(departure_index, path)) for path in paths]
+
+        assert keys == sorted(keys)
+        assert list(raptor_paths(departure_index, parameters, sort, limit=2)) == paths[:2]
@@ -0,0 +1,79 @@
+"""Test the backward reachability."""
+
+from datetime import UTC, datetime
+
+from src.models import FlightEvent
+from src.models.flight_table import to_timestamp
+from src.search import DepartureIndex, backward_reachability
+from src.search.departure_index import MIN_TIMESTAMP
+from src.search.reachability import UNREACHABLE
+
+
+def flight_event(from_airport: str, to_airport: str, hour: int) -> FlightEvent:
+    """Build a one hour flight event departing at the given hour."""
+    return FlightEvent(
+        flight_number="IB1234",
+        from_airport=from_airport,
+        to_airport=to_airport,
+        departure_time=datetime(2021, 12, 31, hour, 0, 0, tzinfo=UTC),
+        arrival_time=datetime(2021, 12, 31, hour + 1, 0, 0, tzinfo=UTC),
+    )
+
+
+def timestamp(hour: int) -> int:
+    """Get the timestamp of an hour of the search date."""
+    return to_timestamp(datetime(2021, 12, 31, hour, 0, 0, tzinfo=UTC))
+
+
+class TestBackwardReachability:
+    """Test the backward reachability."""
+
+    def test_hops_and_latest_departures(self) -> None:
+        """Test the fewest flights and latest departure toward the destination."""
+        departure_index = DepartureIndex(
+            [
+                flight_event("MAD", "BUE", 8),
+                flight_event("MAD", "BOG", 10),
+                flight_event("BOG", "BUE", 12),
+                flight_event("GRU", "BOG", 11),
+                # arrives after the last flight from BOG to the destination
+                flight_event("LIM", "BOG", 15),
+                # departs before the search window
+                flight_event("SCL", "BUE", 1),
+            ]
+        )
+        airport_id = departure_index.flight_table.airport_id
+        reachability = backward_reachability(
+            departure_index,
+            airport_id("BUE"),
+            departure_from=timestamp(2),
+            arrival_to=timestamp(23),
+            max_flights=2,
+        )
+
+        assert reachability.hops[airport_id("BUE")] == 0
+        assert reachability.hops[airport_id("BOG")] == 1
+        assert reachability.hops[airport_id("MAD")] == 1
+        assert reachability.hops[airport_id("GRU")] == 2
+        assert reachability.hops[airport_id("LIM")] == UNREACHABLE
+        assert reachability.hops[airport_id("SCL")] == UNREACHABLE
+        assert reachability.latest_departures[airport_id("BOG")] == timestamp(12)
+        assert reachability.latest_departures[airport_id("MAD")] == timestamp(10)
+        assert reachability.latest_departures[airport_id("GRU")] == timestamp(11)
+        assert reachability.latest_departures[airport_id("LIM")] == MIN_TIMESTAMP
+
+    def test_max_flights(self) -> None:
+        """Test airports further than the max amount of flights are unreachable."""
+        departure_index = DepartureIndex(
+            [flight_event("MAD", "BOG", 10), flight_event("BOG", "BUE", 12)]
+        )
+        airport_id = departure_index.flight_table.airport_id
+        reachability = backward_reachability(
+            departure_index,
+            airport_id("BUE"),
+            departure_from=timestamp(0),
+            arrival_to=timestamp(23),
+            max_flights=1,
+        )
+        assert reachability.hops[airport_id("BOG")] == 1
+        assert reachability.hops[airport_id("MAD")] == UNREACHABLE
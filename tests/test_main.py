@@ -0,0 +1,156 @@
+"""Test the application setup."""
+
+import io
+import time
+from collections.abc import Generator
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from src.core.dependencies import get_settings
+from src.core.search_pool import SearchPool
+from src.main import app
+from src.models import FlightTable
+from src.repositories.flight_events import (
+    FlightEventsRefresher,
+    FlightEventsSnapshot,
+    convert_feed_file,
+    flight_events_cache,
+    write_snapshot_file,
+)
+from src.repositories.flight_events.cache import CachedFlightEvents
+from src.search import JourneySearchCache
+
+
+@pytest.fixture
+def env_settings(monkeypatch: pytest.MonkeyPatch) -> Generator[None, None, None]:
+    """Provide the settings through environment variables."""
+    monkeypatch.setenv("FLIGHT_EVENTS_API_URL", "https://api.flight-events.com")
+    monkeypatch.setenv("MAX_CONNECTIONS", "1")
+    monkeypatch.setenv("MAX_JOURNEY_DURATION_HOURS", "24")
+    monkeypatch.setenv("MAX_CONNEXTION_DURATION_HOURS", "4")
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+@pytest.mark.usefixtures("env_settings")
+def test_lifespan_manages_http_client() -> None:
+    """Test a single HTTP client is shared during the app lifetime and closed on shutdown."""
+    with TestClient(app):
+        http_client = app.state.http_client
+        assert isinstance(http_client, httpx.AsyncClient)
+        assert not http_client.is_closed
+    assert http_client.is_closed
+
+
+@pytest.mark.usefixtures("env_settings")
+def test_lifespan_creates_journey_search_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the journey search cache is created with the configured size."""
+    monkeypatch.setenv("JOURNEY_SEARCH_CACHE_SIZE", "16")
+    with TestClient(app):
+        journey_search_cache = app.state.journey_search_cache
+        assert isinstance(journey_search_cache, JourneySearchCache)
+        assert journey_search_cache.maxsize == 16
+
+
+@pytest.mark.usefixtures("env_settings")
+@pytest.mark.parametrize("workers", [0, 2])
+def test_lifespan_manages_journey_search_pool(
+    monkeypatch: pytest.MonkeyPatch, workers: int
+) -> None:
+    """Test the journey search pool is created when configured and closed on shutdown."""
+    monkeypatch.setenv("JOURNEY_SEARCH_WORKERS", str(workers))
+    monkeypatch.setenv("JOURNEY_SEARCH_PARALLEL_THRESHOLD", "100")
+    with TestClient(app):
+        search_pool = app.state.journey_search_pool
+        if workers == 0:
+            assert search_pool is None
+            return
+        assert isinstance(search_pool, SearchPool)
+        assert (search_pool.workers, search_pool.threshold) == (2, 100)
+        directory = Path(search_pool._directory.name)
+        assert directory.exists()
+    assert app.state.journey_search_pool is None
+    assert not directory.exists()
+
+
+@pytest.mark.usefixtures("env_settings")
+def test_lifespan_loads_flight_events_snapshot(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Test the snapshot of the feed is cached on startup, when configured."""
+    path = tmp_path / "flight-events.snapshot"
+    write_snapshot_file(
+        path,
+        CachedFlightEvents(
+            snapshot=FlightEventsSnapshot(FlightTable(), version="v1"),
+            etag=None,
+            last_modified=None,
+            fetched_at=time.monotonic(),
+        ),
+    )
+    monkeypatch.setenv("FLIGHT_EVENTS_SNAPSHOT_PATH", str(path))
+    flight_events_cache.clear()
+    try:
+        with TestClient(app):
+            entry = flight_events_cache.get("https://api.flight-events.com")
+            assert entry is not None
+            assert entry.snapshot.version == "v1"
+    finally:
+        flight_events_cache.clear()
+
+
+@pytest.mark.usefixtures("env_settings")
+def test_lifespan_starts_without_flight_events_snapshot(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Test the app starts if the snapshot of the feed can't be loaded."""
+    monkeypatch.setenv("FLIGHT_EVENTS_SNAPSHOT_PATH", str(tmp_path / "missing.snapshot"))
+    with TestClient(app):
+        assert flight_events_cache.get("https://api.flight-events.com") is None
+    assert "Failed to load flight events snapshot" in caplog.text
+
+
+@pytest.mark.usefixtures("env_settings")
+@pytest.mark.parametrize("interval", [0, 60])
+def test_lifespan_runs_flight_events_refresher(
+    monkeypatch: pytest.MonkeyPatch, interval: int
+) -> None:
+    """Test the feed is refreshed in the background during the app lifetime, when enabled."""
+    monkeypatch.setenv("FLIGHT_EVENTS_REFRESH_INTERVAL_SECONDS", str(interval))
+    with (
+        patch.object(FlightEventsRefresher, "run", autospec=True) as run,
+        TestClient(app),
+    ):
+        pass
+    assert run.await_count == (1 if interval else 0)
+    if interval:
+        assert run.await_args.args[0].interval == interval
+
+
+@pytest.mark.usefixtures("env_settings")
+def test_flight_events_file(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Test journeys are searched in the feed file, when configured, instead of the API."""
+    path = tmp_path / "flight-events.snapshot"
+    convert_feed_file(
+        io.BytesIO(
+            b'[{"flight_number": "XX1234", "departure_city": "BUE", "arrival_city": "MAD",'
+            b' "departure_datetime": "2024-09-12T10:00:00", "arrival_datetime":'
+            b' "2024-09-12T11:00:00"}]'
+        ),
+        path,
+    )
+    monkeypatch.setenv("FLIGHT_EVENTS_FILE_PATH", str(path))
+    monkeypatch.setenv("FLIGHT_EVENTS_REFRESH_INTERVAL_SECONDS", "60")
+    with (
+        patch.object(FlightEventsRefresher, "run", autospec=True) as run,
+        TestClient(app) as client,
+    ):
+        response = client.get("/journeys/search?date=2024-09-12&from=BUE&to=MAD")
+    assert response.status_code == 200
+    assert [leg["flight_number"] for leg in response.json()[0]["path"]] == ["XX1234"]
+    run.assert_not_called()